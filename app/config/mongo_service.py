@@ -1,17 +1,45 @@
-from typing import List, Optional
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple, Union
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
 from pydantic import BaseModel
 from fastapi import HTTPException
 from fastapi.responses import JSONResponse
 from ..utils.env_service import env_service
 
 
+def encode_value(value):
+    # BSON scalars to JSON, as jsonable_encoder renders them
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+STRING_CURSOR = "s:"  # cursor prefix of sort values stored as strings
+
+
 class MongoModel(BaseModel):
     id: Optional[str] = str(ObjectId())
 
 
 class MongoService:
+    # Indexes created at startup; the feeds filter on user_id and page newest first on (created_at, _id),
+    # authenticated routes look users up by username
+    INDEXES = {
+        "histories": [
+            [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+        ],
+        "notifications": [
+            [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+        ],
+        "users": [[("username", ASCENDING)]],
+        "cameras": [[("user_id", ASCENDING)]],
+    }
+
     def __init__(self):
         self.mongo_client = None
         self.db_name = None
@@ -21,8 +49,36 @@ class MongoService:
             "{}".format(env_service.get_env_var("DB_URL"))
         )
         self.db_name = env_service.get_env_var("DB_NAME")
+        await self.create_indexes()
         return self.mongo_client
 
+    async def create_indexes(self):
+        # create_index is a no-op when the index already exists
+        for collection_name, indexes in self.INDEXES.items():
+            for keys in indexes:
+                await self.mongo_client[self.db_name][collection_name].create_index(keys)
+
+    @staticmethod
+    def encode_cursor(doc: dict, sort_by: str = "created_at") -> str:
+        # Documents stored without overriding jsonable_encoder's output hold sort_by as an ISO string, not a date;
+        # their cursors are tagged so the next page compares strings with strings
+        value = doc[sort_by]
+        value = value.isoformat() if isinstance(value, datetime) else f"{STRING_CURSOR}{value}"
+        return "{},{}".format(value, doc["_id"])
+
+    @staticmethod
+    def decode_cursor(after: str) -> Tuple[Union[datetime, str], str]:
+        # _id stays a hex string: documents are stored through jsonable_encoder, which writes _id as a string
+        try:
+            value, _id = after.rsplit(",", 1)
+            if not ObjectId.is_valid(_id):
+                raise ValueError(_id)
+            if value.startswith(STRING_CURSOR):
+                return value[len(STRING_CURSOR):], _id
+            return datetime.fromisoformat(value), _id
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
     async def close_mongo_connection(self):
         self.mongo_client.close()
 
@@ -41,6 +97,16 @@ class MongoService:
         obj["id"] = str(result.inserted_id)
         return obj
 
+    async def create_many(self, collection_name: str, objs: List[dict]) -> List[dict]:
+        if not objs:
+            return []
+        result = await self.mongo_client[self.db_name][collection_name].insert_many(
+            objs, ordered=False
+        )
+        for obj, inserted_id in zip(objs, result.inserted_ids):
+            obj["id"] = str(inserted_id)
+        return objs
+
     async def get(
         self,
         collection_name: str,
@@ -87,6 +153,37 @@ class MongoService:
 
         raise HTTPException(status_code=404, detail="Not found!")
 
+    async def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """
+        Take or renew the lease `name` for `owner` for ttl seconds. False while another owner holds it unexpired.
+        """
+        now = datetime.utcnow()
+        try:
+            # No match means another owner holds it: the upsert then collides on _id
+            await self.mongo_client[self.db_name]["leases"].update_one(
+                {"_id": name, "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl)}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def release_lease(self, name: str, owner: str) -> None:
+        await self.mongo_client[self.db_name]["leases"].delete_one({"_id": name, "owner": owner})
+
+    async def update_many(
+        self, collection_name: str, query: dict, update_data: dict
+    ) -> int:
+        result = await self.mongo_client[self.db_name][collection_name].update_many(
+            query, {"$set": update_data}
+        )
+        return result.modified_count
+
+    async def delete_many(self, collection_name: str, query: dict) -> int:
+        result = await self.mongo_client[self.db_name][collection_name].delete_many(query)
+        return result.deleted_count
+
     async def delete(
         self, collection_name, delete_by: str = "username", delete_value: str = ""
     ) -> None:
@@ -110,6 +207,7 @@ class MongoService:
         sort = []
         if sort_by:
             sort.append((sort_by, -1))
+            sort.append(("_id", -1))  # stable order for equal timestamps
         result = self.mongo_client[self.db_name][collection_name].find(
             query, skip=skip, limit=limit, sort=sort
         )
@@ -118,5 +216,74 @@ class MongoService:
         except Exception as e:
             print(e)
 
+    @staticmethod
+    def _page_query(query: Optional[dict], after: Optional[str], sort_by: str) -> dict:
+        query = dict(query or {})
+        if after:
+            value, _id = MongoService.decode_cursor(after)
+            query["$or"] = [
+                {sort_by: {"$lt": value}},  # $lt only matches values of the same BSON type
+                {sort_by: value, "_id": {"$lt": _id}},
+            ]
+            if isinstance(value, datetime):
+                query["$or"].append({sort_by: {"$type": "string"}})  # strings sort after every date, newest first
+        return query
+
+    async def get_page(
+        self,
+        collection_name: str,
+        limit: int = 10,
+        after: Optional[str] = None,
+        skip: int = 0,
+        sort_by: str = "created_at",
+        model_cls: Optional[MongoModel] = None,
+        query: Optional[dict] = None,
+    ) -> Tuple[List[MongoModel], Optional[str]]:
+        """
+        Keyset pagination, newest first: the page of documents after the cursor `after` ("<sort_by>,<_id>") and
+        the cursor of the next page, None on the last page. Unlike skip, the cost does not grow with page depth;
+        skip is only applied when no cursor is given, for clients still paging by offset.
+        """
+        result = self.mongo_client[self.db_name][collection_name].find(
+            self._page_query(query, after, sort_by),
+            skip=0 if after else skip,
+            limit=limit,
+            sort=[(sort_by, -1), ("_id", -1)],
+        )
+        docs = [doc async for doc in result]
+        next_cursor = self.encode_cursor(docs[-1], sort_by) if limit and len(docs) == limit else None
+        return [model_cls(**doc) for doc in docs], next_cursor
+
+    async def get_page_raw(
+        self,
+        collection_name: str,
+        limit: int = 10,
+        after: Optional[str] = None,
+        skip: int = 0,
+        sort_by: str = "created_at",
+        model_cls: Optional[BaseModel] = None,
+        query: Optional[dict] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        get_page for list endpoints: only the fields of model_cls are fetched and documents come back as plain
+        JSON-ready dicts (the same shape jsonable_encoder gives for the model) without building Pydantic models.
+        """
+        fields = {
+            field.alias: field.default for field in model_cls.__fields__.values()
+        }
+        result = self.mongo_client[self.db_name][collection_name].find(
+            self._page_query(query, after, sort_by),
+            projection=dict.fromkeys(fields, 1),
+            skip=0 if after else skip,
+            limit=limit,
+            sort=[(sort_by, -1), ("_id", -1)],
+        )
+        docs = [doc async for doc in result]
+        next_cursor = self.encode_cursor(docs[-1], sort_by) if limit and len(docs) == limit else None
+        return [
+            {k: encode_value(doc.get(k, default)) for k, default in fields.items()}
+            for doc in docs
+        ], next_cursor
+
 
 db_mongo = MongoService()
@@ -1,7 +1,16 @@
+import os
+import time
 from datetime import datetime
 from fastapi import Request, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from .auth_handler import JwtHandler
+from .auth_handler import jwt_handler
+from app.utils.ttl_cache import TTLCache
+
+# Decoded tokens, shared by all requests; an entry never outlives the token's own expiry
+token_cache = TTLCache(
+    ttl=float(os.getenv("AUTH_CACHE_TTL", 60)),
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", 1024)),
+)
 
 
 class JwtBearer(HTTPBearer):
@@ -9,6 +18,11 @@ class JwtBearer(HTTPBearer):
         super(JwtBearer, self).__init__(auto_error=auto_error)
 
     async def __call__(self, request: Request):
+        # Routes declare JwtBearer twice (dependencies=[...] and the username parameter); verify once per request
+        username = getattr(request.state, "username", None)
+        if username:
+            return username
+
         credentials: HTTPAuthorizationCredentials = await super(
             JwtBearer, self
         ).__call__(request)
@@ -19,23 +33,28 @@ class JwtBearer(HTTPBearer):
                     status_code=403, detail="Invalid authentication scheme."
                 )
 
-            if not self.verify_jwt(credentials.credentials):
+            username = self.verify_jwt(credentials.credentials)
+            if not username:
                 raise HTTPException(
                     status_code=403, detail="Invalid token or expired token."
                 )
 
-            return self.verify_jwt(credentials.credentials)
+            request.state.username = username
+            return username
 
         else:
             raise HTTPException(status_code=403, detail="Invalid authorization code.")
 
     def verify_jwt(self, jwtoken: str):
         isTokenValid: bool = False
-        check_token = JwtHandler()
-        try:
-            payload = check_token.decode_jwt(jwtoken)
-        except Exception as err:
-            payload = None
+        payload = token_cache.get(jwtoken)
+        if payload is None:
+            try:
+                payload = jwt_handler.decode_jwt(jwtoken)
+            except Exception as err:
+                payload = None
+            if payload:
+                token_cache.set(jwtoken, payload, ttl=payload["exp"] - time.time())
         if payload:
             isTokenValid = True
             return payload["username"]
@@ -37,3 +37,6 @@ class JwtHandler:
             return None
         except Exception as err:
             pass
+
+
+jwt_handler = JwtHandler()
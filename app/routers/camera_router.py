@@ -0,0 +1,127 @@
+import asyncio
+import os
+import socket
+
+from fastapi import APIRouter, Body, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.schemas import camera
+from app.config.mongo_service import db_mongo
+from app.middlewares.auth_bearer import JwtBearer
+from app.services.camera_service import CameraService
+from app.services.user_service import UserService
+from datetime import datetime
+from yolov5.stream_monitor import stream_monitor
+
+router = APIRouter()
+camera_service = CameraService()
+user_service = UserService()
+
+# Only the process holding this lease monitors cameras, whatever the number of uvicorn workers
+CAMERA_LEASE = "camera-monitor"
+CAMERA_LEASE_TTL = float(os.getenv("CAMERA_LEASE_TTL", 30))  # seconds; renewed every third of it
+lease_owner = f"{socket.gethostname()}:{os.getpid()}"
+lease = {"held": False, "task": None}
+
+
+async def start_camera(camera_dict):
+    # Loading the model and opening the stream block, keep them off the event loop
+    await run_in_threadpool(
+        stream_monitor.add,
+        camera_dict["_id"],
+        camera_dict["user_id"],
+        camera_dict["url"],
+        camera_dict.get("sample_fps"),
+    )
+
+
+async def sync_cameras():
+    # Monitor exactly the active cameras in the database, including those created or deleted through other workers
+    cameras = await camera_service.get_active()
+    running = stream_monitor.camera_ids()
+    for camera_dict in cameras:
+        if camera_dict["_id"] not in running:
+            try:
+                await start_camera(camera_dict)
+            except Exception as e:
+                print(f"Camera {camera_dict['_id']} not started: {e}")
+    active = {camera_dict["_id"] for camera_dict in cameras}
+    for camera_id in running - active:
+        await run_in_threadpool(stream_monitor.remove, camera_id)
+
+
+async def hold_camera_lease():
+    while True:
+        try:
+            lease["held"] = await db_mongo.acquire_lease(CAMERA_LEASE, lease_owner, CAMERA_LEASE_TTL)
+            if lease["held"]:
+                await sync_cameras()
+            elif stream_monitor.camera_ids():
+                await run_in_threadpool(stream_monitor.stop)  # lease taken over by another process
+        except Exception as e:
+            print(f"Camera lease not renewed: {e}")
+        await asyncio.sleep(CAMERA_LEASE_TTL / 3)
+
+
+async def start_cameras():
+    # Resume monitoring every active camera after a restart, in the one process that gets the lease
+    lease["task"] = asyncio.create_task(hold_camera_lease())
+
+
+async def stop_cameras():
+    if lease["task"] is not None:
+        lease["task"].cancel()
+        lease["task"] = None
+    await run_in_threadpool(stream_monitor.stop)
+    if lease["held"]:
+        lease["held"] = False
+        await db_mongo.release_lease(CAMERA_LEASE, lease_owner)  # another worker takes over without waiting
+
+
+@router.post("/api/cameras/", dependencies=[Depends(JwtBearer())], tags=["Cameras"])
+async def create_camera(
+    camera: camera.CameraSchema = Body(...), username=Depends(JwtBearer())
+):
+    if not await run_in_threadpool(stream_monitor.check_source, camera.url):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Camera URL must be an rtsp://, rtmp:// or http(s):// stream on a public host",
+        )
+    user = await user_service.get("username", username)
+    camera_dict = jsonable_encoder(camera)
+    camera_dict["user_id"] = str(user.id)
+    camera_dict["created_at"] = datetime.now()
+    camera_dict["updated_at"] = datetime.now()
+    response = await camera_service.create(camera_dict)
+    # Started here by the lease holder, otherwise by the holder's next sync_cameras()
+    if camera.active and lease["held"]:
+        try:
+            await start_camera(camera_dict)
+        except Exception as e:
+            await camera_service.delete_for_user(camera_dict["_id"], camera_dict["user_id"])
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Camera not started: {e}",
+            )
+    return response
+
+
+@router.get("/api/cameras/", dependencies=[Depends(JwtBearer())], tags=["Cameras"])
+async def get_cameras(username=Depends(JwtBearer())):
+    user = await user_service.get("username", username)
+    cameras = await camera_service.get_by_user(str(user.id))
+    for camera_dict in cameras:
+        camera_dict["monitor"] = stream_monitor.get(camera_dict["_id"])
+    return JSONResponse(status_code=status.HTTP_200_OK, content={"data": cameras})
+
+
+@router.delete(
+    "/api/cameras/{camera_id}", dependencies=[Depends(JwtBearer())], tags=["Cameras"]
+)
+async def delete_camera(camera_id: str, username=Depends(JwtBearer())):
+    user = await user_service.get("username", username)
+    if not await camera_service.delete_for_user(camera_id, str(user.id)):
+        raise HTTPException(status_code=404, detail="Camera not found")
+    await run_in_threadpool(stream_monitor.remove, camera_id)
+    return JSONResponse(status_code=status.HTTP_200_OK, content={"message": True})
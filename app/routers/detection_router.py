@@ -1,4 +1,8 @@
-from fastapi import APIRouter, Body, Depends, HTTPException, status
+import os
+from typing import List
+
+from bson import ObjectId
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, File, HTTPException, status, UploadFile
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from app.schemas import detection
@@ -6,27 +10,138 @@ from app.config.mongo_service import db_mongo
 from app.middlewares.auth_bearer import JwtBearer
 from app.services.detection_service import DetectionService
 from app.services.user_service import UserService
-from app.utils.detection_thread import DetectionThread
-from yolov5.yolo_detect import YoloDetect
+from app.routers.upload_router import save_upload, write_thumbnails, PARENT_PATH
+from app.utils.event_bus import event_bus
+from constants import Constants
+from yolov5.frame_gate import FrameGate
+from yolov5.result_cache import result_cache
+from yolov5.stream_monitor import stream_monitor
+from app.utils.detection_executor import (
+    ExecutorClosedError,
+    QueueFullError,
+    detection_executor,
+    run_batch_detection,
+    run_detection,
+)
 
 router = APIRouter()
+BATCH_MAX_SOURCES = int(os.getenv("DETECTION_BATCH_MAX", 32))  # sources accepted by one batch request
 detection_service = DetectionService()
 user_service = UserService()
 
 
+def publish_detection_events(result):
+    # Runs on the executor's callback thread; the bus hands the events over to the event loop
+    event_bus.publish_all(result.pop("events", []))
+
+
+def submit_job(job_id, user_id, fn, *args):
+    try:
+        return detection_executor.submit(
+            job_id, fn, *args, on_result=publish_detection_events, user_id=user_id
+        )
+    except QueueFullError:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Detection queue is full, try again later",
+            headers={"Retry-After": "5"},
+        )
+    except ExecutorClosedError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Detection service is shutting down",
+        )
+
+
+async def create_batch(user, sources):
+    # One executor job for the whole batch; its result lists the per-source results in request order
+    if len(sources) > BATCH_MAX_SOURCES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BATCH_MAX_SOURCES} sources per batch",
+        )
+    job_id = str(ObjectId())
+    submit_job(job_id, str(user.id), run_batch_detection, str(user.id), list(sources))
+    detections = await detection_service.create_many(
+        [
+            {**jsonable_encoder(detection.DetectionSchema(source=source)), "user_id": str(user.id)}
+            for source in sources
+        ]
+    )
+    return JSONResponse(
+        status_code=status.HTTP_201_CREATED,
+        content={"data": {"job_id": job_id, "detections": detections}},
+    )
+
+
 @router.post("/api/detection/", dependencies=[Depends(JwtBearer())], tags=["detections"])
 async def create_detection(
     detection: detection.DetectionSchema = Body(...), username=Depends(JwtBearer())
 ):
     detection_dict = jsonable_encoder(detection)
-    detection_data = await detection_service.create(detection_dict)
     user = await user_service.get("username", username)
-    detection_thread = DetectionThread()
-    detection_thread.start_detecting(
-        user.id,
-        detection.source,
+    detection_dict["user_id"] = str(user.id)
+
+    # The detection id doubles as the job id for /api/detection/{job_id}
+    submit_job(detection_dict["_id"], str(user.id), run_detection, str(user.id), detection.source)
+
+    return await detection_service.create(detection_dict)
+
+
+@router.post("/api/detection/batch", dependencies=[Depends(JwtBearer())], tags=["detections"])
+async def create_detection_batch(
+    batch: detection.DetectionBatchSchema = Body(...), username=Depends(JwtBearer())
+):
+    user = await user_service.get("username", username)
+    return await create_batch(user, batch.sources)
+
+
+@router.post("/api/detection/batch/upload", dependencies=[Depends(JwtBearer())], tags=["detections"])
+async def upload_detection_batch(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    username=Depends(JwtBearer()),
+):
+    user = await user_service.get("username", username)
+    if len(files) > BATCH_MAX_SOURCES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BATCH_MAX_SOURCES} sources per batch",
+        )
+    sources = []
+    for file in files:
+        det_filename, digest, _ = await save_upload(file)
+        background_tasks.add_task(
+            write_thumbnails,
+            os.path.join(PARENT_PATH, Constants.PUBLIC_FOLDER + det_filename),
+            digest,
+        )
+        sources.append(det_filename)
+    return await create_batch(user, sources)
+
+
+@router.get("/api/detection/stats", dependencies=[Depends(JwtBearer())], tags=["detections"])
+async def get_detection_stats():
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={
+            "data": {
+                **detection_executor.stats(),
+                "events": event_bus.stats(),
+                "result_cache": result_cache.stats(),
+                "streams": stream_monitor.stats(),
+                "frame_gate": FrameGate.total_stats(),
+            }
+        },
     )
-    # detection_task = YoloDetect(user.id, detection.source)
-    # await detection_task.detection_thread()
 
-    return detection_data
+
+@router.get("/api/detection/{job_id}", dependencies=[Depends(JwtBearer())], tags=["detections"])
+async def get_detection_job(job_id: str, username=Depends(JwtBearer())):
+    user = await user_service.get("username", username)
+    job = detection_executor.get(job_id)
+    if job is None or job.user_id != str(user.id):  # other users' jobs are reported as missing, not forbidden
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(
+        status_code=status.HTTP_200_OK, content={"data": jsonable_encoder(job.to_dict())}
+    )
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Body, Depends, HTTPException, status, UploadFile,
 from pathlib import Path
 import aiofiles
 import os
-from typing import Union
+from typing import Optional, Union
 import time
 from constants import Constants
 import cv2
@@ -33,11 +33,23 @@ async def create_history(history: history.HistorySchema = Body(...)):
     return await history_service.create(notification_dict)
 
 
+async def save_history_events(histories):
+    # Event bus handler: detection workers publish "history" events, stored here with one insert_many
+    history_docs = []
+    for data in histories:
+        history_dict = jsonable_encoder(history.HistorySchema(**data))
+        history_dict["created_at"] = datetime.now()
+        history_dict["updated_at"] = datetime.now()
+        history_docs.append(history_dict)
+    await history_service.create_many(history_docs)
+
+
 @router.get("/api/history/", dependencies=[Depends(JwtBearer())], tags=["Histories"])
 async def get_histories(
     username: str = Depends(JwtBearer()),
     skip: int = Query(0, alias="skip", ge=0),
-    limit: int = Query(10, alias="limit", le=100),
+    limit: int = Query(10, alias="limit", gt=0, le=100),
+    after: Optional[str] = Query(None, alias="after"),
 ):
     current_user = await user_service.get(search_by="username", search_value=username)
 
@@ -45,5 +57,5 @@ async def get_histories(
         raise HTTPException(status_code=404, detail="User not found")
     skip = skip * limit
     return await history_service.get_all(
-        skip, limit, history.HistorySchema, {"user_id": str(current_user.id)}
+        skip, limit, history.HistorySchema, {"user_id": str(current_user.id)}, after
     )
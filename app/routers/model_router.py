@@ -0,0 +1,30 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import JSONResponse
+from fastapi import status
+from app.middlewares.auth_bearer import JwtBearer
+from yolov5.model_registry import model_registry
+
+router = APIRouter()
+
+
+@router.get("/api/models/", dependencies=[Depends(JwtBearer())], tags=["Models"])
+async def get_loaded_models():
+    return JSONResponse(
+        status_code=status.HTTP_200_OK, content={"data": model_registry.loaded()}
+    )
+
+
+@router.post("/api/models/reload", dependencies=[Depends(JwtBearer())], tags=["Models"])
+def reload_models(weights: Optional[str] = Query(None)):
+    # Plain def: FastAPI runs it in the threadpool so the weight load does not block the event loop
+    reloaded = model_registry.reload(weights)
+    return JSONResponse(
+        status_code=status.HTTP_200_OK, content={"reloaded": reloaded}
+    )
+
+
+@router.delete("/api/models/", dependencies=[Depends(JwtBearer())], tags=["Models"])
+async def evict_models(weights: Optional[str] = Query(None)):
+    evicted = model_registry.evict(weights)
+    return JSONResponse(status_code=status.HTTP_200_OK, content={"evicted": evicted})
@@ -1,50 +1,101 @@
-from fastapi import APIRouter, Body, Depends, HTTPException, status, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException, status, UploadFile
 from pathlib import Path
 import aiofiles
 import os
 from typing import Union
-import time
 from constants import Constants
-import cv2
+import hashlib
+import uuid
+from app.utils.offload import offload
+from app.utils.thumbnails import thumbnail_service
 
 router = APIRouter()
 
+CHUNK_SIZE = 1024 * 1024  # bytes read from the upload per iteration
+
 SUB_PATH = Path(os.path.dirname(os.path.abspath(__file__))).parent.absolute()
 PARENT_PATH = SUB_PATH.parent.absolute()
 
 
+async def write_thumbnails(file_path, name, sizes=None):
+    # Awaited or run after the response is sent; the decode + encode itself is on the OpenCV offload pool
+    try:
+        await offload.run(
+            "opencv",
+            thumbnail_service.generate,
+            file_path,
+            name,
+            os.path.join(PARENT_PATH, Constants.THUMBNAIL_FOLDER),
+            sizes,
+        )
+    except Exception as e:
+        print(e)
+
+
+async def save_upload(file: UploadFile):
+    """
+    Stream an upload into content-addressed storage and return (file name, digest, duplicate).
+    """
+    extension = Path(file.filename).suffix.lower()
+    upload_path = os.path.join(
+        PARENT_PATH, Constants.PUBLIC_FOLDER + f".upload_{uuid.uuid4().hex}{extension}"
+    )
+    try:
+        # Stream to disk in chunks, hashing as we go, so memory stays at one chunk whatever the video size
+        content_hash = hashlib.sha256()
+        async with aiofiles.open(upload_path, "wb") as out_file:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                content_hash.update(chunk)
+                await out_file.write(chunk)
+
+        # Content-addressed storage: identical clips map to the same file
+        digest = content_hash.hexdigest()
+        det_filename = digest + extension
+        file_copy = os.path.join(PARENT_PATH, Constants.PUBLIC_FOLDER + det_filename)
+        duplicate = os.path.exists(file_copy)
+        if duplicate:
+            os.remove(upload_path)
+        else:
+            os.replace(upload_path, file_copy)
+        return det_filename, digest, duplicate
+    except Exception:
+        if os.path.exists(upload_path):
+            os.remove(upload_path)
+        raise
+
+
 @router.post("/api/upload/file")
-async def create(file: Union[UploadFile, None] = None):
+async def create(background_tasks: BackgroundTasks, file: Union[UploadFile, None] = None):
     if not file:
         raise HTTPException(status_code=404, detail="Image not found")
     # elif not file.filename.lower().endswith((".mp4", ".mov", ".png", ".jpg")):
     #     raise HTTPException(status_code=403, detail="Wrong format")
     else:
-        timestamp = int(time.time())
-        det_filename = str(timestamp) + "_" + file.filename
-        save_path = Constants.PUBLIC_FOLDER + det_filename
-
-        file_copy = os.path.join(PARENT_PATH, save_path)
         try:
-            async with aiofiles.open(file_copy, "wb") as out_file:
-                content = await file.read()
-                await out_file.write(content)
-
-            thumbnail_filename = str(timestamp) + "_" + file.filename[0:-4] + ".png"
-            thumbnail_path = os.path.join(
-                PARENT_PATH, Constants.THUMBNAIL_FOLDER + thumbnail_filename
-            )
-
-            cap = cv2.VideoCapture(file_copy)
+            det_filename, digest, duplicate = await save_upload(file)
+            file_copy = os.path.join(PARENT_PATH, Constants.PUBLIC_FOLDER + det_filename)
 
-            while True:
-                success, frame = cap.read()
-                if not success:
-                    break
-                else:
-                    cv2.imwrite(thumbnail_path, frame)
-                    break
-            return {"path": det_filename, "thumbnail": thumbnail_filename}
+            # The default thumbnail is written before responding, the other sizes afterwards; only thumbnails that
+            # exist are returned, a URL requested too early would 404
+            default, *others = thumbnail_service.sizes
+            await write_thumbnails(file_copy, digest, [default])
+            if others:
+                background_tasks.add_task(write_thumbnails, file_copy, digest, others)
+            thumbnails = {
+                size: filename
+                for size, filename in thumbnail_service.filenames(digest).items()
+                if os.path.exists(os.path.join(PARENT_PATH, Constants.THUMBNAIL_FOLDER, filename))
+            }
+            return {
+                "path": det_filename,
+                "thumbnail": thumbnails.get(default),
+                "thumbnails": thumbnails,
+                "hash": digest,
+                "duplicate": duplicate,
+            }
         except Exception as e:
             print(e)
             raise HTTPException(status_code=500)
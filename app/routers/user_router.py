@@ -62,15 +62,12 @@ async def create_device_token(device_token: device_token.DeviceTokenSchema = Bod
     device_token_dict = jsonable_encoder(device_token)
     search_value = str(device_token_dict["user_id"])
     try:
-        user = await device_token_service.get(
-            search_by="user_id", search_value=search_value
-        )
-        return JSONResponse(
-            status_code=status.HTTP_202_ACCEPTED,
-            content={"error": "Exist"},
-        )
-    except:
+        await device_token_service.get(search_by="user_id", search_value=search_value)
+    except HTTPException:
         return await device_token_service.create(device_token_dict)
+    # Already registered, possibly deactivated as DeviceNotRegistered: take the new token
+    await device_token_service.register(search_value, device_token_dict["device_token"])
+    return JSONResponse(status_code=status.HTTP_200_OK, content={"message": True})
 
 
 @router.get("/api/user/devicetoken", tags=["DeviceTokens"])
@@ -0,0 +1,21 @@
+from typing import Optional
+from pydantic import BaseModel, Field
+from app.schemas.base import PyObjectId
+from bson import ObjectId
+from datetime import datetime
+
+
+class CameraSchema(BaseModel):
+    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    name: str = Field(...)
+    url: str = Field(...)
+    user_id: Optional[str] = Field(default=None)
+    sample_fps: Optional[float] = Field(default=None, gt=0)
+    active: bool = Field(default=True)
+    created_at: Optional[datetime] = Field(default=datetime.now(), alias="created_at")
+    updated_at: Optional[datetime] = Field(default=datetime.now(), alias="updated_at")
+
+    class Config:
+        arbitrary_types_allowed = True
+        json_encoders = {ObjectId: str}
+        schema_extra = {"example": {"name": "", "url": "rtsp://", "sample_fps": 1}}
@@ -1,3 +1,4 @@
+from typing import List
 from pydantic import BaseModel, Field
 from app.schemas.base import PyObjectId
 from bson import ObjectId
@@ -11,3 +12,10 @@ class DetectionSchema(BaseModel):
         arbitrary_types_allowed = True
         json_encoders = {ObjectId: str}
         schema_extra = {"example": {}}
+
+
+class DetectionBatchSchema(BaseModel):
+    sources: List[str] = Field(..., min_items=1)
+
+    class Config:
+        schema_extra = {"example": {"sources": []}}
@@ -9,6 +9,7 @@ class DeviceTokenSchema(BaseModel):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     device_token: str = Field(...)
     user_id: str = Field(...)
+    active: bool = Field(default=True)
 
     class Config:
         arbitrary_types_allowed = True
@@ -11,6 +11,9 @@ class HistorySchema(BaseModel):
     result_path: str = Field(...)
     user_id: str = Field(...)
     status: bool = Field(...)
+    detections_path: Optional[str] = Field(default=None)
+    source: Optional[str] = Field(default=None)
+    rip_events: Optional[List[dict]] = Field(default=None)
     created_at: Optional[datetime] = Field(default=datetime.now(), alias="created_at")
     updated_at: Optional[datetime] = Field(default=datetime.now(), alias="updated_at")
 
@@ -0,0 +1,46 @@
+from app.config.mongo_service import db_mongo
+from .base import BaseService
+from app.schemas import camera
+from fastapi.responses import JSONResponse
+from fastapi import status
+from fastapi.encoders import jsonable_encoder
+
+
+class CameraService(BaseService):
+    def __init__(self):
+        super().__init__("cameras", camera.CameraSchema)
+
+    async def create(self, data):
+        result = await db_mongo.create(self.collection_name, data)
+        result = jsonable_encoder(result)
+        if result:
+            return JSONResponse(
+                status_code=status.HTTP_201_CREATED, content={"data": result}
+            )
+
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT, content={"data": result}
+        )
+
+    async def get_by_user(self, user_id):
+        result, _ = await db_mongo.get_page_raw(
+            collection_name=self.collection_name,
+            limit=0,  # no limit, a user has a handful of cameras
+            model_cls=self.model_cls,
+            query={"user_id": user_id},
+        )
+        return result
+
+    async def get_active(self):
+        result, _ = await db_mongo.get_page_raw(
+            collection_name=self.collection_name,
+            limit=0,
+            model_cls=self.model_cls,
+            query={"active": True},
+        )
+        return result
+
+    async def delete_for_user(self, camera_id, user_id):
+        return await db_mongo.delete_many(
+            self.collection_name, {"_id": camera_id, "user_id": user_id}
+        )
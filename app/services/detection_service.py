@@ -19,3 +19,6 @@ class DetectionService(BaseService):
         return JSONResponse(
             status_code=status.HTTP_409_CONFLICT, content={"data": result}
         )
+
+    async def create_many(self, data):
+        return await db_mongo.create_many(self.collection_name, data)
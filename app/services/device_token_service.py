@@ -19,4 +19,19 @@ class DeviceTokenService(BaseService):
 
         return JSONResponse(
             status_code=status.HTTP_409_CONFLICT, content={"data": result}
-        )
\ No newline at end of file
+        )
+
+    async def deactivate(self, device_tokens):
+        return await db_mongo.update_many(
+            self.collection_name,
+            {"device_token": {"$in": list(device_tokens)}},
+            {"active": False},
+        )
+
+    async def register(self, user_id, device_token):
+        # Point the user's existing token documents at the new token and reactivate them
+        return await db_mongo.update_many(
+            self.collection_name,
+            {"user_id": user_id},
+            {"device_token": device_token, "active": True},
+        )
@@ -4,6 +4,7 @@ from app.schemas import history
 from fastapi.responses import JSONResponse
 from fastapi import status
 from fastapi.encoders import jsonable_encoder
+from app.utils.responses import FastJSONResponse
 
 
 class HistoryService(BaseService):
@@ -22,15 +23,20 @@ class HistoryService(BaseService):
             status_code=status.HTTP_409_CONFLICT, content={"data": result}
         )
 
-    async def get_all(self, skip, limit, data, query):
-        result = await db_mongo.get_all(
+    async def create_many(self, data):
+        return await db_mongo.create_many(self.collection_name, data)
+
+    async def get_all(self, skip, limit, data, query, after=None):
+        result, next_cursor = await db_mongo.get_page_raw(
             collection_name=self.collection_name,
-            skip=skip,
             limit=limit,
+            after=after,
+            skip=skip,
             sort_by="created_at",
             model_cls=data,
             query=query,
         )
-
-        result = jsonable_encoder(result)
-        return JSONResponse(status_code=status.HTTP_200_OK, content={"data": result})
+        return FastJSONResponse(
+            status_code=status.HTTP_200_OK,
+            content={"data": result, "next": next_cursor},
+        )
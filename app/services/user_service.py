@@ -1,12 +1,21 @@
 from app.config.mongo_service import db_mongo
 from fastapi.responses import JSONResponse
 from fastapi import status
-from app.middlewares.auth_handler import JwtHandler
+from app.middlewares.auth_handler import jwt_handler
 from app.schemas import user as user_model
 from passlib.context import CryptContext
+from app.utils.offload import offload
+from app.utils.ttl_cache import TTLCache
 from .base import BaseService
 from datetime import datetime
 from pydantic import BaseModel
+import os
+
+# username -> user document, shared by every UserService; bounded staleness across worker processes
+user_cache = TTLCache(
+    ttl=float(os.getenv("AUTH_CACHE_TTL", 60)),
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", 1024)),
+)
 
 
 class UserService(BaseService):
@@ -17,7 +26,34 @@ class UserService(BaseService):
     def __init__(self):
         super().__init__("users", user_model.UserSchema)
         self.hasher = CryptContext(schemes=["bcrypt"])
-        self.jwt_handler = JwtHandler()
+        self.jwt_handler = jwt_handler
+
+    async def get(self, search_by: str = "username", search_value: str = ""):
+        if search_by != "username":
+            return await super().get(search_by, search_value)
+        user = user_cache.get(search_value)
+        if user is None:
+            user = await super().get(search_by, search_value)
+            user_cache.set(search_value, user)
+        return user
+
+    async def update(
+        self,
+        search_by: str = "username",
+        search_value: str = "",
+        new_data: BaseModel = None,
+    ):
+        try:
+            return await super().update(search_by, search_value, new_data)
+        finally:
+            if search_by == "username":
+                user_cache.invalidate(search_value)
+
+    async def delete(self, username: str):
+        try:
+            return await super().delete(username)
+        finally:
+            user_cache.invalidate(username)
 
     def encode_password(self, password: str):
         return self.hasher.hash(password)
@@ -34,7 +70,7 @@ class UserService(BaseService):
                 status_code=status.HTTP_409_CONFLICT,
                 content={"message": "Tên đăng nhập đã tồn tại"},
             )
-        hashed_password = self.encode_password(user["password"])
+        hashed_password = await offload.run("bcrypt", self.encode_password, user["password"])
         user["password"] = hashed_password
         new_user = await db_mongo.create(self.collection_name, user)
         return JSONResponse(
@@ -47,7 +83,9 @@ class UserService(BaseService):
     async def check_login(
         self, entered_password: str, current_password: str, username: str
     ):
-        if self.verify_password(entered_password, current_password):
+        if await offload.run(
+            "bcrypt", self.verify_password, entered_password, current_password
+        ):
             return JSONResponse(
                 status_code=status.HTTP_200_OK,
                 content=self.jwt_handler.sign_jwt(username),
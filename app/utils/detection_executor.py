@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class ExecutorClosedError(Exception):
+    pass
+
+
+def run_detection(user_id, source):
+    # Module level so ProcessPoolExecutor can pickle it; the import keeps torch out of the parent until first use
+    from yolov5.yolo_detect import YoloDetect
+
+    return YoloDetect(user_id, source).detection_thread()
+
+
+def run_batch_detection(user_id, sources):
+    from yolov5.yolo_detect import YoloDetect
+
+    return YoloDetect.detection_batch(user_id, sources)
+
+
+class DetectionJob:
+    def __init__(self, job_id, future, on_result=None, user_id=None):
+        self.id = job_id
+        self.user_id = user_id  # owner, the only user allowed to read the job
+        self.future = future
+        self.on_result = on_result
+        self.submitted_at = time.time()
+        self.finished_at = None
+
+    @property
+    def state(self):
+        if self.future.done():
+            if self.future.cancelled() or self.future.exception() is not None:
+                return JOB_FAILED
+            return JOB_DONE
+        if self.future.running():
+            return JOB_RUNNING
+        return JOB_QUEUED
+
+    def to_dict(self):
+        state = self.state
+        data = {
+            "id": self.id,
+            "state": state,
+            "submitted_at": self.submitted_at,
+            "finished_at": self.finished_at,
+        }
+        if state == JOB_FAILED:
+            data["error"] = (
+                "cancelled" if self.future.cancelled() else repr(self.future.exception())
+            )
+        elif state == JOB_DONE:
+            data["result"] = self.future.result()
+        return data
+
+
+class DetectionExecutor:
+    """
+    Runs detection jobs on a fixed number of workers with a bounded queue.
+
+    Configured from the environment when the first job is submitted:
+        DETECTION_EXECUTOR    "thread" (default) or "process"
+        DETECTION_WORKERS     number of workers (default 2)
+        DETECTION_QUEUE_SIZE  jobs allowed to wait for a worker (default 16)
+    """
+
+    def __init__(self, max_workers=None, queue_size=None, mode=None, history_size=1000):
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.mode = mode
+        self.history_size = history_size  # finished jobs kept for status lookups
+        self.pool = None
+        self.slots = None
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def _get_pool(self):
+        if self.pool is None:
+            self.max_workers = self.max_workers or int(os.getenv("DETECTION_WORKERS", 2))
+            self.queue_size = self.queue_size if self.queue_size is not None else int(
+                os.getenv("DETECTION_QUEUE_SIZE", 16)
+            )
+            self.mode = self.mode or os.getenv("DETECTION_EXECUTOR", "thread")
+            if self.mode == "process":
+                self.pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self.pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="detection"
+                )
+            # Running plus waiting jobs, so admission control never lets the executor's own queue grow unbounded
+            self.slots = threading.BoundedSemaphore(self.max_workers + self.queue_size)
+        return self.pool
+
+    def submit(self, job_id, fn, *args, on_result=None, user_id=None):
+        """
+        Schedule fn(*args) as job_id for user_id. Raises QueueFullError when all workers are busy and the queue is full.
+
+        on_result(result) is called in this process once the job succeeds, also when fn ran in a worker process.
+        """
+        with self.lock:
+            if self.closed:
+                raise ExecutorClosedError("Detection executor is shut down")
+            pool = self._get_pool()
+            if not self.slots.acquire(blocking=False):
+                raise QueueFullError("Detection queue is full")
+            try:
+                future = pool.submit(fn, *args)
+            except Exception:
+                self.slots.release()
+                raise
+            job = DetectionJob(job_id, future, on_result, user_id)
+            self.jobs[job_id] = job
+            self._trim()
+        future.add_done_callback(lambda f: self._on_done(job))
+        return job
+
+    def _on_done(self, job):
+        job.finished_at = time.time()
+        self.slots.release()
+        if job.on_result is not None and not job.future.cancelled() and job.future.exception() is None:
+            try:
+                job.on_result(job.future.result())
+            except Exception as e:
+                print(f"Detection job {job.id} result handler failed: {e}")
+
+    def _trim(self):
+        # Forget the oldest finished jobs once the history is full
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.history_size:
+                break
+            if self.jobs[job_id].future.done():
+                del self.jobs[job_id]
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def stats(self):
+        with self.lock:
+            states = [job.state for job in self.jobs.values()]
+        return {
+            "workers": self.max_workers,
+            "queue_size": self.queue_size,
+            "mode": self.mode,
+            **{s: states.count(s) for s in (JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED)},
+        }
+
+    def shutdown(self, wait=True):
+        with self.lock:
+            self.closed = True
+            pool = self.pool
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=not wait)
+
+
+detection_executor = DetectionExecutor()
@@ -0,0 +1,120 @@
+import asyncio
+import collections
+import threading
+import time
+
+
+class EventBus:
+    """
+    In-process bus that carries detection results from worker threads to async handlers on the server's event loop.
+
+    publish() is thread-safe and never blocks the caller. The consumer task groups queued events by topic and hands
+    each handler a list of payloads, so handlers can write a whole batch with a single insert_many. Events given to
+    one publish_all() call are never split across dispatches.
+    """
+
+    def __init__(self, batch_size: int = 100, flush_interval: float = 0.05):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval  # seconds the first event of a batch waits for more
+        self.handlers = {}
+        self.loop = None
+        self.queue = None
+        self.task = None
+        self.pending = collections.deque()  # event lists published before start()
+        self.lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self.latency_total = 0.0  # seconds from publish() to handler completion, summed over delivered events
+        self.latency_max = 0.0
+
+    def subscribe(self, topic: str, handler) -> None:
+        """
+        Register `async def handler(payloads: list)` for a topic.
+        """
+        self.handlers.setdefault(topic, []).append(handler)
+
+    def publish(self, topic: str, payload: dict) -> None:
+        self.publish_all([(topic, payload)])
+
+    def publish_all(self, events) -> None:
+        t = time.perf_counter()
+        items = [(topic, payload, t) for topic, payload in events]
+        if not items:
+            return
+        with self.lock:
+            self.published += len(items)
+            if self.loop is None:
+                self.pending.append(items)
+                return
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, items)
+
+    async def start(self) -> None:
+        self.queue = asyncio.Queue()
+        with self.lock:
+            self.loop = asyncio.get_running_loop()
+            while self.pending:
+                self.queue.put_nowait(self.pending.popleft())
+        self.task = asyncio.create_task(self._consume())
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        self.queue.put_nowait(None)  # flush what is queued, then exit
+        await self.task
+        with self.lock:
+            self.loop = None
+        self.task = None
+
+    async def _consume(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            if item is None:
+                break
+            batch = list(item)
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                try:
+                    item = (
+                        await asyncio.wait_for(self.queue.get(), timeout)
+                        if timeout > 0
+                        else self.queue.get_nowait()
+                    )
+                except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.extend(item)
+            await self._dispatch(batch)
+
+    async def _dispatch(self, batch) -> None:
+        topics = collections.defaultdict(list)
+        for topic, payload, t in batch:
+            topics[topic].append((payload, t))
+        for topic, items in topics.items():
+            payloads = [payload for payload, _ in items]
+            for handler in self.handlers.get(topic, []):
+                try:
+                    await handler(payloads)
+                except Exception as e:
+                    print(f"Event handler for '{topic}' failed: {e}")
+            now = time.perf_counter()
+            for _, t in items:
+                self.delivered += 1
+                self.latency_total += now - t
+                self.latency_max = max(self.latency_max, now - t)
+
+    def stats(self) -> dict:
+        return {
+            "published": self.published,
+            "delivered": self.delivered,
+            "queued": self.queue.qsize() if self.queue else len(self.pending),  # publish calls, not events
+            "avg_latency_ms": 1e3 * self.latency_total / self.delivered if self.delivered else 0.0,
+            "max_latency_ms": 1e3 * self.latency_max,
+        }
+
+
+event_bus = EventBus()
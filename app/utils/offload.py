@@ -0,0 +1,51 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Offloader:
+    """
+    Runs blocking CPU or disk work from async handlers on dedicated, size-limited thread pools.
+
+    Each kind of work gets its own pool so a burst of one (e.g. logins hashing with bcrypt) cannot starve the other
+    (e.g. OpenCV thumbnail decoding) or FastAPI's default threadpool. Pool sizes come from the environment:
+        OFFLOAD_BCRYPT_WORKERS  (default 2)
+        OFFLOAD_OPENCV_WORKERS  (default 2)
+    """
+
+    DEFAULT_SIZES = {"bcrypt": 2, "opencv": 2}
+
+    def __init__(self):
+        self.pools = {}
+        self.lock = threading.Lock()
+
+    def _pool(self, name: str) -> ThreadPoolExecutor:
+        pool = self.pools.get(name)
+        if pool is None:
+            with self.lock:
+                pool = self.pools.get(name)
+                if pool is None:
+                    size = int(
+                        os.getenv(f"OFFLOAD_{name.upper()}_WORKERS", self.DEFAULT_SIZES.get(name, 2))
+                    )
+                    pool = ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"offload-{name}")
+                    self.pools[name] = pool
+        return pool
+
+    async def run(self, name: str, fn, *args, **kwargs):
+        """
+        Await fn(*args, **kwargs) executed on the `name` pool.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool(name), functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self.lock:
+            pools, self.pools = self.pools, {}
+        for pool in pools.values():
+            pool.shutdown(wait=wait)
+
+
+offload = Offloader()
@@ -0,0 +1,169 @@
+import asyncio
+import os
+
+import requests
+from exponent_server_sdk import (
+    DeviceNotRegisteredError,
+    PushClient,
+    PushMessage,
+    PushServerError,
+    PushTicketError,
+)
+from requests.exceptions import ConnectionError, HTTPError
+
+from app.services.device_token_service import DeviceTokenService
+
+
+class PushDispatcher:
+    """
+    Sends Expo push notifications from a background task so routes never wait on the Expo round-trip.
+
+    send() only queues the message. The consumer groups queued messages into publish_multiple() calls of up to
+    batch_size messages, runs the blocking SDK call in a worker thread, retries failed batches with exponential
+    backoff and marks tokens Expo reports as DeviceNotRegistered inactive in `devicetokens`.
+
+    EXPO_PUSH_HOST overrides the Expo host, e.g. to point at a local fake push server.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 100,
+        flush_interval: float = 0.2,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+    ):
+        self.batch_size = batch_size  # Expo accepts up to 100 messages per request
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff  # seconds before the first retry, doubled on each further attempt
+        self.device_token_service = DeviceTokenService()
+        self.client = None
+        self.queue = None
+        self.task = None
+        self.retries = {}  # pending call_later handle: number of messages it requeues
+        self.sent = 0
+        self.failed = 0
+        self.deactivated = 0
+
+    def _create_client(self) -> PushClient:
+        session = requests.Session()
+        session.headers.update(
+            {
+                "Authorization": f"Bearer {os.getenv('EXPO_ACCESS_TOKEN', 'uoL08PbLeofLRDBCoqdojSWVr2E_tTAPt6KZjBBa')}",
+                "accept": "application/json",
+                "accept-encoding": "gzip, deflate",
+                "content-type": "application/json",
+            }
+        )
+        return PushClient(host=os.getenv("EXPO_PUSH_HOST"), session=session)
+
+    def send(self, token: str, message: str, extra: dict = None) -> None:
+        self.queue.put_nowait((PushMessage(to=token, body=message, data=extra), 0))
+
+    async def start(self) -> None:
+        self.client = self._create_client()
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._consume())
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        self._cancel_retries()
+        self.queue.put_nowait(None)  # send what is queued, then exit
+        await self.task
+        self._cancel_retries()  # scheduled by batches failing while the queue drained
+        self.task = None
+
+    def _cancel_retries(self) -> None:
+        # Retries not yet due are given up and counted as failed
+        for handle, count in self.retries.items():
+            handle.cancel()
+            self.failed += count
+        self.retries.clear()
+
+    async def _consume(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                try:
+                    item = (
+                        await asyncio.wait_for(self.queue.get(), timeout)
+                        if timeout > 0
+                        else self.queue.get_nowait()
+                    )
+                except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._publish(batch)
+
+    async def _publish(self, batch) -> None:
+        messages = [message for message, _ in batch]
+        try:
+            tickets = await asyncio.get_running_loop().run_in_executor(
+                None, self.client.publish_multiple, messages
+            )
+        except (PushServerError, ConnectionError, HTTPError) as exc:
+            print(f"Push batch of {len(messages)} failed: {exc}")
+            self._retry(batch, exc)
+            return
+        except Exception as exc:
+            print(f"Push batch of {len(messages)} dropped: {exc}")
+            self.failed += len(messages)
+            return
+
+        unregistered = []
+        for ticket in tickets:
+            try:
+                # We got a response back, but we don't know whether it's an error yet.
+                # This call raises errors so we can handle them with normal exception flows.
+                ticket.validate_response()
+                self.sent += 1
+            except DeviceNotRegisteredError:
+                unregistered.append(ticket.push_message.to)
+            except PushTicketError as exc:
+                self.failed += 1
+                print(f"Push to {ticket.push_message.to} rejected: {exc}")
+        if unregistered:
+            # Mark the push tokens as inactive
+            self.deactivated += await self.device_token_service.deactivate(unregistered)
+
+    def _retry(self, batch, exc) -> None:
+        response = getattr(exc, "response", None)
+        status_code = getattr(response, "status_code", None)
+        retryable = status_code is None or status_code == 429 or status_code >= 500
+        retry = [(message, attempt + 1) for message, attempt in batch if attempt < self.max_retries]
+        self.failed += len(batch) - (len(retry) if retryable else 0)
+        if not retryable or not retry:
+            return
+        delay = self.backoff * 2 ** min(attempt for _, attempt in batch)
+        loop = asyncio.get_running_loop()
+
+        def requeue():
+            self.retries.pop(handle, None)
+            for item in retry:
+                self.queue.put_nowait(item)
+
+        handle = loop.call_later(delay, requeue)
+        self.retries[handle] = len(retry)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize() if self.queue else 0,
+            "retrying": len(self.retries),
+            "sent": self.sent,
+            "failed": self.failed,
+            "deactivated": self.deactivated,
+        }
+
+
+push_dispatcher = PushDispatcher()
@@ -0,0 +1,10 @@
+"""
+Fastest available JSON response class: ORJSONResponse when orjson is installed, JSONResponse otherwise.
+Content must already be JSON-ready (no ObjectId/datetime), so both render the same body.
+"""
+
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:
+    from fastapi.responses import JSONResponse as FastJSONResponse
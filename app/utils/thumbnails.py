@@ -0,0 +1,81 @@
+import os
+import sys
+from pathlib import Path
+
+import cv2
+
+YOLO_ROOT = Path(__file__).resolve().parents[2] / "yolov5"
+if str(YOLO_ROOT) not in sys.path:
+    sys.path.append(str(YOLO_ROOT))  # yolov5 modules import each other as top-level `utils`/`models`
+
+from yolov5.utils.dataloaders import imread_reduced
+
+IMAGE_EXTENSIONS = (".bmp", ".jpeg", ".jpg", ".png", ".tif", ".tiff", ".webp")
+
+
+class ThumbnailService:
+    """
+    Writes small thumbnails of an uploaded image or video.
+
+    Only one frame is decoded: the first frame of a video (a keyframe, so nothing before it has to be decoded), or an
+    image read by imread_reduced(), which decodes JPEGs at 1/2, 1/4 or 1/8 scale while that still covers the biggest
+    thumbnail. The frame is downscaled with INTER_AREA to each configured size (longest side) and encoded as JPEG or
+    WebP, far cheaper than a full-resolution PNG. Configured from the environment:
+        THUMBNAIL_SIZES    comma-separated longest-side sizes in pixels, the first is the default thumbnail ("320")
+        THUMBNAIL_FORMAT   "jpg" or "webp" (default "jpg")
+        THUMBNAIL_QUALITY  encoder quality 0-100 (default 80)
+    """
+
+    def __init__(self):
+        self.sizes = [int(x) for x in os.getenv("THUMBNAIL_SIZES", "320").split(",")]
+        self.format = os.getenv("THUMBNAIL_FORMAT", "jpg").lower().lstrip(".")
+        self.quality = int(os.getenv("THUMBNAIL_QUALITY", 80))
+        flag = cv2.IMWRITE_WEBP_QUALITY if self.format == "webp" else cv2.IMWRITE_JPEG_QUALITY
+        self.params = [flag, self.quality]
+
+    def filenames(self, name: str, sizes: list = None) -> dict:
+        # Thumbnail file name per size for an uploaded file's stem; the encoder settings are part of the name so a
+        # changed THUMBNAIL_QUALITY or THUMBNAIL_FORMAT never serves files cached under the old settings
+        return {size: f"{name}_{size}_q{self.quality}.{self.format}" for size in sizes or self.sizes}
+
+    def read_image(self, source_path: str):
+        return imread_reduced(source_path, max(self.sizes))[0]  # same scale choice as detection
+
+    def read_keyframe(self, source_path: str):
+        if Path(source_path).suffix.lower() in IMAGE_EXTENSIONS:
+            return self.read_image(source_path)
+        cap = cv2.VideoCapture(source_path)
+        try:
+            success, frame = cap.read()
+            return frame if success else None
+        finally:
+            cap.release()
+
+    def generate(self, source_path: str, name: str, folder: str, sizes: list = None) -> list:
+        """
+        Blocking: write the thumbnails of source_path missing from folder, of the given sizes or all configured sizes.
+        Returns the file names written.
+        """
+        missing = {
+            size: filename
+            for size, filename in self.filenames(name, sizes).items()
+            if not os.path.exists(os.path.join(folder, filename))
+        }
+        if not missing:
+            return []
+        frame = self.read_keyframe(source_path)
+        if frame is None:
+            return []
+        h, w = frame.shape[:2]
+        written = []
+        for size, filename in missing.items():
+            r = size / max(h, w)
+            im = frame
+            if r < 1:  # never upscale
+                im = cv2.resize(frame, (max(round(w * r), 1), max(round(h * r), 1)), interpolation=cv2.INTER_AREA)
+            if cv2.imwrite(os.path.join(folder, filename), im, self.params):
+                written.append(filename)
+        return written
+
+
+thumbnail_service = ThumbnailService()
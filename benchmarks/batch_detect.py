@@ -0,0 +1,97 @@
+"""
+detect.py image throughput at several --batch-size values.
+
+Runs the detect.py loop (load, forward, NMS) over a directory of images with LoadImages at batch size 1 and with
+LoadImagesBatched at each --batch-sizes value, and reports images per second and the number of images whose
+detections differ from the batch size 1 run (compared regardless of the order of tied scores). Without --source,
+--count synthetic 1920x1080 JPEGs are written to a temporary directory first. --workers adds LoadImagesPrefetch under
+every run.
+
+Usage:
+    $ python benchmarks/batch_detect.py --weights yolov5/best.pt
+    $ python benchmarks/batch_detect.py --weights yolov5/best.pt --source datasets/archive --batch-sizes 4 8 16 --device 0
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from yolov5.model_registry import model_registry
+from utils.dataloaders import LoadImages, LoadImagesBatched, LoadImagesPrefetch  # top-level, as detect.py imports them
+from yolov5.utils.general import non_max_suppression
+
+
+def make_images(folder, count, size=(1920, 1080)):
+    rng = np.random.default_rng(0)
+    base = cv2.GaussianBlur(rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8), (0, 0), 4)
+    for i in range(count):
+        cv2.imwrite(os.path.join(folder, f"{i:05d}.jpg"), np.roll(base, i * 7, axis=1))
+
+
+def same(a, b):
+    # Equal detections regardless of the order of tied scores
+    a, b = a.cpu().numpy(), b.cpu().numpy()
+    return a.shape == b.shape and np.array_equal(a[np.lexsort(a.T)], b[np.lexsort(b.T)])
+
+
+@torch.no_grad()
+def run(dataset, model, opt):
+    results = {}
+    t = time.perf_counter()
+    for path, im, im0s, vid_cap, s in dataset:
+        im = torch.from_numpy(im).to(model.device)
+        im = im.half() if model.fp16 else im.float()  # uint8 to fp16/32
+        im /= 255  # 0 - 255 to 0.0 - 1.0
+        if len(im.shape) == 3:
+            im, path = im[None], [path]
+        pred = non_max_suppression(model(im), opt.conf_thres, opt.iou_thres, max_det=opt.max_det)
+        results.update(zip(path, pred))
+    return results, time.perf_counter() - t
+
+
+def main(opt):
+    loaded = model_registry.get(opt.weights, device=opt.device, imgsz=(opt.imgsz, opt.imgsz))
+    with tempfile.TemporaryDirectory() as tmp:
+        source = opt.source
+        if not source:
+            source = tmp
+            make_images(source, opt.count)
+
+        def load():
+            dataset = LoadImages(source, img_size=loaded.imgsz, stride=loaded.stride, auto=loaded.pt)
+            return LoadImagesPrefetch(dataset, workers=opt.workers) if opt.workers else dataset
+
+        reference, t0 = run(load(), loaded.model, opt)
+        print(f"{len(reference)} images, load + forward + NMS")
+        print(f"{'batch':>5s} {'img/s':>8s} {'speed-up':>9s}  differing")
+        print(f"{1:5d} {len(reference) / t0:8.1f} {1:8.2f}x")
+        for bs in opt.batch_sizes:
+            results, t = run(LoadImagesBatched(load(), bs), loaded.model, opt)
+            differing = sum(not same(det, results[p]) for p, det in reference.items())
+            print(f"{bs:5d} {len(results) / t:8.1f} {t0 / t:8.2f}x  {differing}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", default=str(ROOT / "yolov5" / "best.pt"), help="model path")
+    parser.add_argument("--source", default="", help="directory of images, synthetic JPEGs if empty")
+    parser.add_argument("--count", type=int, default=256, help="synthetic images to write without --source")
+    parser.add_argument("--device", default="", help="cuda device, i.e. 0 or cpu")
+    parser.add_argument("--imgsz", type=int, default=640, help="inference size")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[2, 4, 8, 16], help="batch sizes")
+    parser.add_argument("--workers", type=int, default=0, help="prefetch threads under every run, 0 for none")
+    parser.add_argument("--conf-thres", type=float, default=0.25, help="confidence threshold")
+    parser.add_argument("--iou-thres", type=float, default=0.45, help="NMS IoU threshold")
+    parser.add_argument("--max-det", type=int, default=1000, help="maximum detections per image")
+    main(parser.parse_args())
@@ -0,0 +1,94 @@
+"""
+Latency a detection worker pays to hand off its results: loopback HTTP POSTs vs the in-process event bus.
+
+Each detection sends two records (history + notification). The HTTP path mirrors what YoloDetect used to do,
+requests.post() with a new TCP connection per call to a local server. The bus path measures the publish() calls the
+worker makes now, and reports the bus delivery latency to the (no-op) handlers separately.
+
+Usage:
+    $ python benchmarks/callback_latency.py --detections 500
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.utils.event_bus import EventBus
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        data = json.dumps({"data": json.loads(body)}).encode()
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def bench_http(n):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api"
+    t = time.perf_counter()
+    for i in range(n):
+        requests.post(f"{url}/history", json={"user_id": "u", "result_path": f"{i}.jpg", "status": True}).json()
+        requests.post(f"{url}/notification", json={"user_id": "u", "detection_path": f"{i}.jpg"}).json()
+    dt = time.perf_counter() - t
+    server.shutdown()
+    return dt / n
+
+
+async def bench_bus(n):
+    bus = EventBus()
+    delivered = asyncio.Event()
+
+    async def handler(payloads):
+        if bus.delivered + len(payloads) >= 2 * n:
+            delivered.set()
+
+    bus.subscribe("history", handler)
+    bus.subscribe("notification", handler)
+    await bus.start()
+
+    def worker():
+        t = time.perf_counter()
+        for i in range(n):
+            bus.publish("history", {"user_id": "u", "result_path": f"{i}.jpg", "status": True})
+            bus.publish("notification", {"user_id": "u", "detection_path": f"{i}.jpg"})
+        return (time.perf_counter() - t) / n
+
+    per_detection = await asyncio.get_running_loop().run_in_executor(None, worker)  # publish from a worker thread
+    await delivered.wait()
+    await bus.stop()
+    return per_detection, bus.stats()
+
+
+def main(opt):
+    http = bench_http(opt.detections)
+    bus, stats = asyncio.run(bench_bus(opt.detections))
+    print(f"loopback HTTP : {http * 1e3:8.3f} ms per detection (blocking)")
+    print(f"event bus     : {bus * 1e3:8.3f} ms per detection (blocking), "
+          f"delivery avg {stats['avg_latency_ms']:.2f} ms / max {stats['max_latency_ms']:.2f} ms (async)")
+    print(f"saved         : {(http - bus) * 1e3:8.3f} ms per detection on the worker thread")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--detections", type=int, default=500, help="number of simulated detections")
+    main(parser.parse_args())
@@ -0,0 +1,119 @@
+"""
+p50/p99 latency of an unrelated endpoint (GET /) while logins (bcrypt) and video uploads (OpenCV thumbnail) run.
+
+Runs the FastAPI app in-process over httpx's ASGI transport, against mongomock-motor unless --mongo-url is given.
+--inline runs the bcrypt/OpenCV work directly on the event loop, as the handlers did before the offload pools.
+
+Usage:
+    $ python benchmarks/event_loop_latency.py
+    $ python benchmarks/event_loop_latency.py --inline
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import httpx
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+os.environ.setdefault("JWT_SECRET", "benchmark")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+
+import main
+from app.config.mongo_service import db_mongo
+from app.utils.offload import offload
+from constants import Constants
+
+
+def make_video(path, frames=30, size=(1920, 1080)):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 30, size)
+    rng = np.random.default_rng(0)
+    for _ in range(frames):
+        writer.write(rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8))
+    writer.release()
+    return Path(path).read_bytes()
+
+
+async def probe(client, stop, latencies):
+    while not stop.is_set():
+        t = time.perf_counter()
+        await client.get("/")
+        latencies.append(time.perf_counter() - t)
+        await asyncio.sleep(0.005)
+
+
+async def logins(client, n):
+    for _ in range(n):
+        await client.post("/api/users/login", json={"username": "bench", "password": "bench-password"})
+
+
+async def uploads(client, video, n):
+    for i in range(n):
+        r = await client.post("/api/upload/file", files={"file": (f"bench{i}.mp4", video, "video/mp4")})
+        if r.status_code == 200:  # remove what the upload stored
+            (ROOT / Constants.PUBLIC_FOLDER / r.json()["path"]).unlink(missing_ok=True)
+            for thumbnail in r.json()["thumbnails"].values():
+                (ROOT / Constants.THUMBNAIL_FOLDER / thumbnail).unlink(missing_ok=True)
+
+
+async def run(opt):
+    if opt.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        db_mongo.mongo_client = AsyncIOMotorClient(opt.mongo_url)
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+
+        db_mongo.mongo_client = AsyncMongoMockClient()
+    db_mongo.db_name = "benchmark"
+    if opt.inline:
+        async def inline(name, fn, *args, **kwargs):
+            return fn(*args, **kwargs)
+
+        offload.run = inline
+    main.configure()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video = make_video(Path(tmp) / "bench.mp4")
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        await client.post("/api/users/signup",
+                          json={"username": "bench", "full_name": "Bench", "password": "bench-password"})
+
+        idle = []
+        stop = asyncio.Event()
+        task = asyncio.create_task(probe(client, stop, idle))
+        await asyncio.sleep(1)
+        stop.set()
+        await task
+
+        busy = []
+        stop = asyncio.Event()
+        task = asyncio.create_task(probe(client, stop, busy))
+        await asyncio.gather(*[logins(client, opt.logins) for _ in range(opt.concurrency)],
+                             *[uploads(client, video, opt.uploads) for _ in range(opt.concurrency)])
+        stop.set()
+        await task
+
+    for name, lat in (("idle", idle), ("under load", busy)):
+        q = statistics.quantiles([x * 1e3 for x in lat], n=100)
+        print(f"GET / {name:10s}: n={len(lat):5d}  p50 {q[49]:7.2f} ms  p99 {q[98]:7.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--inline", action="store_true", help="run bcrypt/OpenCV work on the event loop (old behavior)")
+    parser.add_argument("--logins", type=int, default=10, help="logins per client")
+    parser.add_argument("--uploads", type=int, default=3, help="uploads per client")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent login and upload clients")
+    parser.add_argument("--mongo-url", default="", help="MongoDB URL, mongomock-motor if empty")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,109 @@
+"""
+Latency of deep pages of the history feed: offset pagination (skip) vs keyset pagination (?after=<created_at,_id>).
+
+Seeds `histories` for a number of users, creates the startup indexes and times MongoService.get_all with a skip
+against MongoService.get_page with the cursor of the same page. Use --mongo-url for a real mongod, where the
+indexes are used; mongomock-motor has no query planner and only shows the client-side cost.
+
+Usage:
+    $ python benchmarks/feed_pagination.py --docs 100000
+    $ python benchmarks/feed_pagination.py --mongo-url mongodb://localhost:27017 --docs 1000000
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from bson import ObjectId
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.config.mongo_service import db_mongo
+from app.schemas.history import HistorySchema
+
+
+async def seed(opt):
+    collection = db_mongo.mongo_client[db_mongo.db_name]["histories"]
+    await collection.drop()
+    start = datetime(2024, 1, 1)
+    chunk = []
+    for i in range(opt.docs):
+        # Several documents share a timestamp, as the batched event bus inserts do
+        created_at = start + timedelta(milliseconds=(i // 4) * 10)
+        chunk.append({
+            "_id": str(ObjectId()),  # stored as a string, like documents written through jsonable_encoder
+            "user_id": f"user{i % opt.users}",
+            "result_path": f"{i}.jpg",
+            "status": bool(i % 2),
+            "source": f"{i}.jpg",
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+        if len(chunk) == 10000:
+            await collection.insert_many(chunk, ordered=False)
+            chunk = []
+    if chunk:
+        await collection.insert_many(chunk, ordered=False)
+    await db_mongo.create_indexes()
+
+
+async def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = await fn()
+        times.append(time.perf_counter() - t)
+    return statistics.median(times) * 1e3, result
+
+
+async def run(opt):
+    if opt.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        db_mongo.mongo_client = AsyncIOMotorClient(opt.mongo_url)
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+
+        db_mongo.mongo_client = AsyncMongoMockClient()
+    db_mongo.db_name = "benchmark"
+    t = time.perf_counter()
+    await seed(opt)
+    print(f"seeded {opt.docs} histories for {opt.users} users in {time.perf_counter() - t:.1f}s")
+
+    query = {"user_id": "user0"}
+    per_user = opt.docs // opt.users
+    print(f"{'page':>6s} {'skip ms':>10s} {'after ms':>10s}  same")
+    for depth in opt.pages:
+        if depth * opt.limit >= per_user:
+            continue
+        skip = depth * opt.limit
+        skip_ms, by_skip = await timed(lambda: db_mongo.get_all(
+            "histories", skip=skip, limit=opt.limit, model_cls=HistorySchema, query=query), opt.repeat)
+        # Cursor of the last document of the previous page, as a client walking the feed would hold
+        after = None
+        if skip:
+            previous = await db_mongo.get_all(
+                "histories", skip=skip - 1, limit=1, model_cls=HistorySchema, query=query)
+            after = db_mongo.encode_cursor({"created_at": previous[0].created_at, "_id": previous[0].id})
+        after_ms, (by_after, _) = await timed(lambda: db_mongo.get_page(
+            "histories", limit=opt.limit, after=after, model_cls=HistorySchema, query=query), opt.repeat)
+        same = [h.id for h in by_skip] == [h.id for h in by_after]
+        print(f"{depth:6d} {skip_ms:10.2f} {after_ms:10.2f}  {same}")
+    await db_mongo.mongo_client[db_mongo.db_name]["histories"].drop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=100000, help="histories to seed")
+    parser.add_argument("--users", type=int, default=10, help="users the histories are spread over")
+    parser.add_argument("--limit", type=int, default=10, help="page size")
+    parser.add_argument("--pages", type=int, nargs="+", default=[0, 10, 100, 1000, 5000], help="page depths")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per page, median reported")
+    parser.add_argument("--mongo-url", default="", help="MongoDB URL, mongomock-motor if empty")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,79 @@
+"""
+Per-page CPU cost of rendering a history feed page: Pydantic models + jsonable_encoder + JSONResponse (the old
+list path) vs the projected raw-dict path + FastJSONResponse (orjson when installed).
+
+Both paths read the same page from mongomock-motor, so the numbers include the driver-side decode; the database
+round-trip itself is not part of the comparison.
+
+Usage:
+    $ python benchmarks/feed_serialization.py --limit 100 --repeat 200
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.config.mongo_service import db_mongo
+from app.schemas.history import HistorySchema
+from app.utils.responses import FastJSONResponse
+
+
+async def model_page(limit):
+    result, next_cursor = await db_mongo.get_page(
+        "histories", limit=limit, model_cls=HistorySchema, query={"user_id": "u"})
+    return JSONResponse(content={"data": jsonable_encoder(result), "next": next_cursor}).body
+
+
+async def raw_page(limit):
+    result, next_cursor = await db_mongo.get_page_raw(
+        "histories", limit=limit, model_cls=HistorySchema, query={"user_id": "u"})
+    return FastJSONResponse(content={"data": result, "next": next_cursor}).body
+
+
+async def run(opt):
+    from mongomock_motor import AsyncMongoMockClient
+
+    db_mongo.mongo_client = AsyncMongoMockClient()
+    db_mongo.db_name = "benchmark"
+    start = datetime(2024, 1, 1, 12, 0, 0, 123000)
+    await db_mongo.mongo_client[db_mongo.db_name]["histories"].insert_many([
+        {
+            "_id": str(ObjectId()),  # stored as a string, like documents written through jsonable_encoder
+            "user_id": "u",
+            "result_path": f"{i}_result.jpg",
+            "status": bool(i % 2),
+            "detections_path": f"{i}.jsonl",
+            "source": f"{i}.mp4",
+            "boxes": [[0.1, 0.2, 0.3, 0.4, 0.9, 0]] * 20,  # a field the list endpoint does not return
+            "created_at": start + timedelta(seconds=i),
+            "updated_at": start + timedelta(seconds=i),
+        }
+        for i in range(opt.limit)
+    ])
+
+    import json
+    same = json.loads(await model_page(opt.limit)) == json.loads(await raw_page(opt.limit))
+    print(f"identical JSON: {same}  ({FastJSONResponse.__name__})")
+    for name, fn in (("model + jsonable_encoder", model_page), ("projection + raw", raw_page)):
+        t = time.process_time()
+        for _ in range(opt.repeat):
+            await fn(opt.limit)
+        print(f"{name:26s}: {(time.process_time() - t) / opt.repeat * 1e3:7.3f} ms CPU per {opt.limit}-item page")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=100, help="page size")
+    parser.add_argument("--repeat", type=int, default=200, help="pages rendered per path")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,99 @@
+"""
+Frame-difference gate on a fixed-camera clip: skip rate, speed-up and agreement with running every frame.
+
+Runs the clip twice through the micro-batcher, once inferring every frame and once behind FrameGate, and compares
+the detections frame by frame: a frame agrees when both runs have the same number of boxes and every box of the
+full run has an IoU >= 0.5 match in the gated run. Without --source a synthetic clip is used: a static noisy scene
+with a bright patch that moves for a short stretch. --check exits non-zero when agreement falls below the given
+fraction, so the script doubles as a correctness check of the gate.
+
+Usage:
+    $ python benchmarks/frame_gate.py --weights yolov5/best.pt
+    $ python benchmarks/frame_gate.py --weights yolov5/best.pt --source public/files/beach.mp4 --check 0.95
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from yolov5.event_tracker import box_iou
+from yolov5.frame_gate import FrameGate
+from yolov5.model_registry import model_registry
+from yolov5.video_pipeline import FrameReader
+
+
+def make_clip(path, frames=300, size=(1280, 720)):
+    rng = np.random.default_rng(0)
+    scene = cv2.GaussianBlur(rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8), (0, 0), 8)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 30, size)
+    for i in range(frames):
+        im = cv2.add(scene, rng.integers(0, 3, scene.shape, dtype=np.uint8))  # sensor noise
+        if frames // 3 <= i < frames // 2:  # something moves through the scene
+            x = 100 + 8 * (i - frames // 3)
+            cv2.rectangle(im, (x, 300), (x + 200, 500), (255, 255, 255), -1)
+        writer.write(im)
+    writer.release()
+
+
+def run(batcher, source, gate, opt):
+    dets, det, calls = [], None, 0
+    reader = FrameReader(source)
+    t = time.perf_counter()
+    try:
+        for _, frame in reader:
+            if det is None or gate is None or gate.changed(frame):
+                det = batcher(frame, conf_thres=opt.conf_thres).numpy()
+                calls += 1
+            dets.append(det)
+    finally:
+        reader.close()
+    return dets, calls, time.perf_counter() - t
+
+
+def agree(a, b):
+    if len(a) != len(b):
+        return False
+    return not len(a) or bool((box_iou(a[:, :4], b[:, :4]).max(1) >= 0.5).all())
+
+
+def main(opt):
+    loaded = model_registry.get(opt.weights, device=opt.device, imgsz=(opt.imgsz, opt.imgsz))
+    with tempfile.TemporaryDirectory() as tmp:
+        source = opt.source
+        if not source:
+            source = os.path.join(tmp, "static.mp4")
+            make_clip(source)
+        full, full_calls, full_t = run(loaded.batcher, source, None, opt)
+        gate = FrameGate(threshold=opt.threshold)
+        gated, gated_calls, gated_t = run(loaded.batcher, source, gate, opt)
+
+    agreement = sum(agree(a, b) for a, b in zip(full, gated)) / len(full)
+    print(f"frames          : {len(full)}")
+    print(f"every frame     : {full_calls:5d} inferences  {full_t:6.2f}s")
+    print(f"gated           : {gated_calls:5d} inferences  {gated_t:6.2f}s  "
+          f"(skip rate {gate.stats()['skip_rate']:.1%}, {full_t / max(gated_t, 1e-9):.2f}x)")
+    print(f"agreement       : {agreement:.1%} of frames")
+    if opt.check is not None and agreement < opt.check:
+        sys.exit(f"agreement {agreement:.1%} below {opt.check:.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", default=str(ROOT / "yolov5" / "best.pt"), help="model path")
+    parser.add_argument("--source", default="", help="video file, synthetic static clip if empty")
+    parser.add_argument("--device", default="", help="cuda device, i.e. 0 or cpu")
+    parser.add_argument("--imgsz", type=int, default=640, help="inference size")
+    parser.add_argument("--conf-thres", type=float, default=0.25, help="confidence threshold")
+    parser.add_argument("--threshold", type=float, default=None, help="gate threshold, FRAME_GATE_THRESHOLD if unset")
+    parser.add_argument("--check", type=float, default=None, help="minimum agreement, exit 1 below it")
+    main(parser.parse_args())
@@ -0,0 +1,163 @@
+"""
+LoadStreams frame handling: the previous per-grab allocation against FrameRing, in one process and across processes.
+
+A writer thread stands in for a camera: it produces --fps frames of --shape per second for --seconds, numbering every
+frame in its first pixels. A reader standing in for inference takes the latest frame every --infer-ms milliseconds.
+"previous" stores a newly allocated frame per grab in a list and the reader copies it, like LoadStreams did; "ring"
+decodes into FrameRing slots; "ring-process" reads the same shared ring from a separate process. The script checks
+every frame read carries the number it was returned with (no torn frames), then reports frames read, dropped and
+repeated, the reader's ms per frame and the peak memory allocated while frames flow (tracemalloc).
+
+Usage:
+    $ python benchmarks/frame_ring.py
+    $ python benchmarks/frame_ring.py --fps 60 --infer-ms 40 --shape 2160 3840 --slots 8
+"""
+
+import argparse
+import multiprocessing
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from yolov5.utils.frame_ring import FrameRing
+
+
+def stamp(im, seq):
+    im.reshape(-1)[:8] = np.frombuffer(np.int64(seq).tobytes(), np.uint8)
+
+
+def stamped(im):
+    return int(np.frombuffer(im.reshape(-1)[:8].tobytes(), np.int64)[0])
+
+
+def write_frames(store, sources, opt, stop):
+    # store(seq, source) puts frame `seq`, decoded from one of the sources, wherever the mode keeps frames
+    t0 = time.monotonic()
+    for seq in range(1, int(opt.fps * opt.seconds) + 1):
+        store(seq, sources[seq % len(sources)])
+        time.sleep(max(t0 + seq / opt.fps - time.monotonic(), 0))
+    stop.set()
+
+
+def read_frames(latest, opt, stop):
+    # latest() returns (seq, frame) of the newest frame; returns (frames read, repeats, seconds spent reading)
+    read, repeats, previous, t = 0, 0, 0, 0.0
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        item = latest()
+        t += time.perf_counter() - t0
+        if item is not None:
+            seq, frame = item
+            if stamped(frame) != seq:
+                sys.exit(f"torn frame: read {stamped(frame)} as {seq}")
+            read, repeats, previous = read + 1, repeats + (seq == previous), seq
+        time.sleep(opt.infer_ms / 1E3)
+    return read, repeats, t
+
+
+def previous_mode():
+    imgs, seqs = [None], [0]
+
+    def store(seq, source):
+        im = source.copy()  # cap.retrieve() allocates every frame
+        stamp(im, seq)
+        imgs[0], seqs[0] = im, seq
+
+    def latest():
+        seq, im = seqs[0], imgs[0]
+        return None if im is None else (seq, im.copy())  # LoadStreams copied the list, letterbox copied the frame
+
+    return store, latest
+
+
+def ring_mode(ring, opt):
+    out = np.empty((*opt.shape, 3), np.uint8)
+
+    def store(seq, source):
+        slot = ring.claim()
+        np.copyto(slot, source)  # cap.retrieve(slot) decodes in place
+        stamp(slot, seq)
+        ring.commit()
+
+    def latest():
+        item = ring.latest(out, timeout=2 / opt.fps)
+        return item and (item[0], out.copy())  # LoadStreams returns a copy of the frame
+
+    return store, latest
+
+
+def ring_reader(name, opt, stop, result):
+    # Separate process: attach to the capture process's ring by name
+    ring = FrameRing.attach(name)
+    out = np.empty(ring.shape, np.uint8)
+
+    def latest():
+        item = ring.latest(out, timeout=2 / opt.fps)
+        return item and (item[0], out.copy())  # LoadStreams returns a copy of the frame
+
+    read, repeats, t = read_frames(latest, opt, stop)
+    result.put((read, repeats, t, ring.dropped))
+    ring.close()
+
+
+def report(name, written, read, repeats, dropped, t, peak):
+    print(f"{name:13s} {written:8d} {read:6d} {dropped:8d} {repeats:8d} {t / max(read, 1) * 1E3:9.3f}ms "
+          f"{peak / 1E6:8.1f}MB")
+
+
+def main(opt):
+    written = int(opt.fps * opt.seconds)
+    sources = [np.full((*opt.shape, 3), i * 40, dtype=np.uint8) for i in range(4)]  # decoded pictures
+    print(f"{'mode':13s} {'written':>8s} {'read':>6s} {'dropped':>8s} {'repeated':>8s} {'read/frame':>11s} "
+          f"{'peak alloc':>10s}")
+
+    for name in ("previous", "ring"):
+        ring = FrameRing((*opt.shape, 3), slots=opt.slots) if name == "ring" else None
+        store, latest = ring_mode(ring, opt) if ring else previous_mode()
+        stop = threading.Event()
+        tracemalloc.start()
+        writer = threading.Thread(target=write_frames, args=(store, sources, opt, stop))
+        writer.start()
+        read, repeats, t = read_frames(latest, opt, stop)
+        writer.join()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        # previous: the reader cannot tell dropped frames, they are counted here from the numbers it saw
+        dropped = ring.dropped if ring else written - (read - repeats)
+        report(name, written, read, repeats, dropped, t, peak)
+
+    ctx = multiprocessing.get_context("spawn")
+    ring = FrameRing((*opt.shape, 3), slots=opt.slots, shared=True)
+    store, _ = ring_mode(ring, opt)
+    stop, result = ctx.Event(), ctx.Queue()
+    reader = ctx.Process(target=ring_reader, args=(ring.name, opt, stop, result))
+    reader.start()
+    time.sleep(1)  # reader process start-up
+    tracemalloc.start()
+    write_frames(store, sources, opt, stop)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    read, repeats, t, dropped = result.get()
+    reader.join()
+    if reader.exitcode:
+        sys.exit(f"reader process failed with exit code {reader.exitcode}")
+    report("ring-process", written, read, repeats, dropped, t, peak)
+    ring.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fps", type=float, default=30, help="frames written per second")
+    parser.add_argument("--seconds", type=float, default=5, help="capture duration")
+    parser.add_argument("--infer-ms", type=float, default=50, help="reader time per frame, stands in for inference")
+    parser.add_argument("--shape", nargs=2, type=int, default=[1080, 1920], help="frame height width")
+    parser.add_argument("--slots", type=int, default=4, help="FrameRing slots")
+    main(parser.parse_args())
@@ -0,0 +1,102 @@
+"""
+JPEG decode throughput: full-resolution cv2.imread() against imread_reduced(), both followed by the resize to --imgsz.
+
+imread_reduced() decodes at 1/2, 1/4 or 1/8 scale in the DCT domain while the longest side stays at least --imgsz, the
+scale chosen from the header dimensions. For every --sizes source resolution the script reports images per second of
+decode alone and of decode + resize to --imgsz, the scale picked, and the mean absolute pixel difference of the resized
+images against the full-resolution path. Without --source, --count synthetic JPEGs per size are written to a temporary
+directory first.
+
+Usage:
+    $ python benchmarks/jpeg_decode.py
+    $ python benchmarks/jpeg_decode.py --source datasets/archive/images --imgsz 640 1280
+"""
+
+import argparse
+import glob
+import math
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+if str(ROOT / "yolov5") not in sys.path:
+    sys.path.append(str(ROOT / "yolov5"))  # yolov5 modules import each other as top-level `utils`/`models`
+
+from yolov5.utils.dataloaders import imread_reduced
+
+
+def make_images(folder, count, size):
+    w, h = size
+    rng = np.random.default_rng(0)
+    base = cv2.GaussianBlur(rng.integers(0, 255, (h, w, 3), dtype=np.uint8), (0, 0), 3)
+    files = []
+    for i in range(count):
+        files.append(os.path.join(folder, f"{w}x{h}_{i:03d}.jpg"))
+        cv2.imwrite(files[-1], np.roll(base, i * 7, axis=1), [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return files
+
+
+def resize(im, hw0, imgsz):
+    # LoadImagesAndLabels.load_image() resize of the original size hw0 to imgsz
+    h0, w0 = hw0
+    r = imgsz / max(h0, w0)
+    return cv2.resize(im, (math.ceil(w0 * r), math.ceil(h0 * r)), interpolation=cv2.INTER_AREA) if r < 1 else im
+
+
+def full(f, imgsz):
+    im = cv2.imread(f)
+    return im, im.shape[:2]
+
+
+def timed(fn, files, imgsz, runs):
+    out = [fn(f, imgsz) for f in files]  # warmup, and the images to compare
+    t = time.perf_counter()
+    for _ in range(runs):
+        for f in files:
+            fn(f, imgsz)
+    decode = len(files) * runs / (time.perf_counter() - t)
+    t = time.perf_counter()
+    for _ in range(runs):
+        for f in files:
+            resize(*fn(f, imgsz), imgsz)
+    total = len(files) * runs / (time.perf_counter() - t)
+    return out, decode, total
+
+
+def main(opt):
+    with tempfile.TemporaryDirectory() as tmp:
+        if opt.source:
+            files = sorted(glob.glob(os.path.join(opt.source, "*.jp*g")))[:opt.count]
+            groups = {"source": files}
+        else:
+            groups = {f"{w}x{h}": make_images(tmp, opt.count, (w, h)) for w, h in opt.sizes}
+        print(f"{'images':>12s} {'imgsz':>6s} {'scale':>6s} {'full decode':>12s} {'reduced':>9s} {'full+resize':>12s} "
+              f"{'reduced+resize':>15s} {'mean abs diff':>14s}")
+        for name, files in groups.items():
+            for imgsz in opt.imgsz:
+                ref, full_decode, full_total = timed(full, files, imgsz, opt.runs)
+                red, red_decode, red_total = timed(imread_reduced, files, imgsz, opt.runs)
+                scale = max(ref[0][0].shape) / max(red[0][0].shape)
+                diff = np.mean([
+                    np.abs(resize(*a, imgsz).astype(np.int16) - resize(*b, imgsz)).mean() for a, b in zip(ref, red)])
+                print(f"{name:>12s} {imgsz:6d} {f'1/{scale:.0f}':>6s} {full_decode:8.1f}/s {red_decode:7.1f}/s "
+                      f"{full_total:10.1f}/s {red_total:13.1f}/s {diff:14.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", default="", help="directory of JPEGs, synthetic JPEGs of --sizes if empty")
+    parser.add_argument("--sizes", nargs="+", type=lambda s: tuple(map(int, s.split("x"))),
+                        default=[(1920, 1080), (4000, 3000), (6000, 4000)], help="synthetic JPEG sizes, WxH")
+    parser.add_argument("--count", type=int, default=20, help="images per size")
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[640], help="target sizes, longest side")
+    parser.add_argument("--runs", type=int, default=3, help="timed passes over the images")
+    main(parser.parse_args())
@@ -0,0 +1,85 @@
+"""
+non_max_suppression over a whole batch versus image by image, across batch sizes.
+
+The per-image run calls non_max_suppression once per image, which is what the micro-batcher paid before NMS was
+batched (one torchvision.ops.nms call per image). Both runs must return the same detections, up to the order of
+equal scores; the script exits non-zero otherwise. Predictions are synthetic, shaped like YOLOv5 output at --imgsz
+(25200 anchors at 640), with --candidates of the anchors above the confidence threshold.
+
+Usage:
+    $ python benchmarks/nms_batch.py
+    $ python benchmarks/nms_batch.py --batch-sizes 1 8 32 64 --nc 1 --device 0
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+if str(ROOT / "yolov5") not in sys.path:
+    sys.path.append(str(ROOT / "yolov5"))  # yolov5 modules import each other as top-level `utils`/`models`
+
+from yolov5.utils.general import non_max_suppression
+from yolov5.utils.torch_utils import select_device
+
+
+def make_prediction(bs, opt, device):
+    n = sum(3 * (opt.imgsz // s) ** 2 for s in (8, 16, 32))  # anchors of the three detection layers
+    g = torch.Generator().manual_seed(0)
+    p = torch.rand(bs, n, 5 + opt.nc, generator=g)
+    p[..., :2] *= opt.imgsz  # centers
+    p[..., 2:4] = p[..., 2:4] * 150 + 5  # sizes
+    above = torch.rand(bs, n, generator=g) < opt.candidates  # objectness, mostly low like a trained model
+    p[..., 4] = torch.where(above, opt.conf_thres + p[..., 4] * (1 - opt.conf_thres), p[..., 4] * opt.conf_thres)
+    p[..., 5:] = 1  # class confidence, so candidates survive obj * cls
+    return p.to(device)
+
+
+def same(a, b):
+    # Equal detections regardless of the order of tied scores
+    a, b = a.cpu().numpy(), b.cpu().numpy()
+    return a.shape == b.shape and np.array_equal(a[np.lexsort(a.T)], b[np.lexsort(b.T)])
+
+
+def timed(fn, runs):
+    fn()  # warmup
+    t = time.perf_counter()
+    for _ in range(runs):
+        out = fn()
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    return out, (time.perf_counter() - t) / runs
+
+
+def main(opt):
+    device = select_device(opt.device)
+    print(f"{'batch':>5s} {'per image':>12s} {'batched':>12s} {'speed-up':>9s}  detections")
+    for bs in opt.batch_sizes:
+        p = make_prediction(bs, opt, device)
+        nms = lambda x: non_max_suppression(x, opt.conf_thres, opt.iou_thres, max_det=opt.max_det)
+        single, t_single = timed(lambda: [nms(p[i:i + 1])[0] for i in range(bs)], opt.runs)
+        batched, t_batched = timed(lambda: nms(p), opt.runs)
+        if not all(same(a, b) for a, b in zip(single, batched)):
+            sys.exit(f"batch {bs}: batched NMS differs from per-image NMS")
+        print(f"{bs:5d} {t_single * 1E3:10.2f}ms {t_batched * 1E3:10.2f}ms {t_single / t_batched:8.2f}x  "
+              f"{sum(map(len, batched))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 4, 8, 16, 32, 64], help="batch sizes")
+    parser.add_argument("--device", default="", help="cuda device, i.e. 0 or cpu")
+    parser.add_argument("--imgsz", type=int, default=640, help="inference size the predictions are shaped for")
+    parser.add_argument("--nc", type=int, default=1, help="number of classes")
+    parser.add_argument("--conf-thres", type=float, default=0.25, help="confidence threshold")
+    parser.add_argument("--iou-thres", type=float, default=0.45, help="NMS IoU threshold")
+    parser.add_argument("--candidates", type=float, default=0.005, help="fraction of anchors above --conf-thres")
+    parser.add_argument("--max-det", type=int, default=1000, help="maximum detections per image")
+    parser.add_argument("--runs", type=int, default=10, help="timed runs per batch size")
+    main(parser.parse_args())
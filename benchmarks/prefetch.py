@@ -0,0 +1,83 @@
+"""
+detect.py image throughput with the ordered prefetch loader at several worker counts.
+
+Runs the detect.py loop (load, forward at batch size 1, NMS) over a directory of images, once serially with
+LoadImages and once per --workers value with LoadImagesPrefetch, and checks every run sees the images in the same
+order. Without --source, --count synthetic 1920x1080 JPEGs are written to a temporary directory first. --no-model
+times the loader alone.
+
+Usage:
+    $ python benchmarks/prefetch.py --weights yolov5/best.pt
+    $ python benchmarks/prefetch.py --weights yolov5/best.pt --source datasets/archive --workers 1 2 4 8 --device 0
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from yolov5.model_registry import model_registry
+from utils.dataloaders import LoadImages, LoadImagesPrefetch  # top-level, as detect.py imports them
+from yolov5.utils.general import non_max_suppression
+
+
+def make_images(folder, count, size=(1920, 1080)):
+    rng = np.random.default_rng(0)
+    base = cv2.GaussianBlur(rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8), (0, 0), 4)
+    for i in range(count):
+        cv2.imwrite(os.path.join(folder, f"{i:05d}.jpg"), np.roll(base, i * 7, axis=1))
+
+
+@torch.no_grad()
+def run(dataset, model):
+    paths = []
+    t = time.perf_counter()
+    for path, im, im0s, vid_cap, s in dataset:
+        paths.append(path)
+        if model is not None:
+            im = torch.from_numpy(im).to(model.device)
+            im = im.half() if model.fp16 else im.float()  # uint8 to fp16/32
+            im /= 255  # 0 - 255 to 0.0 - 1.0
+            non_max_suppression(model(im[None]), 0.25, 0.45)
+    return paths, time.perf_counter() - t
+
+
+def main(opt):
+    loaded = model_registry.get(opt.weights, device=opt.device, imgsz=(opt.imgsz, opt.imgsz))
+    model = None if opt.no_model else loaded.model
+    with tempfile.TemporaryDirectory() as tmp:
+        source = opt.source
+        if not source:
+            source = tmp
+            make_images(source, opt.count)
+        load = lambda: LoadImages(source, img_size=loaded.imgsz, stride=loaded.stride, auto=loaded.pt)
+        reference, t0 = run(load(), model)
+        print(f"{len(reference)} images, {'loader only' if model is None else 'load + forward + NMS'}")
+        print(f"{'serial':>10s} {len(reference) / t0:8.1f} img/s")
+        for workers in opt.workers:
+            paths, t = run(LoadImagesPrefetch(load(), workers=workers), model)
+            if paths != reference:
+                sys.exit(f"workers {workers}: images out of order")
+            print(f"{f'{workers} workers':>10s} {len(paths) / t:8.1f} img/s  {t0 / t:5.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", default=str(ROOT / "yolov5" / "best.pt"), help="model path")
+    parser.add_argument("--source", default="", help="directory of images, synthetic JPEGs if empty")
+    parser.add_argument("--count", type=int, default=1000, help="synthetic images to write without --source")
+    parser.add_argument("--device", default="", help="cuda device, i.e. 0 or cpu")
+    parser.add_argument("--imgsz", type=int, default=640, help="inference size")
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4, 8], help="prefetch worker counts")
+    parser.add_argument("--no-model", action="store_true", help="time the loader alone")
+    main(parser.parse_args())
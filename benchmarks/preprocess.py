@@ -0,0 +1,88 @@
+"""
+Micro-batcher preprocessing: the previous letterbox/transpose/float path against Preprocessor.
+
+Both paths turn the same batch of BGR frames into model input; the script checks the inputs are identical, then
+reports ms per image and the bytes allocated per image. NumPy allocations are traced with tracemalloc, torch
+allocations with the torch profiler. For Preprocessor the per-stage times come from its own Profile objects.
+
+Usage:
+    $ python benchmarks/preprocess.py
+    $ python benchmarks/preprocess.py --device 0 --batch 16 --shape 2160 3840
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import torch
+from torch.profiler import ProfilerActivity, profile
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from yolov5.preprocessor import Preprocessor
+from yolov5.utils.augmentations import letterbox
+from yolov5.utils.torch_utils import select_device
+
+
+def allocated(fn):
+    # Bytes allocated by one call: NumPy (tracemalloc peak) and torch (profiler, allocations only)
+    tracemalloc.start()
+    fn()
+    numpy_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+        fn()
+    torch_bytes = sum(max(e.self_cpu_memory_usage, 0) + max(e.self_device_memory_usage, 0)
+                      for e in prof.key_averages())
+    return numpy_bytes, torch_bytes
+
+
+def main(opt):
+    device = select_device(opt.device)
+    rng = np.random.default_rng(0)
+    ims = [rng.integers(0, 255, (*opt.shape, 3), dtype=np.uint8) for _ in range(opt.batch)]
+    imgsz = (opt.imgsz, opt.imgsz)
+    pre = Preprocessor(imgsz, device, max_batch=opt.batch)
+
+    def previous():
+        x = [np.ascontiguousarray(letterbox(im, imgsz, auto=False)[0].transpose((2, 0, 1))[::-1]) for im in ims]
+        im = torch.from_numpy(np.stack(x)).to(device)
+        im = im.float()  # uint8 to fp32
+        im /= 255  # 0 - 255 to 0.0 - 1.0
+        return im
+
+    def preprocessor():
+        slots = [pre.load(im)[0] for im in ims]
+        im = pre.batch(slots)
+        pre.release(slots)
+        return im
+
+    if not torch.equal(previous(), preprocessor()):
+        sys.exit("Preprocessor input differs from the previous path")
+    for name, fn in (("previous", previous), ("preprocessor", preprocessor)):
+        fn()  # warmup
+        t = time.perf_counter()
+        for _ in range(opt.runs):
+            fn()
+        if device.type == "cuda":
+            torch.cuda.synchronize()
+        t = (time.perf_counter() - t) / opt.runs / opt.batch
+        numpy_bytes, torch_bytes = allocated(fn)
+        print(f"{name:13s} {t * 1E3:7.2f}ms/img  allocated {numpy_bytes / opt.batch / 1E6:6.2f}MB numpy "
+              f"{torch_bytes / opt.batch / 1E6:6.2f}MB torch per image")
+    print(f"preprocessor stages (ms/img): {pre.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--device", default="", help="cuda device, i.e. 0 or cpu")
+    parser.add_argument("--imgsz", type=int, default=640, help="inference size")
+    parser.add_argument("--batch", type=int, default=8, help="images per batch")
+    parser.add_argument("--shape", nargs=2, type=int, default=[720, 1280], help="source frame height width")
+    parser.add_argument("--runs", type=int, default=20, help="timed runs")
+    main(parser.parse_args())
@@ -0,0 +1,96 @@
+"""
+Single-class Detect() head: head (output conv + decode) and NMS time per image, generic head versus the fused
+obj * cls head that only decodes anchors above the confidence threshold.
+
+The feature maps entering the head are captured from one real forward pass over --batch random images (or --source
+images), then the head and non_max_suppression are timed on their own, since the backbone is the same in both modes.
+Both modes must give identical detections; the script exits non-zero otherwise. The weights must be single-class,
+like best.pt.
+
+Usage:
+    $ python benchmarks/single_class_head.py --weights yolov5/best.pt
+    $ python benchmarks/single_class_head.py --weights yolov5/best.pt --source public/files --conf-thres 0.25
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from yolov5.model_registry import model_registry
+from models.yolo import single_class_head  # top-level, like the Detect() class the checkpoint was unpickled into
+from yolov5.utils.augmentations import letterbox
+from yolov5.utils.general import non_max_suppression
+
+
+def load_batch(loaded, opt):
+    files = sorted(glob.glob(os.path.join(opt.source, "*.jpg"))) if opt.source else []
+    rng = np.random.default_rng(0)
+    ims = [cv2.imread(f) for f in files[:opt.batch]]
+    ims += [rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(opt.batch - len(ims))]
+    ims = [letterbox(x, loaded.imgsz, auto=False)[0].transpose((2, 0, 1))[::-1] for x in ims]  # BGR HWC to RGB CHW
+    im = torch.from_numpy(np.ascontiguousarray(np.stack(ims))).to(loaded.model.device)
+    return (im.half() if loaded.model.fp16 else im.float()) / 255
+
+
+def timed(fn, runs):
+    fn()  # warmup
+    t = time.perf_counter()
+    for _ in range(runs):
+        out = fn()
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    return out, (time.perf_counter() - t) / runs
+
+
+@torch.no_grad()
+def main(opt):
+    loaded = model_registry.get(opt.weights, device=opt.device, imgsz=(opt.imgsz, opt.imgsz))
+    head = single_class_head(loaded.model)
+    if head is None:
+        sys.exit(f"{opt.weights} has no single-class PyTorch Detect() head")
+    features = []
+    hook = head.register_forward_pre_hook(lambda m, x: features.append([f.clone() for f in x[0]]))
+    head.conf_thres = 0.0
+    loaded.model(load_batch(loaded, opt))
+    hook.remove()
+    x = features[0]
+
+    modes = {"generic": (False, 0.0), "single-class": (True, opt.conf_thres)}
+    reference = None
+    print(f"{'head':20s} {'head/img':>11s} {'NMS/img':>10s} {'total/img':>10s}  detections")
+    for name, (fused, conf_thres) in modes.items():
+        head.fuse_single_cls, head.conf_thres = fused, conf_thres
+        pred, t_head = timed(lambda: head([f.clone() for f in x])[0], opt.runs)
+        dets, t_nms = timed(lambda: non_max_suppression(pred, opt.conf_thres, opt.iou_thres), opt.runs)
+        if reference is None:
+            reference = dets
+        elif not all(torch.equal(a, b) for a, b in zip(reference, dets)):
+            sys.exit(f"{name} head differs from the generic head")
+        bs = len(dets)
+        print(f"{name:20s} {t_head / bs * 1E3:9.3f}ms {t_nms / bs * 1E3:8.3f}ms {(t_head + t_nms) / bs * 1E3:8.3f}ms  "
+              f"{sum(map(len, dets))}")
+    head.fuse_single_cls, head.conf_thres = True, 0.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", default=str(ROOT / "yolov5" / "best.pt"), help="single-class model path")
+    parser.add_argument("--source", default="", help="directory of .jpg images, random images if empty")
+    parser.add_argument("--device", default="", help="cuda device, i.e. 0 or cpu")
+    parser.add_argument("--imgsz", type=int, default=640, help="inference size")
+    parser.add_argument("--batch", type=int, default=8, help="images per forward pass")
+    parser.add_argument("--conf-thres", type=float, default=0.25, help="confidence threshold")
+    parser.add_argument("--iou-thres", type=float, default=0.45, help="NMS IoU threshold")
+    parser.add_argument("--runs", type=int, default=50, help="timed runs per mode")
+    main(parser.parse_args())
@@ -0,0 +1,103 @@
+"""
+Sliced inference on high-resolution images: throughput and recall for several tile sizes against one full-frame pass.
+
+Every configuration runs over the same images; images/s is measured after one warmup image. Recall at IoU 0.5 is
+reported when the images have YOLO labels (images/x.jpg -> labels/x.txt), otherwise only the number of detections.
+Without --source a synthetic 4000x3000 image is used, which times the tiling but has no labels.
+
+Usage:
+    $ python benchmarks/tiled_inference.py --weights yolov5/best.pt
+    $ python benchmarks/tiled_inference.py --weights yolov5/best.pt --source datasets/drone/images --tiles 640 960
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from yolov5.event_tracker import box_iou
+from yolov5.model_registry import model_registry
+from yolov5.tiled_inference import TiledInference
+from yolov5.utils.dataloaders import IMG_FORMATS, img2label_paths
+
+
+def load_images(source):
+    if not source:
+        rng = np.random.default_rng(0)
+        return [("synthetic", cv2.GaussianBlur(rng.integers(0, 255, (3000, 4000, 3), dtype=np.uint8), (0, 0), 8))]
+    files = sorted(glob.glob(os.path.join(source, "*"))) if os.path.isdir(source) else [source]
+    return [(f, cv2.imread(f)) for f in files if f.split(".")[-1].lower() in IMG_FORMATS]
+
+
+def load_labels(path, shape):
+    # YOLO labels (cls, x, y, w, h normalized) to xyxy pixels, None when the image has no label file
+    label_path = img2label_paths([path])[0]
+    if not os.path.isfile(label_path):
+        return None
+    h, w = shape[:2]
+    xywh = np.loadtxt(label_path, ndmin=2)[:, 1:5] * [w, h, w, h]
+    return np.concatenate([xywh[:, :2] - xywh[:, 2:] / 2, xywh[:, :2] + xywh[:, 2:] / 2], 1)
+
+
+def run(loaded, images, tiler, opt):
+    imgsz = loaded.imgsz
+    detect = lambda im: tiler.detect(loaded.model, im, imgsz, opt.conf_thres, opt.iou_thres)
+    if tiler.tile_size <= 0:  # one letterboxed pass over the whole image, the regular path
+        detect = lambda im: TiledInference(tile_size=max(im.shape[:2]), overlap=0).detect(
+            loaded.model, im, imgsz, opt.conf_thres, opt.iou_thres)
+    detect(images[0][1])  # warmup
+    t = time.perf_counter()
+    dets = [detect(im).numpy() for _, im in images]
+    return dets, time.perf_counter() - t
+
+
+def recall(images, dets):
+    found, total = 0, 0
+    for (path, im), det in zip(images, dets):
+        labels = load_labels(path, im.shape)
+        if labels is None:
+            return None
+        total += len(labels)
+        if len(labels) and len(det):
+            found += int((box_iou(labels, det[:, :4]).max(1) >= 0.5).sum())
+    return found / total if total else None
+
+
+def main(opt):
+    loaded = model_registry.get(opt.weights, device=opt.device, imgsz=(opt.imgsz, opt.imgsz))
+    images = load_images(opt.source)
+    h, w = images[0][1].shape[:2]
+    print(f"{len(images)} images, first {w}x{h}, model {loaded.imgsz[1]}x{loaded.imgsz[0]}")
+    configs = [("full frame", TiledInference(tile_size=0))]
+    configs += [(f"tile {size} overlap {opt.overlap:g}", TiledInference(size, opt.overlap, opt.batch, opt.full_frame))
+                for size in opt.tiles]
+    for label, tiler in configs:
+        windows = len(tiler.windows(images[0][1].shape)) if tiler.tile_size > 0 else 1
+        dets, t = run(loaded, images, tiler, opt)
+        r = recall(images, dets)
+        print(f"{label:28s} {windows:4d} windows  {len(images) / t:7.2f} img/s  "
+              f"{sum(map(len, dets)):5d} detections  recall {'n/a' if r is None else f'{r:.1%}'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", default=str(ROOT / "yolov5" / "best.pt"), help="model path")
+    parser.add_argument("--source", default="", help="image or directory of images, synthetic 4000x3000 if empty")
+    parser.add_argument("--device", default="", help="cuda device, i.e. 0 or cpu")
+    parser.add_argument("--imgsz", type=int, default=640, help="inference size")
+    parser.add_argument("--conf-thres", type=float, default=0.25, help="confidence threshold")
+    parser.add_argument("--iou-thres", type=float, default=0.45, help="NMS and tile merge IoU threshold")
+    parser.add_argument("--tiles", nargs="+", type=int, default=[640, 1280], help="tile sizes to compare")
+    parser.add_argument("--overlap", type=float, default=0.2, help="tile overlap fraction")
+    parser.add_argument("--batch", type=int, default=8, help="tiles per forward pass")
+    parser.add_argument("--no-full-frame", dest="full_frame", action="store_false", help="tiles only")
+    main(parser.parse_args())
@@ -14,9 +14,20 @@ from app.config.mongo_service import db_mongo
 from app.routers.user_router import router as user_router
 from app.routers.upload_router import router as upload_router
 from app.routers.detection_router import router as detection_router
-from app.routers.notification_router import router as notification_router
-from app.routers.history_router import router as history_router
+from app.routers.notification_router import (
+    router as notification_router,
+    send_notification_events,
+)
+from app.routers.history_router import router as history_router, save_history_events
+from app.routers.model_router import router as model_router
+from app.routers.camera_router import router as camera_router, start_cameras, stop_cameras
 from app.utils.env_service import env_service
+from app.utils.detection_executor import detection_executor
+from app.utils.event_bus import event_bus
+from app.utils.push_dispatcher import push_dispatcher
+from app.utils.offload import offload
+from app.utils.cached_static_files import CachedStaticFiles
+from yolov5.stream_monitor import stream_monitor
 
 import os
 
@@ -44,8 +55,14 @@ app.mount("/static", StaticFiles(directory=Constants.PUBLIC_FOLDER), name="stati
 app.mount(
     "/detection", StaticFiles(directory=Constants.DETECTION_FOLDER), name="detection"
 )
+# Thumbnail names are content hashes, a given URL never changes
 app.mount(
-    "/thumbnail", StaticFiles(directory=Constants.THUMBNAIL_FOLDER), name="thumbnail"
+    "/thumbnail",
+    CachedStaticFiles(
+        directory=Constants.THUMBNAIL_FOLDER,
+        cache_control="public, max-age=31536000, immutable",
+    ),
+    name="thumbnail",
 )
 
 
@@ -60,6 +77,11 @@ def configure() -> None:
     app.include_router(detection_router)
     app.include_router(notification_router)
     app.include_router(history_router)
+    app.include_router(model_router)
+    app.include_router(camera_router)
+    event_bus.subscribe("history", save_history_events)
+    event_bus.subscribe("notification", send_notification_events)
+    stream_monitor.publish = event_bus.publish_all
 
 
 @app.on_event("startup")
@@ -67,10 +89,18 @@ async def startup_process():
     configure()
     env_service.load_env("")
     await db_mongo.connect_to_mongo()
+    await push_dispatcher.start()
+    await event_bus.start()
+    await start_cameras()
 
 
 @app.on_event("shutdown")
-def shutdown_db_client():
+async def shutdown_db_client():
+    await stop_cameras()
+    detection_executor.shutdown(wait=False)
+    await event_bus.stop()
+    await push_dispatcher.stop()
+    offload.shutdown(wait=False)
     db_mongo.close_mongo_connection
 
 
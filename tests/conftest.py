@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+for path in (ROOT, ROOT / "yolov5"):  # yolov5 modules import each other as top-level `utils`/`models`
+    if str(path) not in sys.path:
+        sys.path.append(str(path))
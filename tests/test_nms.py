@@ -0,0 +1,35 @@
+"""
+Batched non_max_suppression() must give every image of a batch the same detections as running it alone.
+"""
+
+import torch
+
+from yolov5.utils.general import non_max_suppression
+
+
+def per_image(prediction, **kwargs):
+    return [non_max_suppression(p[None], **kwargs)[0] for p in prediction]
+
+
+def test_off_frame_box_does_not_suppress_another_image():
+    # A box starting off-frame at the top-left of image 1 and one at the bottom-right of image 0: with a coordinate
+    # offset that assumes non-negative boxes, the two groups overlap and one image loses its detection
+    p = torch.zeros((2, 1, 6))
+    p[0, 0] = torch.tensor([620, 620, 40, 40, 0.9, 1])
+    p[1, 0] = torch.tensor([-25, -25, 40, 40, 0.8, 1])
+    batched = non_max_suppression(p, conf_thres=0.25, iou_thres=0.45)
+    assert [len(det) for det in batched] == [1, 1]
+    assert all(torch.equal(a, b) for a, b in zip(batched, per_image(p, conf_thres=0.25, iou_thres=0.45)))
+
+
+def test_batched_matches_per_image():
+    torch.manual_seed(0)
+    bs, n, nc = 4, 500, 3
+    p = torch.rand((bs, n, 5 + nc))
+    p[..., :2] = p[..., :2] * 700 - 30  # centers, some boxes off-frame
+    p[..., 2:4] = p[..., 2:4] * 120 + 4  # sizes
+    for agnostic in (False, True):
+        kwargs = dict(conf_thres=0.25, iou_thres=0.45, agnostic=agnostic)
+        batched = non_max_suppression(p, **kwargs)
+        for a, b in zip(batched, per_image(p, **kwargs)):
+            assert torch.equal(a, b)
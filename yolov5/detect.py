@@ -46,10 +46,13 @@ ROOT = Path(os.path.relpath(ROOT, Path.cwd()))  # relative
 from ultralytics.utils.plotting import Annotator, colors, save_one_box
 
 from models.common import DetectMultiBackend
-from utils.dataloaders import IMG_FORMATS, VID_FORMATS, LoadImages, LoadScreenshots, LoadStreams
+from models.yolo import single_class_head
+from utils.dataloaders import (IMG_FORMATS, VID_FORMATS, LoadImages, LoadImagesBatched, LoadImagesPrefetch,
+                               LoadScreenshots, LoadStreams)
 from utils.general import (LOGGER, Profile, check_file, check_img_size, check_imshow, check_requirements, colorstr, cv2,
                            increment_path, non_max_suppression, print_args, scale_boxes, strip_optimizer, xyxy2xywh)
 from utils.torch_utils import select_device, smart_inference_mode
+from tiled_inference import TiledInference
 
 
 @smart_inference_mode()
@@ -82,6 +85,12 @@ def run(
         half=False,  # use FP16 half-precision inference
         dnn=False,  # use OpenCV DNN for ONNX inference
         vid_stride=1,  # video frame-rate stride
+        tile_size=0,  # sliced inference tile size in source pixels, 0 to disable
+        tile_overlap=0.2,  # fraction of a tile shared with its neighbour
+        tile_batch=8,  # tiles per forward pass
+        workers=0,  # threads decoding and letterboxing images ahead of inference, 0 for none
+        batch_size=1,  # images per forward pass for image sources, same-shaped consecutive images are batched
+        reduced_decode=False,  # decode large JPEGs at 1/2-1/8 scale no smaller than imgsz, results at that scale
 ):
     source = str(source)
     save_img = not nosave and not source.endswith('.txt')  # save inference images
@@ -101,6 +110,9 @@ def run(
     model = DetectMultiBackend(weights, device=device, dnn=dnn, data=data, fp16=half)
     stride, names, pt = model.stride, model.names, model.pt
     imgsz = check_img_size(imgsz, s=stride)  # check image size
+    head = single_class_head(model)  # single-class models: fused obj * cls, boxes decoded above conf_thres only
+    if head is not None:
+        head.conf_thres = conf_thres
 
     # Dataloader
     bs = 1  # batch_size
@@ -111,8 +123,19 @@ def run(
     elif screenshot:
         dataset = LoadScreenshots(source, img_size=imgsz, stride=stride, auto=pt)
     else:
-        dataset = LoadImages(source, img_size=imgsz, stride=stride, auto=pt, vid_stride=vid_stride)
+        dataset = LoadImages(source,
+                             img_size=imgsz,
+                             stride=stride,
+                             auto=pt,
+                             vid_stride=vid_stride,
+                             reduced_decode=reduced_decode and not tile_size)  # tiles need the full resolution
+        if workers > 0:
+            dataset = LoadImagesPrefetch(dataset, workers=workers)  # same order, decode overlaps inference
+    batched = batch_size > 1 and not (webcam or screenshot or visualize)
+    if batched:
+        dataset = LoadImagesBatched(dataset, batch_size)  # lists of paths, im0s and print strings per batch
     vid_path, vid_writer = [None] * bs, [None] * bs
+    tiler = TiledInference(tile_size, tile_overlap, tile_batch) if tile_size > 0 else None
 
     # Run inference
     model.warmup(imgsz=(1 if pt or model.triton else bs, 3, *imgsz))  # warmup
@@ -125,14 +148,29 @@ def run(
             if len(im.shape) == 3:
                 im = im[None]  # expand for batch dim
 
+        frames = im0s if webcam or batched else [im0s]
+
         # Inference
         with dt[1]:
             visualize = increment_path(save_dir / Path(path).stem, mkdir=True) if visualize else False
-            pred = model(im, augment=augment, visualize=visualize)
+            tiled = [tiler is not None and tiler.enabled_for(x.shape) for x in frames]
+            if tiler is not None:  # tiles are batched, NMS'ed and merged in source pixels, timed as inference
+                pred = [
+                    tiler.detect(model, x, imgsz, conf_thres, iou_thres, classes, agnostic_nms, max_det) if t else None
+                    for x, t in zip(frames, tiled)]
+                untiled = [i for i, t in enumerate(tiled) if not t]  # images no larger than one tile
+                raw = model(im[untiled], augment=augment, visualize=visualize) if untiled else None
+            else:
+                pred = model(im, augment=augment, visualize=visualize)
 
         # NMS
         with dt[2]:
-            pred = non_max_suppression(pred, conf_thres, iou_thres, classes, agnostic_nms, max_det=max_det)
+            if tiler is None:
+                pred = non_max_suppression(pred, conf_thres, iou_thres, classes, agnostic_nms, max_det=max_det)
+            elif untiled:  # the regular path for the images that were not tiled, in batch order
+                full = non_max_suppression(raw, conf_thres, iou_thres, classes, agnostic_nms, max_det=max_det)
+                for i, det in zip(untiled, full):
+                    pred[i] = det
 
         # Second-stage classifier (optional)
         # pred = utils.general.apply_classifier(pred, classifier_model, im, im0s)
@@ -150,11 +188,14 @@ def run(
                 writer.writerow(data)
 
         # Process predictions
+        strings = s
         for i, det in enumerate(pred):  # per image
             seen += 1
             if webcam:  # batch_size >= 1
                 p, im0, frame = path[i], im0s[i].copy(), dataset.count
                 s += f'{i}: '
+            elif batched:  # one print string per image, as without batching
+                p, im0, frame, s = path[i], im0s[i].copy(), dataset.frame, strings[i]
             else:
                 p, im0, frame = path, im0s.copy(), getattr(dataset, 'frame', 0)
 
@@ -166,8 +207,9 @@ def run(
             imc = im0.copy() if save_crop else im0  # for save_crop
             annotator = Annotator(im0, line_width=line_thickness, example=str(names))
             if len(det):
-                # Rescale boxes from img_size to im0 size
-                det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], im0.shape).round()
+                # Rescale boxes from img_size to im0 size, tiled detections already are
+                if not tiled[i]:
+                    det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], im0.shape).round()
 
                 # Print results
                 for c in det[:, 5].unique():
@@ -226,8 +268,12 @@ def run(
                         vid_writer[i] = cv2.VideoWriter(save_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
                     vid_writer[i].write(im0)
 
-        # Print time (inference-only)
-        LOGGER.info(f"{s}{'' if len(det) else '(no detections), '}{dt[1].dt * 1E3:.1f}ms")
+            # Print time (inference-only)
+            if batched:
+                LOGGER.info(f"{s}{'' if len(det) else '(no detections), '}{dt[1].dt * 1E3:.1f}ms")
+
+        if not batched:
+            LOGGER.info(f"{s}{'' if len(det) else '(no detections), '}{dt[1].dt * 1E3:.1f}ms")
 
     # Print results
     t = tuple(x.t / seen * 1E3 for x in dt)  # speeds per image
@@ -269,6 +315,12 @@ def parse_opt():
     parser.add_argument('--half', action='store_true', help='use FP16 half-precision inference')
     parser.add_argument('--dnn', action='store_true', help='use OpenCV DNN for ONNX inference')
     parser.add_argument('--vid-stride', type=int, default=1, help='video frame-rate stride')
+    parser.add_argument('--tile-size', type=int, default=0, help='sliced inference tile size in pixels, 0 disables')
+    parser.add_argument('--tile-overlap', type=float, default=0.2, help='fraction of a tile shared with its neighbour')
+    parser.add_argument('--tile-batch', type=int, default=8, help='tiles per forward pass')
+    parser.add_argument('--workers', type=int, default=0, help='image prefetch threads, 0 to load in the main thread')
+    parser.add_argument('--batch-size', type=int, default=1, help='images per forward pass for image sources')
+    parser.add_argument('--reduced-decode', action='store_true', help='decode large JPEGs at reduced scale')
     opt = parser.parse_args()
     opt.imgsz *= 2 if len(opt.imgsz) == 1 else 1  # expand
     print_args(vars(opt))
@@ -0,0 +1,118 @@
+"""
+IoU tracker that turns per-frame detections of a video or stream into rip current events.
+
+Each call to EventTracker.update() takes the boxes non_max_suppression kept for one frame. Boxes are matched greedily
+to open tracks by IoU. A track becomes an event once it was seen in `min_hits` frames, and ends when it is not seen for
+`max_gap` seconds. Events carry start/end time, peak confidence and the frame the peak came from, so callers can send
+one notification and write one history per event instead of one per positive frame.
+
+Usage:
+    tracker = EventTracker()
+    for t, frame, det in results:
+        started, finished = tracker.update(det, t, frame)
+    finished += tracker.flush()
+"""
+
+import os
+
+import numpy as np
+
+
+def box_iou(a, b):
+    # IoU matrix between (n,4) and (m,4) xyxy boxes
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(rb - lt, 0, None).prod(2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+class RipEvent:
+    # One tracked rip current: the box it was last seen at and the best frame so far
+    def __init__(self, event_id, box, conf, t, frame):
+        self.id = event_id
+        self.box = box
+        self.start = self.end = t
+        self.hits = 1
+        self.peak_conf = conf
+        self.peak_box = box
+        self.peak_time = t
+        self.best_frame = frame
+        self.confirmed = False
+
+    def update(self, box, conf, t, frame):
+        self.box = box
+        self.end = t
+        self.hits += 1
+        if conf > self.peak_conf:
+            self.peak_conf, self.peak_box, self.peak_time, self.best_frame = conf, box, t, frame
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "start": round(float(self.start), 3),
+            "end": round(float(self.end), 3),
+            "peak_conf": round(float(self.peak_conf), 3),
+            "peak_time": round(float(self.peak_time), 3),
+            "box": [round(float(v), 1) for v in self.peak_box],
+            "frames": self.hits,
+        }
+
+
+class EventTracker:
+    """
+    Groups detections into RipEvents across frames.
+
+    Configured from the environment unless given:
+        EVENT_IOU       IoU to continue a track (default 0.3)
+        EVENT_MAX_GAP   seconds a track may go unseen before its event ends (default 3)
+        EVENT_MIN_HITS  frames a track needs before it counts as an event, filters one-frame flicker (default 2)
+    """
+
+    def __init__(self, iou_thres=None, max_gap=None, min_hits=None):
+        self.iou_thres = float(os.getenv("EVENT_IOU", 0.3)) if iou_thres is None else iou_thres
+        self.max_gap = float(os.getenv("EVENT_MAX_GAP", 3)) if max_gap is None else max_gap
+        self.min_hits = int(os.getenv("EVENT_MIN_HITS", 2)) if min_hits is None else min_hits
+        self.tracks = []
+        self.next_id = 0
+
+    def update(self, det, t, frame=None):
+        """
+        Add the (n,6) [x1, y1, x2, y2, conf, cls] detections of the frame at time t (seconds).
+
+        Returns (started, finished): events confirmed by this frame, and events that ended before it.
+        """
+        det = np.asarray(det, dtype=np.float32).reshape(-1, 6)
+        finished = [e for e in self.tracks if t - e.end > self.max_gap]
+        self.tracks = [e for e in self.tracks if t - e.end <= self.max_gap]
+
+        unmatched = list(range(len(det)))
+        if self.tracks and len(det):
+            iou = box_iou(np.stack([e.box for e in self.tracks]), det[:, :4])
+            # Greedy matching, highest IoU first
+            for ti, di in zip(*np.unravel_index(np.argsort(-iou, axis=None), iou.shape)):
+                if iou[ti, di] < self.iou_thres:
+                    break
+                track = self.tracks[ti]
+                if track.end == t or di not in unmatched:
+                    continue
+                track.update(det[di, :4], float(det[di, 4]), t, frame)
+                unmatched.remove(di)
+        for di in unmatched:
+            self.tracks.append(RipEvent(self.next_id, det[di, :4], float(det[di, 4]), t, frame))
+            self.next_id += 1
+
+        started = []
+        for track in self.tracks:
+            if not track.confirmed and track.hits >= self.min_hits:
+                track.confirmed = True
+                started.append(track)
+        return started, [e for e in finished if e.confirmed]
+
+    def flush(self):
+        """
+        End all open tracks, e.g. at the end of a video; returns the confirmed ones.
+        """
+        finished, self.tracks = self.tracks, []
+        return [e for e in finished if e.confirmed]
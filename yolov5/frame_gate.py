@@ -0,0 +1,96 @@
+"""
+Frame-difference gate that skips inference on static scenes.
+
+Fixed beach cameras produce long runs of nearly identical frames. FrameGate keeps a small grayscale copy of the last
+frame that was inferred and compares each new frame against it: if the mean absolute difference is below the
+threshold, the frame is "static" and the caller reuses the previous detections instead of running the model.
+Comparing against the last inferred frame (not the previous frame) means slow drift still adds up and triggers
+inference; `max_skip` forces one inference every so many frames regardless.
+
+Usage:
+    gate = FrameGate()
+    det = run_model(frame) if gate.changed(frame) else previous_det
+"""
+
+import os
+import threading
+
+import cv2
+import numpy as np
+
+GRAY_WEIGHTS = np.array([0.114, 0.587, 0.299], dtype=np.float32)  # BGR
+
+
+class FrameGate:
+    """
+    Configured from the environment unless given:
+        FRAME_GATE_THRESHOLD  mean absolute gray-level difference (0-255) below which a frame is static,
+                              0 disables the gate (default 2.0)
+        FRAME_GATE_SIZE       width of the downscaled comparison image in pixels (default 64)
+        FRAME_GATE_MAX_SKIP   consecutive frames that may be skipped before inference is forced (default 30)
+    """
+
+    # Process-wide counters over all gates, for the stats endpoint
+    totals = {"frames": 0, "skipped": 0}
+    totals_lock = threading.Lock()
+
+    def __init__(self, threshold=None, size=None, max_skip=None):
+        self.threshold = float(os.getenv("FRAME_GATE_THRESHOLD", 2.0)) if threshold is None else threshold
+        self.size = int(os.getenv("FRAME_GATE_SIZE", 64)) if size is None else size
+        self.max_skip = int(os.getenv("FRAME_GATE_MAX_SKIP", 30)) if max_skip is None else max_skip
+        self.reference = None  # signature of the last inferred frame
+        self.run = 0  # consecutive skipped frames
+        self.frames = 0
+        self.skipped = 0
+
+    def settings(self):
+        # Everything that changes which frames are skipped, for result cache keys
+        return self.threshold, self.size, self.max_skip
+
+    def signature(self, frame):
+        # Downscaled grayscale: INTER_AREA averages away sensor noise, the gray conversion is a NumPy dot product
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.size, max(round(h * self.size / w), 1)), interpolation=cv2.INTER_AREA)
+        return small.astype(np.float32) @ GRAY_WEIGHTS if small.ndim == 3 else small.astype(np.float32)
+
+    def changed(self, frame):
+        """
+        True if frame must be inferred, False if the previous detections still apply.
+        """
+        self.frames += 1
+        if self.threshold <= 0:
+            self._count(False)
+            return True
+        sig = self.signature(frame)
+        static = (
+            self.reference is not None
+            and self.reference.shape == sig.shape
+            and self.run < self.max_skip
+            and float(np.abs(sig - self.reference).mean()) < self.threshold
+        )
+        if static:
+            self.run += 1
+            self.skipped += 1
+        else:
+            self.reference = sig
+            self.run = 0
+        self._count(static)
+        return not static
+
+    def _count(self, skipped):
+        with self.totals_lock:
+            self.totals["frames"] += 1
+            self.totals["skipped"] += skipped
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "skip_rate": self.skipped / self.frames if self.frames else 0.0,
+        }
+
+    @classmethod
+    def total_stats(cls):
+        with cls.totals_lock:
+            frames, skipped = cls.totals["frames"], cls.totals["skipped"]
+        return {"frames": frames, "skipped": skipped, "skip_rate": skipped / frames if frames else 0.0}
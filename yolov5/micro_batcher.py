@@ -0,0 +1,156 @@
+"""
+Dynamic micro-batching in front of a loaded DetectMultiBackend.
+
+Concurrent detection jobs each submit one image. A single inference thread per model collects pending images for up
+to ``max_wait_ms`` or ``max_batch`` images, runs one forward pass and one ``non_max_suppression`` call per distinct set
+of NMS settings, and resolves each caller's future with its own detections already scaled to the original image.
+
+Usage:
+    det = model_registry.get(weights).batcher(im0, conf_thres=0.25, iou_thres=0.45)  # (n,6) tensor [xyxy, conf, cls]
+"""
+
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+import torch
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[0]  # YOLOv5 root directory
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH, yolov5 modules import each other as top-level `utils`/`models`
+
+from models.yolo import conf_threshold  # top-level, the module checkpoints unpickle their Detect() from
+from yolov5.preprocessor import Preprocessor
+from yolov5.utils.general import LOGGER, Profile, non_max_suppression, scale_boxes
+
+
+class BatchRequest:
+    # One image waiting for inference: its Preprocessor slot, original shape, NMS settings and the caller's future
+    def __init__(self, slot, shape0, nms):
+        self.slot = slot
+        self.shape0 = shape0
+        self.nms = nms
+        self.future = Future()
+
+
+class MicroBatcher:
+    """
+    Collects images from concurrent callers and runs them through the model as one batch.
+
+    Defaults come from the environment:
+        MICRO_BATCH_SIZE     maximum images per forward pass (default 8)
+        MICRO_BATCH_WAIT_MS  how long the first image waits for company (default 10)
+    """
+
+    def __init__(self, model, imgsz, max_batch=None, max_wait_ms=None):
+        self.model = model
+        self.imgsz = imgsz
+        self.max_batch = max_batch or int(os.getenv("MICRO_BATCH_SIZE", 8))
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else float(os.getenv("MICRO_BATCH_WAIT_MS", 10))) / 1e3
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.infer_lock = threading.Lock()  # serializes _infer()
+        self.closed = False
+        self.batches, self.images = 0, 0  # counters for the average batch size
+        # Letterbox into reused slots in the callers' threads, fixed model shape so all images stack into one batch
+        self.preprocessor = Preprocessor(imgsz, model.device, fp16=model.fp16, max_batch=self.max_batch)
+        self.profiles = {"inference": Profile(), "nms": Profile()}
+        self.thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, im0, conf_thres=0.25, iou_thres=0.45, classes=None, agnostic=False, max_det=1000):
+        """
+        Queue a BGR image for inference and return a Future resolving to its (n,6) detections in im0 coordinates.
+        """
+        nms = (conf_thres, iou_thres, classes if classes is None or isinstance(classes, int) else tuple(classes),
+               agnostic, max_det)
+        request = BatchRequest(*self.preprocessor.load(im0), nms)  # pre-process in the caller's thread
+        with self.lock:
+            if not self.closed:
+                self.queue.put(request)
+                return request.future
+        self._infer([request])  # model was reloaded or evicted while this caller still held it
+        return request.future
+
+    def __call__(self, im0, **kwargs):
+        return self.submit(im0, **kwargs).result()
+
+    def stats(self):
+        # ms per image of each stage: letterbox, upload (to the device, with RGB/CHW/normalize), inference, NMS
+        n = max(self.images, 1)
+        return {**self.preprocessor.stats(), **{k: round(p.t / n * 1E3, 3) for k, p in self.profiles.items()}}
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.queue.put(None)  # requests queued before this are still served
+
+    def _collect(self):
+        first = self.queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                # Take whatever is already queued once the window has closed, otherwise wait for stragglers
+                request = self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self.queue.put(None)  # stop after this batch
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+            try:
+                self._infer(batch)
+            except Exception as e:
+                LOGGER.warning(f"WARNING ⚠️ Micro-batch inference failed: {e}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+    @torch.no_grad()
+    def _infer(self, batch):
+        # One batch at a time: the batcher thread and a caller running inline after close() share the input tensors,
+        # the model and the profiles
+        with self.infer_lock:
+            slots = [r.slot for r in batch]
+            try:
+                im = self.preprocessor.batch(slots)
+                # Single-class heads pre-filter at the batch's lowest conf_thres, without touching the shared model
+                with self.profiles["inference"], conf_threshold(min(r.nms[0] for r in batch)):
+                    pred = self.model(im)
+                    if isinstance(pred, (list, tuple)):
+                        pred = pred[0]  # select only inference output
+                self.batches += 1
+                self.images += len(batch)
+
+                groups = {}  # requests sharing NMS settings go through a single non_max_suppression call
+                for i, r in enumerate(batch):
+                    groups.setdefault(r.nms, []).append(i)
+                with self.profiles["nms"]:
+                    results = []
+                    for (conf_thres, iou_thres, classes, agnostic, max_det), idx in groups.items():
+                        classes = list(classes) if isinstance(classes, tuple) else classes
+                        dets = non_max_suppression(pred[idx], conf_thres, iou_thres, classes, agnostic,
+                                                   max_det=max_det)
+                        for i, det in zip(idx, dets):
+                            det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], batch[i].shape0).round()
+                            results.append((batch[i], det.cpu()))
+            finally:
+                self.preprocessor.release(slots)  # detections are on the CPU, the input is no longer read
+        for request, det in results:
+            request.future.set_result(det)
@@ -0,0 +1,166 @@
+"""
+Process-wide registry of loaded detection models.
+
+Loading ``best.pt`` means unpickling the checkpoint, fusing Conv+BN layers and running a warmup pass. The registry does
+that once per (weights, device, dnn, data, fp16, imgsz) combination and hands the same warm ``DetectMultiBackend`` to every
+detection job in the process. ``reload`` and ``evict`` allow swapping the weights on disk without restarting uvicorn.
+
+Usage:
+    from yolov5.model_registry import model_registry
+
+    loaded = model_registry.get(weights, device=device, data=data, imgsz=(640, 640))
+    pred = loaded.model(im)
+"""
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import torch
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[0]  # YOLOv5 root directory
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH, yolov5 modules import each other as top-level `utils`/`models`
+
+from yolov5.micro_batcher import MicroBatcher
+from yolov5.models.common import DetectMultiBackend
+from yolov5.result_cache import file_hash
+from yolov5.utils.general import LOGGER, check_img_size
+from yolov5.utils.torch_utils import select_device
+
+
+class LoadedModel:
+    # A warm DetectMultiBackend plus the attributes every caller needs next to it
+    def __init__(self, key, model, imgsz):
+        self.key = key
+        self.model = model
+        self.stride, self.names, self.pt = model.stride, model.names, model.pt
+        self.imgsz = imgsz  # inference size checked against the model stride
+        self.weights = key[0]
+        self.mtime = os.path.getmtime(self.weights) if os.path.isfile(self.weights) else None
+        # Identifies the exact weights in result cache keys, so swapping best.pt never serves stale results
+        self.weights_hash = file_hash(self.weights) if os.path.isfile(self.weights) else self.weights
+        self.loaded_at = time.time()
+        self._batcher = None
+        self._batcher_lock = threading.Lock()
+
+    @property
+    def batcher(self):
+        # Micro-batching inference thread for this model, started on first use
+        if self._batcher is None:
+            with self._batcher_lock:
+                if self._batcher is None:
+                    self._batcher = MicroBatcher(self.model, self.imgsz)
+        return self._batcher
+
+    def close(self):
+        if self._batcher is not None:
+            self._batcher.close()
+
+    def info(self):
+        return {
+            "weights": self.weights,
+            "device": str(self.model.device),
+            "dnn": self.key[2],
+            "data": self.key[3],
+            "fp16": self.model.fp16,
+            "imgsz": list(self.imgsz),
+            "mtime": self.mtime,
+            "loaded_at": self.loaded_at,
+            "batches": self._batcher.batches if self._batcher else 0,
+            "batched_images": self._batcher.images if self._batcher else 0,
+            "profile": self._batcher.stats() if self._batcher else None,  # ms per image of each stage
+        }
+
+
+class ModelRegistry:
+    """
+    Loads each weights/backend/device combination once per process and keeps it warm.
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()  # guards self._models and self._key_locks
+        self._key_locks = {}  # one lock per key so two jobs never load the same weights twice
+
+    @staticmethod
+    def _resolve(weights):
+        if weights is None:
+            return None
+        return str(Path(weights).resolve()) if os.path.exists(str(weights)) else str(weights)
+
+    def _key(self, weights, device, dnn, data, fp16, imgsz):
+        weights = self._resolve(weights)
+        device = str(device).strip().lower().replace("cuda:", "").replace("cuda", "").replace("none", "")
+        device = device or ("0" if torch.cuda.is_available() else "cpu")  # same default as select_device()
+        imgsz = (int(imgsz),) * 2 if isinstance(imgsz, (int, float)) else tuple(int(x) for x in imgsz)  # (h, w)
+        return weights, device, bool(dnn), str(data) if data else None, bool(fp16), imgsz
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _load(self, key):
+        weights, device, dnn, data, fp16, imgsz = key
+        t = time.time()
+        model = DetectMultiBackend(weights, device=select_device(device), dnn=dnn, data=data, fp16=fp16)
+        imgsz = check_img_size(imgsz, s=model.stride)  # check image size
+        model.warmup(imgsz=(1, 3, *imgsz))  # warmup
+        LOGGER.info(f"Model registry: loaded {weights} on {model.device} in {time.time() - t:.2f}s")
+        return LoadedModel(key, model, imgsz)
+
+    def get(self, weights, device="", dnn=False, data=None, fp16=False, imgsz=(640, 640)):
+        """
+        Return the warm model for this combination, loading it on first use. Each inference size is its own entry, the
+        micro-batcher letterboxes to one fixed shape.
+        """
+        key = self._key(weights, device, dnn, data, fp16, imgsz)
+        loaded = self._models.get(key)
+        if loaded is not None:
+            return loaded
+        with self._key_lock(key):
+            loaded = self._models.get(key)
+            if loaded is None:  # not loaded by a concurrent caller while we waited
+                loaded = self._load(key)
+                with self._lock:
+                    self._models[key] = loaded
+        return loaded
+
+    def reload(self, weights=None):
+        """
+        Load cached models for the given weights (all models if None) again from disk and atomically replace them.
+        Jobs already holding the old model finish on it. Returns the number of reloaded entries.
+        """
+        weights = self._resolve(weights)
+        with self._lock:
+            cached = [m for k, m in self._models.items() if weights is None or k[0] == weights]
+        for old in cached:
+            with self._key_lock(old.key):
+                loaded = self._load(old.key)
+                with self._lock:
+                    self._models[old.key] = loaded
+            old.close()  # requests already queued on the old batcher are still served
+        return len(cached)
+
+    def evict(self, weights=None):
+        """
+        Drop cached models for the given weights (all models if None). Returns the number of evicted entries.
+        """
+        weights = self._resolve(weights)
+        with self._lock:
+            keys = [k for k in self._models if weights is None or k[0] == weights]
+            for k in keys:
+                self._models.pop(k).close()
+        if keys:
+            LOGGER.info(f"Model registry: evicted {len(keys)} model(s)")
+        return len(keys)
+
+    def loaded(self):
+        with self._lock:
+            return [m.info() for m in self._models.values()]
+
+
+model_registry = ModelRegistry()
@@ -11,6 +11,7 @@ import contextlib
 import os
 import platform
 import sys
+import threading
 from copy import deepcopy
 from pathlib import Path
 
@@ -34,12 +35,29 @@ try:
 except ImportError:
     thop = None
 
+_call_conf = threading.local()  # conf_thres of single-class heads for this thread's forward passes, see conf_threshold()
+
+
+@contextlib.contextmanager
+def conf_threshold(conf_thres):
+    # Forward passes of the current thread inside the block run single-class Detect() heads at conf_thres instead of
+    # the head's own conf_thres, so a model shared with other threads is never modified
+    previous = getattr(_call_conf, 'value', None)
+    _call_conf.value = conf_thres
+    try:
+        yield
+    finally:
+        _call_conf.value = previous
+
 
 class Detect(nn.Module):
     # YOLOv5 Detect head for detection models
     stride = None  # strides computed during build
     dynamic = False  # force grid reconstruction
     export = False  # export mode
+    fuse_single_cls = True  # single-class models compute obj * cls in the head when conf_thres is set
+    conf_thres = 0.0  # single-class head: anchors at or below this confidence are not decoded, see _single_cls()
+    # conf_thres applies to every caller of the model; callers sharing one use conf_threshold() instead
 
     def __init__(self, nc=80, anchors=(), ch=(), inplace=True):  # detection layer
         super().__init__()
@@ -55,6 +73,8 @@ class Detect(nn.Module):
 
     def forward(self, x):
         z = []  # inference output
+        conf_thres = getattr(_call_conf, 'value', None)
+        conf_thres = self.conf_thres if conf_thres is None else conf_thres
         for i in range(self.nl):
             x[i] = self.m[i](x[i])  # conv
             bs, _, ny, nx = x[i].shape  # x(bs,255,20,20) to x(bs,3,20,20,85)
@@ -69,6 +89,8 @@ class Detect(nn.Module):
                     xy = (xy.sigmoid() * 2 + self.grid[i]) * self.stride[i]  # xy
                     wh = (wh.sigmoid() * 2) ** 2 * self.anchor_grid[i]  # wh
                     y = torch.cat((xy, wh, conf.sigmoid(), mask), 4)
+                elif self.single_cls and conf_thres > 0:  # Detect (boxes only), single class
+                    y = self._single_cls(x[i], i, conf_thres)
                 else:  # Detect (boxes only)
                     xy, wh, conf = x[i].sigmoid().split((2, 2, self.nc + 1), 4)
                     xy = (xy * 2 + self.grid[i]) * self.stride[i]  # xy
@@ -78,6 +100,23 @@ class Detect(nn.Module):
 
         return x if self.training else (torch.cat(z, 1), ) if self.export else (torch.cat(z, 1), x)
 
+    @property
+    def single_cls(self):
+        return self.fuse_single_cls and self.nc == 1 and not self.export and not isinstance(self, Segment)
+
+    def _single_cls(self, x, i, conf_thres):
+        # Single-class output [xywh, obj * cls, 1]: the product is formed here so NMS has no class work left, and only
+        # anchors above conf_thres are decoded, the rest keep zero rows that cannot pass NMS at conf_thres or above
+        s = x[..., 4:6].sigmoid()
+        y = torch.zeros_like(x)
+        conf = torch.mul(s[..., 0], s[..., 1], out=y[..., 4])  # obj * cls
+        y[..., 5] = 1
+        b, a, gy, gx = (conf > conf_thres).nonzero(as_tuple=True)
+        xy, wh = x[b, a, gy, gx, :4].sigmoid().split((2, 2), 1)
+        y[b, a, gy, gx, :4] = torch.cat(((xy * 2 + self.grid[i][0, a, gy, gx]) * self.stride[i],
+                                         (wh * 2) ** 2 * self.anchor_grid[i][0, a, gy, gx]), 1)
+        return y
+
     def _make_grid(self, nx=20, ny=20, i=0, torch_1_10=check_version(torch.__version__, '1.10.0')):
         d = self.anchors[i].device
         t = self.anchors[i].dtype
@@ -106,6 +145,13 @@ class Segment(Detect):
         return (x, p) if self.training else (x[0], p) if self.export else (x[0], p, x[1])
 
 
+def single_class_head(model):
+    # Fused single-class Detect() head of a PyTorch DetectMultiBackend or DetectionModel, None for anything else
+    m = model.model if getattr(model, 'pt', False) else model
+    m = m.model[-1] if isinstance(getattr(m, 'model', None), nn.Sequential) else None
+    return m if isinstance(m, Detect) and m.single_cls else None
+
+
 class BaseModel(nn.Module):
     # YOLOv5 base model
     def forward(self, x, profile=False, visualize=False):
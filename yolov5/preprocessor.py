@@ -0,0 +1,129 @@
+"""
+Allocation-free preprocessing for the micro-batcher.
+
+letterbox() followed by transpose, [::-1], ascontiguousarray, from_numpy, float() and /= 255 makes about five
+full-frame copies per image, three of them float32. Preprocessor keeps a fixed pool of uint8 HWC slots (pinned when
+the model is on CUDA): callers letterbox straight into a free slot, cv2.resize writing into the slot itself. The
+inference thread then fills one reused float NCHW input on the model device with one copy per channel that does
+BGR to RGB, HWC to CHW and the uint8 to float conversion together, and normalizes it in place. Only uint8 data ever
+crosses to the GPU, and no stage allocates a frame-sized array.
+
+Per-stage times are kept in YOLOv5 Profile objects; stats() reports them in ms per image.
+
+Usage:
+    pre = Preprocessor((640, 640), model.device, max_batch=8)
+    slot, shape = pre.load(im0)  # any thread
+    im = pre.batch([slot, ...])  # (n,3,h,w) model input, valid until the next batch()
+    pre.release([slot, ...])
+"""
+
+import os
+import queue
+import sys
+import threading
+from pathlib import Path
+
+import cv2
+import torch
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[0]  # YOLOv5 root directory
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH, yolov5 modules import each other as top-level `utils`/`models`
+
+from yolov5.utils.general import Profile
+
+
+def letterbox_geometry(shape, new_shape):
+    # Resized (w, h) and top/left padding, exactly as letterbox(auto=False) computes them
+    r = min(new_shape[0] / shape[0], new_shape[1] / shape[1])
+    new_unpad = int(round(shape[1] * r)), int(round(shape[0] * r))
+    dw, dh = (new_shape[1] - new_unpad[0]) / 2, (new_shape[0] - new_unpad[1]) / 2
+    return new_unpad, int(round(dh - 0.1)), int(round(dw - 0.1))
+
+
+class Preprocessor:
+    """
+    Letterboxes images into a pool of preallocated slots and turns batches of slots into model input.
+
+    Configured from the environment unless given:
+        PREPROCESS_SLOTS  images that can be letterboxed ahead of inference, callers wait for a free slot beyond that
+                          (default 4 * max_batch)
+    """
+
+    def __init__(self, imgsz, device, fp16=False, max_batch=8, slots=None, color=114):
+        self.imgsz = tuple(imgsz)  # (h, w)
+        self.device = torch.device(device)
+        self.color = color
+        slots = max(slots or int(os.getenv("PREPROCESS_SLOTS", 4 * max_batch)), max_batch)
+        pin = self.device.type == "cuda"
+        h, w = self.imgsz
+        self.host = torch.full((slots, h, w, 3), color, dtype=torch.uint8, pin_memory=pin)
+        self.host_np = self.host.numpy()  # same memory, for OpenCV
+        self.staged = torch.empty((max_batch, h, w, 3), dtype=torch.uint8, pin_memory=pin)  # gathered batch
+        self.device_u8 = self.staged if not pin else torch.empty_like(self.staged, device=self.device)
+        self.input = torch.empty((max_batch, 3, h, w), dtype=torch.half if fp16 else torch.float, device=self.device)
+        self.free = queue.Queue()
+        for slot in range(slots):
+            self.free.put(slot)
+        self.lock = threading.Lock()
+        self.loaded = 0  # images letterboxed
+        self.batched = 0  # images turned into model input
+        self.profiles = {"letterbox": Profile(), "upload": Profile()}
+
+    def load(self, im0):
+        """
+        Letterbox BGR image im0 into a free slot, waiting for one if all are in use. Returns (slot, im0.shape).
+        """
+        slot = self.free.get()
+        try:
+            dt = Profile()
+            dt.cuda = False  # CPU only, runs in the caller's thread: no need to wait for the GPU
+            with dt:
+                self._letterbox(im0, self.host_np[slot])
+        except Exception:
+            self.free.put(slot)
+            raise
+        with self.lock:
+            self.profiles["letterbox"].t += dt.dt
+            self.loaded += 1
+        return slot, im0.shape
+
+    def _letterbox(self, im0, out):
+        (nw, nh), top, left = letterbox_geometry(im0.shape[:2], self.imgsz)
+        region = out[top:top + nh, left:left + nw]
+        if (nw, nh) == im0.shape[1::-1]:
+            region[...] = im0
+        else:
+            cv2.resize(im0, (nw, nh), dst=region, interpolation=cv2.INTER_LINEAR)  # written into the slot
+        # Padding, only the strips around the image: the rest of the slot was just overwritten
+        out[:top], out[top + nh:] = self.color, self.color
+        out[top:top + nh, :left], out[top:top + nh, left + nw:] = self.color, self.color
+
+    def batch(self, slots):
+        """
+        Model input (n,3,h,w) RGB 0-1 for the given slots, in order. The tensor is reused by the next call.
+        """
+        n = len(slots)
+        with self.profiles["upload"]:
+            if slots == list(range(slots[0], slots[0] + n)):  # consecutive slots need no gather
+                src = self.host[slots[0]:slots[0] + n]
+            else:
+                src = torch.index_select(self.host, 0, torch.tensor(slots), out=self.staged[:n])
+            if self.device_u8 is not self.staged:
+                src = self.device_u8[:n].copy_(src, non_blocking=True)
+            im = self.input[:n]
+            for c in range(3):  # BGR HWC uint8 to RGB CHW fp16/32, one pass per channel straight into the input
+                im[:, c].copy_(src[..., 2 - c])
+            im.div_(255)  # 0 - 255 to 0.0 - 1.0, in place
+        self.batched += n
+        return im
+
+    def release(self, slots):
+        for slot in slots:
+            self.free.put(slot)
+
+    def stats(self):
+        # ms per image of each stage
+        counts = {"letterbox": self.loaded, "upload": self.batched}
+        return {k: round(p.t / max(counts[k], 1) * 1E3, 3) for k, p in self.profiles.items()}
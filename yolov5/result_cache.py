@@ -0,0 +1,118 @@
+"""
+Detection result cache keyed by source content and model settings.
+
+The same beach camera snapshots and clips are often submitted more than once. YoloDetect looks up
+(content hash, weights hash, imgsz, conf_thres, iou_thres, ...) here before running inference and reuses the stored
+boxes, annotated result path and status on a hit. Entries live in an in-memory LRU; when RESULT_CACHE_DIR is set,
+entries evicted from memory spill to JSON files there and are promoted back on their next hit.
+
+Usage:
+    from yolov5.result_cache import file_hash, result_cache
+
+    key = result_cache.key(file_hash(path), loaded.weights_hash, imgsz, conf_thres, iou_thres)
+    result = result_cache.get(key) or run_and_put(key)
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+def file_hash(path, chunk_size=1 << 20):
+    # SHA-256 of a file's content, read in chunks
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Thread-safe LRU of detection results with optional disk spill.
+
+    Configured from the environment:
+        RESULT_CACHE_SIZE  entries kept in memory (default 512, 0 disables the cache)
+        RESULT_CACHE_DIR   directory for entries evicted from memory (default: no spill)
+    """
+
+    def __init__(self, capacity=None, spill_dir=None):
+        self.capacity = int(os.getenv("RESULT_CACHE_SIZE", 512)) if capacity is None else capacity
+        spill_dir = spill_dir or os.getenv("RESULT_CACHE_DIR")
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        if self.spill_dir:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.disk_hits = self.misses = self.spills = 0
+
+    @staticmethod
+    def key(content_hash, weights_hash, *params):
+        # params: imgsz, conf_thres, iou_thres and anything else that changes the output
+        return hashlib.sha1(repr((content_hash, weights_hash, *params)).encode()).hexdigest()
+
+    def _spill_path(self, key):
+        return self.spill_dir / f"{key}.json"
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+        if self.spill_dir:
+            f = self._spill_path(key)
+            try:
+                value = json.loads(f.read_text())
+            except (OSError, ValueError):
+                value = None
+            if value is not None:
+                f.unlink(missing_ok=True)
+                self.put(key, value)  # promote back to memory
+                with self.lock:
+                    self.disk_hits += 1
+                return value
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        if self.capacity <= 0:
+            return
+        evicted = []
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                evicted.append(self.entries.popitem(last=False))
+        if self.spill_dir:
+            for k, v in evicted:
+                self._spill_path(k).write_text(json.dumps(v))
+            with self.lock:
+                self.spills += len(evicted)
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+        if self.spill_dir:
+            self._spill_path(key).unlink(missing_ok=True)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self.entries),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "spills": self.spills,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+
+result_cache = ResultCache()
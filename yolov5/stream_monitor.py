@@ -0,0 +1,346 @@
+"""
+Live camera monitoring: many RTSP/RTMP/HTTP streams multiplexed through one batched inference loop.
+
+Each camera gets a CameraReader thread that keeps only its latest decoded frame, sampled at `sample_fps`. The single
+monitor thread takes the newest unseen frame of every camera, submits them together to the model's MicroBatcher
+(one forward pass for all cameras). Detections are grouped into rip events per camera by an IoU tracker: a
+notification goes out when an event is confirmed and one history is written when it ends.
+A camera that is slow, stalled or reconnecting never holds up the others: the loop only picks up frames that are
+ready, and readers overwrite frames nobody consumed instead of queueing them.
+
+A local video file works as a fake RTSP source: it is replayed in real time and looped at the end.
+
+Usage:
+    from yolov5.stream_monitor import stream_monitor
+
+    stream_monitor.publish = event_bus.publish_all
+    stream_monitor.add(camera_id, user_id, "rtsp://example.com/media.mp4", sample_fps=1)
+"""
+
+import datetime
+import ipaddress
+import math
+import os
+import socket
+import threading
+import time
+import urllib.parse
+
+import cv2
+
+from constants import Constants
+from yolov5.event_tracker import EventTracker
+from yolov5.frame_gate import FrameGate
+
+PARENT_PATH = os.getcwd()
+
+CAMERA_CONNECTING = "connecting"
+CAMERA_LIVE = "live"
+CAMERA_RECONNECTING = "reconnecting"
+CAMERA_STOPPED = "stopped"
+STREAM_SCHEMES = ("rtsp", "rtsps", "rtmp", "http", "https")
+
+
+class CameraReader:
+    """
+    Reads one stream on a background thread and keeps only its latest sampled frame.
+
+    Every frame is grabbed so the stream's own buffer never fills, but only one frame per 1/sample_fps seconds is
+    decoded. Lost connections are re-opened with exponential backoff. Files are replayed at their own frame rate
+    and looped, so a clip on disk behaves like a live camera.
+    """
+
+    def __init__(self, source, sample_fps=1.0, replay=None, max_backoff=30.0):
+        self.source = source
+        self.interval = 1 / sample_fps if sample_fps and sample_fps > 0 else 0.0
+        self.replay = os.path.isfile(source) if replay is None else replay
+        self.max_backoff = max_backoff
+        self.lock = threading.Lock()
+        self.frame = None
+        self.seq = 0  # sequence number of self.frame
+        self.seen = 0  # last sequence number handed out by latest()
+        self.grabbed = 0
+        self.sampled = 0
+        self.dropped = 0  # sampled frames overwritten before the monitor took them
+        self.reconnects = 0
+        self.state = CAMERA_CONNECTING
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="camera-reader", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        backoff = 1.0
+        while not self.stopped.is_set():
+            cap = cv2.VideoCapture(self.source)
+            if not cap.isOpened():
+                cap.release()
+                self.state = CAMERA_RECONNECTING
+                self.stopped.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            backoff = 1.0
+            self.state = CAMERA_LIVE
+            fps = cap.get(cv2.CAP_PROP_FPS)  # warning: may return 0 or nan
+            frame_time = 1 / (fps if math.isfinite(fps) and fps > 0 else 30)
+            next_sample = 0.0
+            try:
+                while not self.stopped.is_set():
+                    t = time.monotonic()
+                    if not cap.grab():  # .read() = .grab() followed by .retrieve()
+                        if self.replay and cap.set(cv2.CAP_PROP_POS_FRAMES, 0) and cap.grab():
+                            pass  # looped back to the first frame
+                        else:
+                            break
+                    self.grabbed += 1
+                    if t >= next_sample:
+                        success, im = cap.retrieve()
+                        if success:
+                            self._store(im)
+                            next_sample = t + self.interval
+                    if self.replay:
+                        self.stopped.wait(max(frame_time - (time.monotonic() - t), 0))  # real-time playback
+            finally:
+                cap.release()
+            if not self.stopped.is_set():
+                self.state = CAMERA_RECONNECTING
+                self.reconnects += 1
+        self.state = CAMERA_STOPPED
+
+    def _store(self, im):
+        with self.lock:
+            if self.seq > self.seen:
+                self.dropped += 1
+            self.frame = im
+            self.seq += 1
+            self.sampled += 1
+
+    def latest(self):
+        """
+        (sequence number, frame) of the newest frame not returned before, or None if there is none yet.
+        """
+        with self.lock:
+            if self.seq == self.seen:
+                return None
+            self.seen = self.seq
+            return self.seq, self.frame
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join(timeout=5)
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "grabbed": self.grabbed,
+            "sampled": self.sampled,
+            "dropped": self.dropped,
+            "reconnects": self.reconnects,
+        }
+
+
+class Camera:
+    # A registered stream: its reader, the YoloDetect holding the inference settings, and its rip event tracker
+    def __init__(self, camera_id, user_id, url, reader, detector):
+        self.id = camera_id
+        self.user_id = user_id
+        self.url = url
+        self.reader = reader
+        self.detector = detector
+        self.tracker = EventTracker()
+        # A track must survive a couple of missed samples at low sampling rates
+        self.tracker.max_gap = max(self.tracker.max_gap, 2 * reader.interval)
+        self.gate = FrameGate()
+        self.last_det = None  # detections of the last inferred frame, reused for static frames
+        self.inferred = 0
+        self.alerts = 0
+        self.events = 0
+        self.last_inference = None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "url": self.url,
+            "inferred": self.inferred,
+            "alerts": self.alerts,
+            "events": self.events,
+            "open_events": sum(e.confirmed for e in self.tracker.tracks),
+            "last_inference": self.last_inference,
+            "gate": self.gate.stats(),
+            **self.reader.stats(),
+        }
+
+
+class StreamMonitor:
+    """
+    Runs batched inference over all registered cameras on one background thread.
+
+    Configured from the environment:
+        STREAM_SAMPLE_FPS   frames per second inferred per camera, unless given on add() (default 1)
+        STREAM_ALLOW_FILES  "1" to accept local video files as sources, for testing (default "0")
+        STREAM_ALLOW_PRIVATE  "1" to accept hosts on loopback, private or link-local addresses (default "0"), which
+                            are refused otherwise so a camera URL cannot be used to reach the server's own network
+    and the EVENT_* settings of EventTracker.
+    """
+
+    def __init__(self, publish=None, poll_interval=0.02):
+        self.publish = publish  # callable taking a list of (topic, payload) events, e.g. event_bus.publish_all
+        self.poll_interval = poll_interval  # idle wait when no camera has a new frame
+        self.sample_fps = float(os.getenv("STREAM_SAMPLE_FPS", 1))
+        self.allow_files = os.getenv("STREAM_ALLOW_FILES", "0") == "1"
+        self.allow_private = os.getenv("STREAM_ALLOW_PRIVATE", "0") == "1"
+        self.cameras = {}
+        self.lock = threading.Lock()
+        self.handle_lock = threading.Lock()  # tracker and events of a camera, shared by the loop and remove()
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def check_source(self, url):
+        # Blocking: resolves the host
+        if "://" not in url:
+            return self.allow_files and os.path.isfile(url)
+        try:
+            parsed = urllib.parse.urlsplit(url)
+            host, port = parsed.hostname, parsed.port
+        except ValueError:  # malformed host or port
+            return False
+        if parsed.scheme.lower() not in STREAM_SCHEMES or not host:
+            return False
+        if self.allow_private:
+            return True
+        try:
+            addresses = {info[4][0] for info in socket.getaddrinfo(host, port)}
+        except (socket.gaierror, UnicodeError):
+            return False
+        # Every address the name resolves to must be public
+        return all(ipaddress.ip_address(address.split("%", 1)[0]).is_global for address in addresses)
+
+    def add(self, camera_id, user_id, url, sample_fps=None):
+        """
+        Start monitoring url for user_id, replacing any camera already registered as camera_id.
+        """
+        # Imported here so the app only loads torch once a camera is actually monitored
+        from yolov5.yolo_detect import YoloDetect
+
+        if not self.check_source(url):
+            raise ValueError(f"Unsupported source for camera {camera_id}")  # the URL may hold credentials
+        detector = YoloDetect(user_id, url)
+        detector.source_name = f"camera:{camera_id}"  # histories name the camera, never its URL and credentials
+        detector.load_model()  # load before the reader starts producing frames
+        reader = CameraReader(url, sample_fps=sample_fps or self.sample_fps)
+        camera = Camera(camera_id, user_id, url, reader, detector)
+        with self.lock:
+            previous = self.cameras.pop(camera_id, None)
+            self.cameras[camera_id] = camera
+            if self.thread is None or not self.thread.is_alive():
+                self.stopped.clear()
+                self.thread = threading.Thread(target=self._run, name="stream-monitor", daemon=True)
+                self.thread.start()
+        if previous is not None:
+            self._close(previous)
+        return camera
+
+    def remove(self, camera_id):
+        with self.lock:
+            camera = self.cameras.pop(camera_id, None)
+        if camera is not None:
+            self._close(camera)
+        return camera is not None
+
+    def camera_ids(self):
+        with self.lock:
+            return set(self.cameras)
+
+    def get(self, camera_id):
+        camera = self.cameras.get(camera_id)
+        return camera.to_dict() if camera is not None else None
+
+    def stats(self):
+        with self.lock:
+            cameras = list(self.cameras.values())
+        return {"cameras": len(cameras), "running": self.thread is not None and self.thread.is_alive()}
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            self.thread = None
+        with self.lock:
+            cameras, self.cameras = list(self.cameras.values()), {}
+        for camera in cameras:
+            self._close(camera)
+
+    def _close(self, camera):
+        # Stop reading and record the events still open
+        camera.reader.close()
+        with self.handle_lock:
+            for event in camera.tracker.flush():
+                self._finish_event(camera, event)
+            self._publish(camera)
+
+    def _run(self):
+        while not self.stopped.is_set():
+            with self.lock:
+                cameras = list(self.cameras.values())
+            # Newest unseen frame of every camera that has one; cameras without a new frame are simply skipped
+            submitted = []
+            for camera in cameras:
+                latest = camera.reader.latest()
+                if latest is None:
+                    continue
+                frame = latest[1]
+                changed = camera.gate.changed(frame)  # every frame, so the first one becomes the reference
+                if camera.last_det is not None and not changed:
+                    submitted.append((camera, frame, None))  # static scene, reuse the last detections
+                else:
+                    submitted.append((camera, frame, camera.detector.submit_image(frame)))
+            if not submitted:
+                self.stopped.wait(self.poll_interval)
+                continue
+            for camera, frame, future in submitted:
+                try:
+                    det = camera.last_det if future is None else future.result()
+                    with self.handle_lock:
+                        self._handle(camera, frame, det, inferred=future is not None)
+                except Exception as e:
+                    print(f"Camera {camera.id} inference failed: {e}")
+
+    def _handle(self, camera, frame, det, inferred=True):
+        if inferred:
+            camera.inferred += 1
+            camera.last_det = det
+        camera.last_inference = time.time()
+        started, finished = camera.tracker.update(det.numpy(), camera.last_inference, frame)
+        detector = camera.detector
+        for event in started:
+            # Notify as soon as a rip is confirmed, with the frame that confirmed it
+            camera.alerts += 1
+            im0 = detector.annotate(frame.copy(), det, detector.load_model().names)
+            detector.alert_image(self._save(camera, event, im0))
+        for event in finished:
+            self._finish_event(camera, event)
+        self._publish(camera)
+
+    def _finish_event(self, camera, event):
+        # One history per rip event, pointing at its most confident frame
+        camera.events += 1
+        detector = camera.detector
+        box = [[*event.peak_box, event.peak_conf, 0]]
+        im0 = detector.annotate(event.best_frame.copy(), box, detector.load_model().names)
+        file_name = self._save(camera, event, im0, "best")
+        detector.save_history(file_name, True, rip_events=[{**event.to_dict(), "best_frame": file_name}])
+
+    @staticmethod
+    def _save(camera, event, im0, suffix="start"):
+        now = datetime.datetime.now()
+        file_name = f"{int(datetime.datetime.timestamp(now))}_camera_{camera.id}_event{event.id}_{suffix}.jpg"
+        cv2.imwrite(os.path.join(PARENT_PATH, Constants.DETECTION_FOLDER + file_name), im0)
+        return file_name
+
+    def _publish(self, camera):
+        events, camera.detector.events = camera.detector.events, []
+        if events and self.publish is not None:
+            self.publish(events)
+
+
+stream_monitor = StreamMonitor()
@@ -0,0 +1,155 @@
+"""
+Sliced inference for high-resolution imagery.
+
+A 4000x3000 drone photo letterboxed to 640x640 shrinks a rip current to a few pixels. TiledInference cuts the image
+into overlapping tile_size x tile_size windows, runs every window at the model resolution, maps the boxes back to
+image coordinates and merges the duplicates found by neighbouring tiles across their seams with NMS. A downscaled
+pass over the whole frame is included by default, so rips larger than a tile are still found in one piece.
+
+The windows of one image go through the model together: detect() batches them directly on a DetectMultiBackend
+(detect.py, benchmarks), submit() queues them on the shared MicroBatcher so they share forward passes with whatever
+else the service is running.
+
+Usage:
+    tiler = TiledInference(tile_size=640, overlap=0.2)
+    det = tiler.detect(model, im0, imgsz=(640, 640), conf_thres=0.25)  # (n,6) tensor [xyxy, conf, cls] in im0 pixels
+    det = tiler.submit(loaded.batcher, im0, conf_thres=0.25).result()
+"""
+
+import math
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+import torchvision
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[0]  # YOLOv5 root directory
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH, yolov5 modules import each other as top-level `utils`/`models`
+
+# Top-level imports like the rest of yolov5, so detect.py can import this module when run as a script
+from utils.augmentations import letterbox
+from models.yolo import conf_threshold
+from utils.general import non_max_suppression, scale_boxes
+
+
+def tile_starts(length, tile, stride):
+    # Window offsets along one axis: evenly stepped, the last one flush with the far edge
+    if length <= tile:
+        return [0]
+    n = math.ceil((length - tile) / stride) + 1
+    return sorted({min(i * stride, length - tile) for i in range(n)})
+
+
+class TiledFuture:
+    # Future-like result of TiledInference.submit(): waits for every window, then merges
+    def __init__(self, tiler, futures, windows, shape, nms):
+        self.tiler = tiler
+        self.futures = futures
+        self.windows = windows
+        self.shape = shape
+        self.nms = nms
+
+    def done(self):
+        return all(f.done() for f in self.futures)
+
+    def result(self, timeout=None):
+        dets = [f.result(timeout) for f in self.futures]
+        return self.tiler.merge(dets, self.windows, self.shape, **self.nms)
+
+
+class TiledInference:
+    """
+    Configured from the environment unless given:
+        TILE_SIZE        tile side in source pixels, 0 disables tiling (default 0)
+        TILE_OVERLAP     fraction of a tile shared with its neighbour (default 0.2)
+        TILE_BATCH       tiles per forward pass in detect(); the service batches through MICRO_BATCH_SIZE (default 8)
+        TILE_FULL_FRAME  "0" to skip the extra downscaled pass over the whole image (default "1")
+
+    Images no larger than one tile are not tiled.
+    """
+
+    def __init__(self, tile_size=None, overlap=None, batch_size=None, full_frame=None):
+        self.tile_size = int(os.getenv("TILE_SIZE", 0)) if tile_size is None else tile_size
+        self.overlap = float(os.getenv("TILE_OVERLAP", 0.2)) if overlap is None else overlap
+        self.batch_size = int(os.getenv("TILE_BATCH", 8)) if batch_size is None else batch_size
+        self.full_frame = os.getenv("TILE_FULL_FRAME", "1") == "1" if full_frame is None else full_frame
+        if not 0 <= self.overlap < 1:
+            raise ValueError(f"Tile overlap must be in [0, 1), got {self.overlap}")
+
+    def settings(self):
+        # Everything that changes the detections, for result cache keys; batch size only changes speed
+        return (self.tile_size, self.overlap, self.full_frame) if self.tile_size > 0 else None
+
+    def enabled_for(self, shape):
+        return self.tile_size > 0 and max(shape[:2]) > self.tile_size
+
+    def windows(self, shape):
+        """
+        (x1, y1, x2, y2) windows covering an image of shape (h, w), the whole frame last if full_frame is set.
+        """
+        h, w = shape[:2]
+        stride = max(int(self.tile_size * (1 - self.overlap)), 1)
+        windows = [
+            (x, y, min(x + self.tile_size, w), min(y + self.tile_size, h))
+            for y in tile_starts(h, self.tile_size, stride)
+            for x in tile_starts(w, self.tile_size, stride)
+        ]
+        if self.full_frame and len(windows) > 1:
+            windows.append((0, 0, w, h))
+        return windows
+
+    def merge(self, dets, windows, shape, conf_thres=0.25, iou_thres=0.45, classes=None, agnostic=False,
+              max_det=1000):
+        """
+        Shift per-window (n,6) detections in window pixels to image pixels and suppress duplicates across seams.
+        """
+        offsets = [torch.tensor([x1, y1, x1, y1], dtype=torch.float32) for x1, y1, _, _ in windows]
+        det = torch.cat([d[:, :6].float() for d in dets]) if dets else torch.zeros((0, 6))
+        if not len(det):
+            return det
+        det[:, :4] += torch.cat([o.expand(len(d), 4) for o, d in zip(offsets, dets)])
+        # Classes, same offset trick as non_max_suppression, larger than any box of this image so classes never overlap
+        c = det[:, 5:6] * (0 if agnostic else max(shape[:2]) + 1)
+        keep = torchvision.ops.nms(det[:, :4] + c, det[:, 4], iou_thres)[:max_det]
+        det = det[keep]
+        det[:, [0, 2]] = det[:, [0, 2]].clamp(0, shape[1])
+        det[:, [1, 3]] = det[:, [1, 3]].clamp(0, shape[0])
+        return det
+
+    def submit(self, batcher, im0, **nms):
+        """
+        Queue every window of im0 on the micro-batcher; returns a TiledFuture resolving to the merged detections.
+        """
+        windows = self.windows(im0.shape)
+        futures = [batcher.submit(im0[y1:y2, x1:x2], **nms) for x1, y1, x2, y2 in windows]
+        return TiledFuture(self, futures, windows, im0.shape, nms)
+
+    @torch.no_grad()
+    def detect(self, model, im0, imgsz, conf_thres=0.25, iou_thres=0.45, classes=None, agnostic=False, max_det=1000):
+        """
+        Run the windows of BGR image im0 through model batch_size at a time and return the merged detections.
+        """
+        windows = self.windows(im0.shape)
+        dets = []
+        for i in range(0, len(windows), max(self.batch_size, 1)):
+            chunk = windows[i:i + max(self.batch_size, 1)]
+            crops = [im0[y1:y2, x1:x2] for x1, y1, x2, y2 in chunk]
+            # Fixed model shape (auto=False) so windows of different sizes stack into one batch
+            ims = [letterbox(crop, imgsz, stride=model.stride, auto=False)[0] for crop in crops]
+            im = np.ascontiguousarray(np.stack(ims).transpose((0, 3, 1, 2))[:, ::-1])  # BHWC to BCHW, BGR to RGB
+            im = torch.from_numpy(im).to(model.device)
+            im = im.half() if model.fp16 else im.float()  # uint8 to fp16/32
+            im /= 255  # 0 - 255 to 0.0 - 1.0
+            with conf_threshold(conf_thres):  # skip decoding boxes NMS would drop anyway
+                pred = model(im)
+            if isinstance(pred, (list, tuple)):
+                pred = pred[0]  # select only inference output
+            pred = non_max_suppression(pred, conf_thres, iou_thres, classes, agnostic, max_det=max_det)
+            for crop, det in zip(crops, pred):
+                det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], crop.shape).round()
+                dets.append(det.cpu())
+        return self.merge(dets, windows, im0.shape, conf_thres, iou_thres, classes, agnostic, max_det)
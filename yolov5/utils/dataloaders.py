@@ -9,13 +9,15 @@ import hashlib
 import json
 import math
 import os
+import queue
 import random
 import shutil
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from itertools import repeat
 from multiprocessing.pool import Pool, ThreadPool
 from pathlib import Path
-from threading import Thread
+from threading import Event, Thread
 from urllib.parse import urlparse
 
 import numpy as np
@@ -30,6 +32,7 @@ from tqdm import tqdm
 
 from utils.augmentations import (Albumentations, augment_hsv, classify_albumentations, classify_transforms, copy_paste,
                                  letterbox, mixup, random_perspective)
+from utils.frame_ring import FrameRing
 from utils.general import (DATASETS_DIR, LOGGER, NUM_THREADS, TQDM_BAR_FORMAT, check_dataset, check_requirements,
                            check_yaml, clean_str, cv2, is_colab, is_kaggle, segments2boxes, unzip_file, xyn2xy,
                            xywh2xyxy, xywhn2xyxy, xyxy2xywhn)
@@ -39,6 +42,7 @@ from utils.torch_utils import torch_distributed_zero_first
 HELP_URL = 'See https://docs.ultralytics.com/yolov5/tutorials/train_custom_data'
 IMG_FORMATS = 'bmp', 'dng', 'jpeg', 'jpg', 'mpo', 'png', 'tif', 'tiff', 'webp', 'pfm'  # include image suffixes
 VID_FORMATS = 'asf', 'avi', 'gif', 'm4v', 'mkv', 'mov', 'mp4', 'mpeg', 'mpg', 'ts', 'wmv'  # include video suffixes
+REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
 LOCAL_RANK = int(os.getenv('LOCAL_RANK', -1))  # https://pytorch.org/docs/stable/elastic/run.html
 RANK = int(os.getenv('RANK', -1))
 PIN_MEMORY = str(os.getenv('PIN_MEMORY', True)).lower() == 'true'  # global pin_memory for dataloaders
@@ -67,6 +71,29 @@ def exif_size(img):
     return s
 
 
+def imread_reduced(path, size):
+    """
+    Read a BGR image, JPEGs decoded at 1/2, 1/4 or 1/8 scale in the DCT domain while their longest side stays at least
+    `size`, for images shrunk to `size` right after loading. The scale comes from the header dimensions (PIL reads no
+    pixels). Other formats, unreadable headers and failed reduced decodes fall back to a full cv2.imread().
+
+    Returns (im, (h0, w0)) with the full-resolution, EXIF-corrected height and width; im is None if unreadable.
+    """
+    with contextlib.suppress(Exception):
+        with Image.open(path) as img:
+            w0, h0 = exif_size(img)
+            jpeg = img.format == 'JPEG'
+        if jpeg:
+            for factor, flag in REDUCED_FLAGS:
+                if max(h0, w0) / factor >= size:
+                    im = cv2.imread(path, flag)  # BGR, EXIF orientation applied like imread()
+                    if im is not None:
+                        return im, (h0, w0)
+                    break
+    im = cv2.imread(path)  # BGR
+    return im, None if im is None else im.shape[:2]
+
+
 def exif_transpose(image):
     """
     Transpose a PIL image accordingly if it has an EXIF Orientation tag.
@@ -238,7 +265,8 @@ class LoadScreenshots:
 
 class LoadImages:
     # YOLOv5 image/video dataloader, i.e. `python detect.py --source image.jpg/vid.mp4`
-    def __init__(self, path, img_size=640, stride=32, auto=True, transforms=None, vid_stride=1):
+    # reduced_decode: decode large JPEGs at 1/2, 1/4 or 1/8 scale still no smaller than img_size, see imread_reduced()
+    def __init__(self, path, img_size=640, stride=32, auto=True, transforms=None, vid_stride=1, reduced_decode=False):
         if isinstance(path, str) and Path(path).suffix == '.txt':  # *.txt file with img/vid/dir on each line
             path = Path(path).read_text().rsplit()
         files = []
@@ -266,6 +294,7 @@ class LoadImages:
         self.auto = auto
         self.transforms = transforms  # optional
         self.vid_stride = vid_stride  # video frame-rate stride
+        self.reduced_decode = reduced_decode
         if any(videos):
             self._new_video(videos[0])  # new video
         else:
@@ -304,18 +333,24 @@ class LoadImages:
         else:
             # Read image
             self.count += 1
-            im0 = cv2.imread(path)  # BGR
+            im0 = self.imread(path)  # BGR
             assert im0 is not None, f'Image Not Found {path}'
             s = f'image {self.count}/{self.nf} {path}: '
 
-        if self.transforms:
-            im = self.transforms(im0)  # transforms
-        else:
-            im = letterbox(im0, self.img_size, stride=self.stride, auto=self.auto)[0]  # padded resize
-            im = im.transpose((2, 0, 1))[::-1]  # HWC to CHW, BGR to RGB
-            im = np.ascontiguousarray(im)  # contiguous
+        return path, self.preprocess(im0), im0, self.cap, s
+
+    def imread(self, path):
+        if not self.reduced_decode:
+            return cv2.imread(path)  # BGR
+        size = max(self.img_size) if isinstance(self.img_size, (list, tuple)) else self.img_size
+        return imread_reduced(path, size)[0]
 
-        return path, im, im0, self.cap, s
+    def preprocess(self, im0):
+        if self.transforms:
+            return self.transforms(im0)  # transforms
+        im = letterbox(im0, self.img_size, stride=self.stride, auto=self.auto)[0]  # padded resize
+        im = im.transpose((2, 0, 1))[::-1]  # HWC to CHW, BGR to RGB
+        return np.ascontiguousarray(im)  # contiguous
 
     def _new_video(self, path):
         # Create a new video capture object
@@ -339,9 +374,179 @@ class LoadImages:
         return self.nf  # number of files
 
 
+class VideoInfo:
+    # cv2.VideoCapture properties read at open time, still valid once the capture has moved on or been released
+    def __init__(self, cap):
+        self.props = {p: cap.get(p) for p in (cv2.CAP_PROP_FPS, cv2.CAP_PROP_FRAME_WIDTH, cv2.CAP_PROP_FRAME_HEIGHT)}
+
+    def get(self, prop):
+        return self.props.get(prop, 0.0)
+
+
+class LoadImagesPrefetch:
+    """
+    LoadImages that decodes and letterboxes ahead of the consumer on `workers` threads, yielding in the same order.
+
+    A producer thread walks the files; images are read and letterboxed by the pool (cv2 releases the GIL), video frames
+    are grabbed in order by the producer and letterboxed by the pool. At most `depth` items are in flight, so memory
+    stays bounded however far inference falls behind. mode/frame/count describe the item last returned, and vid_cap is
+    a VideoInfo snapshot because the producer may already have released the capture. Iterating is a generator, so a
+    consumer that stops early (break, exception) closes it, which stops the producer and the pool; see close().
+    """
+
+    def __init__(self, dataset, workers=4, depth=None):
+        self.dataset = dataset
+        self.workers = max(workers, 1)
+        self.depth = depth or 2 * self.workers
+        self.mode, self.frame, self.count = 'image', 0, 0
+        if dataset.cap is not None:
+            dataset.cap.release()  # opened by LoadImages, the producer opens its own
+
+    def __iter__(self):
+        self.queue = queue.Queue(maxsize=self.depth)
+        self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix='prefetch')
+        self.stopped = Event()
+        Thread(target=self._produce, daemon=True).start()
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    return
+                path, im, im0, vid_cap, s, self.mode, self.frame, self.count = item.result()
+                yield path, im, im0, vid_cap, s
+        finally:
+            self.close()
+
+    def close(self):
+        # Stop the producer and drop the work not started yet, also when the consumer stops before the end
+        self.stopped.set()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def _put(self, item):
+        # Queue item, waiting for room; False once close() was called, the consumer is gone
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce(self):
+        ds = self.dataset
+        try:
+            for i, (path, video) in enumerate(zip(ds.files, ds.video_flag)):
+                if not video:
+                    if not self._put(self.pool.submit(self._image, path, i)):
+                        return
+                    continue
+                cap = cv2.VideoCapture(path)
+                try:
+                    info, frames, frame = VideoInfo(cap), int(cap.get(cv2.CAP_PROP_FRAME_COUNT) / ds.vid_stride), 0
+                    while True:
+                        for _ in range(ds.vid_stride):
+                            cap.grab()
+                        ret_val, im0 = cap.retrieve()
+                        if not ret_val:
+                            break
+                        frame += 1
+                        s = f'video {i + 1}/{ds.nf} ({frame}/{frames}) {path}: '
+                        if not self._put(self.pool.submit(self._frame, path, im0, info, s, frame, i)):
+                            return
+                finally:
+                    cap.release()
+        except Exception as e:  # also pool.submit() after close()
+            failed = Future()
+            failed.set_exception(e)
+            self._put(failed)
+        self._put(None)
+
+    def _image(self, path, i):
+        im0 = self.dataset.imread(path)  # BGR
+        assert im0 is not None, f'Image Not Found {path}'
+        s = f'image {i + 1}/{self.dataset.nf} {path}: '
+        return path, self.dataset.preprocess(im0), im0, None, s, 'image', 0, i + 1
+
+    def _frame(self, path, im0, info, s, frame, i):
+        return path, self.dataset.preprocess(im0), im0, info, s, 'video', frame, i
+
+
+class LoadImagesBatched:
+    """
+    Groups consecutive images of LoadImages (or LoadImagesPrefetch) into batches of up to batch_size for detect.py.
+
+    Only images with the same letterboxed shape are stacked, so every image is inferred exactly as it would be alone;
+    a shape change or a video ends the batch early. Video frames come through as batches of one. Yields
+    (paths, ims (n,3,h,w), im0s, vid_cap, strings) with lists of one entry per image.
+    """
+
+    def __init__(self, dataset, batch_size=8):
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.mode, self.frame, self.count = 'image', 0, 0
+
+    def __iter__(self):
+        self.iterator = iter(self.dataset)
+        self.pending = None  # item read ahead that did not fit the previous batch
+        return self
+
+    def _next_item(self):
+        if self.pending is not None:
+            item, self.pending = self.pending, None
+            return item
+        item = next(self.iterator, None)
+        ds = self.dataset
+        return None if item is None else (item, ds.mode, getattr(ds, 'frame', 0), ds.count)
+
+    def __next__(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            item = self._next_item()
+            if item is None:
+                break
+            (_, im, *_), mode, _, _ = item
+            if batch and (mode != 'image' or self.mode != 'image' or im.shape != batch[0][0][1].shape):
+                self.pending = item  # starts the next batch
+                break
+            batch.append(item)
+            self.mode = mode
+            if mode != 'image':
+                break  # video frames one at a time
+        if not batch:
+            raise StopIteration
+        _, self.mode, self.frame, self.count = batch[-1]
+        paths, ims, im0s, vid_caps, strings = zip(*(item for item, *_ in batch))
+        return list(paths), np.stack(ims), list(im0s), vid_caps[-1], list(strings)
+
+    def __len__(self):
+        return len(self.dataset)
+
+
 class LoadStreams:
-    # YOLOv5 streamloader, i.e. `python detect.py --source 'rtsp://example.com/media.mp4'  # RTSP, RTMP, HTTP streams`
-    def __init__(self, sources='file.streams', img_size=640, stride=32, auto=True, transforms=None, vid_stride=1):
+    """
+    YOLOv5 streamloader, i.e. `python detect.py --source 'rtsp://example.com/media.mp4'  # RTSP, RTMP, HTTP streams`
+
+    Every stream is decoded by its own thread straight into a FrameRing of `buffer` preallocated frames. Each batch
+    holds the latest frame of every stream not returned before, waiting up to two frame intervals of the slowest stream
+    in all, then repeating the previous frame of streams that have none. seq[i] is the sequence number of stream i's
+    frame in the last batch and rings[i].dropped counts the frames it skipped. The frames returned are copies the
+    caller owns, the per-stream arrays they are read into are reused for every batch. With shared=True the rings are in
+    shared memory, so another process can read the frames with FrameRing.attach(rings[i].name) while this one only
+    captures.
+    """
+
+    def __init__(self,
+                 sources='file.streams',
+                 img_size=640,
+                 stride=32,
+                 auto=True,
+                 transforms=None,
+                 vid_stride=1,
+                 buffer=4,
+                 shared=False):
         torch.backends.cudnn.benchmark = True  # faster for fixed-size inference
         self.mode = 'stream'
         self.img_size = img_size
@@ -351,6 +556,7 @@ class LoadStreams:
         n = len(sources)
         self.sources = [clean_str(x) for x in sources]  # clean source names for later
         self.imgs, self.fps, self.frames, self.threads = [None] * n, [0] * n, [0] * n, [None] * n
+        self.rings, self.seq = [None] * n, [0] * n
         for i, s in enumerate(sources):  # index, source
             # Start thread to read frames from video stream
             st = f'{i + 1}/{n}: {s}... '
@@ -371,7 +577,9 @@ class LoadStreams:
             self.frames[i] = max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 0) or float('inf')  # infinite stream fallback
             self.fps[i] = max((fps if math.isfinite(fps) else 0) % 100, 0) or 30  # 30 FPS fallback
 
-            _, self.imgs[i] = cap.read()  # guarantee first frame
+            _, self.imgs[i] = cap.read()  # guarantee first frame, the array is then reused for every batch
+            self.rings[i] = FrameRing(self.imgs[i].shape, slots=max(buffer, 2), shared=shared)
+            self.rings[i].write(self.imgs[i])
             self.threads[i] = Thread(target=self.update, args=([i, cap, s]), daemon=True)
             LOGGER.info(f'{st} Success ({self.frames[i]} frames {w}x{h} at {self.fps[i]:.2f} FPS)')
             self.threads[i].start()
@@ -386,19 +594,21 @@ class LoadStreams:
             LOGGER.warning('WARNING ⚠️ Stream shapes differ. For optimal performance supply similarly-shaped streams.')
 
     def update(self, i, cap, stream):
-        # Read stream `i` frames in daemon thread
-        n, f = 0, self.frames[i]  # frame number, frame array
+        # Read stream `i` frames in daemon thread, decoded straight into its ring
+        n, f, ring = 0, self.frames[i], self.rings[i]  # frame number, frame array, frame ring
         while cap.isOpened() and n < f:
             n += 1
             cap.grab()  # .read() = .grab() followed by .retrieve()
             if n % self.vid_stride == 0:
-                success, im = cap.retrieve()
-                if success:
-                    self.imgs[i] = im
-                else:
+                slot = ring.claim()
+                success, im = cap.retrieve(slot)
+                if not success:
                     LOGGER.warning('WARNING ⚠️ Video stream unresponsive, please check your IP camera connection.')
-                    self.imgs[i] = np.zeros_like(self.imgs[i])
+                    slot[:] = 0
                     cap.open(stream)  # re-open stream if signal was lost
+                elif im is not slot:  # resolution changed, OpenCV allocated a new array
+                    cv2.resize(im, slot.shape[1::-1], dst=slot)
+                ring.commit()
             time.sleep(0.0)  # wait time
 
     def __iter__(self):
@@ -411,7 +621,20 @@ class LoadStreams:
             cv2.destroyAllWindows()
             raise StopIteration
 
-        im0 = self.imgs.copy()
+        # Latest unseen frame of every stream, or its previous one if none comes before one shared deadline
+        waiting = set(range(len(self.rings)))
+        deadline = time.monotonic() + max(2 * self.vid_stride / fps for fps in self.fps)
+        while True:
+            for i in list(waiting):
+                latest = self.rings[i].latest(self.imgs[i])
+                if latest:
+                    self.seq[i] = latest[0]
+                    waiting.discard(i)
+            if not waiting or time.monotonic() >= deadline:
+                break
+            time.sleep(0.001)
+
+        im0 = [x.copy() for x in self.imgs]  # self.imgs are refilled by the next batch, callers keep their own frames
         if self.transforms:
             im = np.stack([self.transforms(x) for x in im0])  # transforms
         else:
@@ -433,6 +656,7 @@ def img2label_paths(img_paths):
 
 class LoadImagesAndLabels(Dataset):
     # YOLOv5 train_loader/val_loader, loads images and labels for training and validation
+    # reduced_decode: decode large JPEGs at 1/2, 1/4 or 1/8 scale still no smaller than img_size, see imread_reduced()
     cache_version = 0.6  # dataset labels *.cache version
     rand_interp_methods = [cv2.INTER_NEAREST, cv2.INTER_LINEAR, cv2.INTER_CUBIC, cv2.INTER_AREA, cv2.INTER_LANCZOS4]
 
@@ -449,8 +673,10 @@ class LoadImagesAndLabels(Dataset):
                  stride=32,
                  pad=0.0,
                  min_items=0,
-                 prefix=''):
+                 prefix='',
+                 reduced_decode=False):
         self.img_size = img_size
+        self.reduced_decode = reduced_decode
         self.augment = augment
         self.hyp = hyp
         self.image_weights = image_weights
@@ -731,10 +957,15 @@ class LoadImagesAndLabels(Dataset):
         if im is None:  # not cached in RAM
             if fn.exists():  # load npy
                 im = np.load(fn)
+                h0, w0 = im.shape[:2]  # orig hw
+            elif self.reduced_decode:  # read image, large JPEGs decoded at a reduced scale still no smaller than img_size
+                im, hw0 = imread_reduced(f, self.img_size)  # BGR
+                assert im is not None, f'Image Not Found {f}'
+                h0, w0 = hw0  # orig hw
             else:  # read image
                 im = cv2.imread(f)  # BGR
                 assert im is not None, f'Image Not Found {f}'
-            h0, w0 = im.shape[:2]  # orig hw
+                h0, w0 = im.shape[:2]  # orig hw
             r = self.img_size / max(h0, w0)  # ratio
             if r != 1:  # if sizes are not equal
                 interp = cv2.INTER_LINEAR if (self.augment or r > 1) else cv2.INTER_AREA
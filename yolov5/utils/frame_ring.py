@@ -0,0 +1,164 @@
+"""
+Fixed-size frame ring buffers for LoadStreams, optionally in shared memory.
+
+A ring holds `slots` preallocated frames of one stream. The capture thread decodes straight into the next slot
+(cap.retrieve(ring.claim()) then ring.commit()), so no frame is ever allocated after start-up, and every frame gets a
+sequence number 1, 2, 3... Readers ask for the latest frame they have not seen yet and are told how many frames were
+written in between, i.e. dropped because inference was slower than capture.
+
+With shared=True the ring lives in a multiprocessing.shared_memory block that any process on the machine can attach to
+by name, so inference can run in a different process from capture.
+
+Usage:
+    ring = FrameRing((720, 1280, 3), slots=4, shared=True)  # capture side
+    success, _ = cap.retrieve(ring.claim())
+    ring.commit()
+
+    ring = FrameRing.attach(name)  # inference side, any process
+    seq, frame, dropped = ring.latest(out, timeout=0.1) or (None, None, 0)
+"""
+
+import sys
+import time
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+
+import cv2
+import numpy as np
+
+SLOTS, HEIGHT, WIDTH, CHANNELS, LATEST = range(5)  # int64 header fields, followed by one stamp per slot
+HEADER = 8  # fields reserved before the stamps
+
+
+def _data_offset(slots):
+    return (HEADER + slots) * 8 + 63 & ~63  # frames start on a 64-byte boundary
+
+
+def _open(name):
+    # Attach without registering with this process's resource tracker, which would otherwise unlink the block when this
+    # process exits, under the creator's feet (Python < 3.13 has no track=False)
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register, resource_tracker.register = resource_tracker.register, lambda *args: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _release(shm, unlink):
+    try:
+        shm.close()
+    except BufferError:  # frames still referenced, the mapping goes with the process
+        pass
+    if unlink:
+        shm.unlink()
+
+
+class FrameRing:
+    """
+    Ring of `slots` preallocated HWC uint8 frames of one stream, with a single writer and any number of readers.
+
+    The writer fills slot seq % slots in place and publishes it with commit(). Each slot carries the sequence number of
+    the frame in it, cleared while the slot is being written, so a reader can tell when the writer lapped the slot it
+    was copying and retries with the newest frame. Readers keep their own `seen` and `dropped` counts per FrameRing
+    object. Frames arriving with another resolution than the ring's are resized into it by write().
+    """
+
+    def __init__(self, shape, slots=4, shared=False, name=None):
+        # name: attach to an existing shared ring, shape and slots are then read from it (see attach())
+        if name is not None:
+            self.shm = _open(name)
+            slots, h, w, c = np.ndarray((4,), np.int64, self.shm.buf).tolist()
+            buf, unlink = self.shm.buf, False
+        else:
+            h, w, c = shape
+            size = _data_offset(slots) + slots * h * w * c
+            self.shm = shared_memory.SharedMemory(create=True, size=size) if shared else None
+            buf, unlink = self.shm.buf if shared else bytearray(size), True
+        self.slots = slots
+        self.header = np.ndarray((HEADER + slots,), np.int64, buf)
+        self.stamps = self.header[HEADER:]  # sequence number of the frame in each slot, 0 while it is written
+        self.frames = np.ndarray((slots, h, w, c), np.uint8, buf, offset=_data_offset(slots))
+        if name is None:
+            self.header[:LATEST + 1] = slots, h, w, c, 0
+            self.stamps[:] = 0
+        self._finalize = weakref.finalize(self, _release, self.shm, unlink) if self.shm else None
+        self.seen = 0  # sequence number of the last frame returned by latest()
+        self.dropped = 0  # frames written after `seen` that latest() skipped
+
+    @classmethod
+    def attach(cls, name):
+        # Open the shared ring another process created as FrameRing(..., shared=True), by its `name`
+        return cls(None, name=name)
+
+    @property
+    def name(self):
+        return self.shm.name if self.shm else None
+
+    @property
+    def shape(self):
+        return self.frames.shape[1:]
+
+    @property
+    def seq(self):
+        # Sequence number of the newest frame written, 0 before the first one
+        return int(self.header[LATEST])
+
+    def claim(self):
+        """
+        The slot of the next frame, for the writer to fill in place before commit().
+        """
+        k = (self.header[LATEST] + 1) % self.slots
+        self.stamps[k] = 0  # being written
+        return self.frames[k]
+
+    def commit(self):
+        """
+        Publish the claimed slot as the newest frame. Returns its sequence number.
+        """
+        seq = self.header[LATEST] + 1
+        self.stamps[seq % self.slots] = seq
+        self.header[LATEST] = seq
+        return int(seq)
+
+    def write(self, im):
+        """
+        Copy im into the next slot, resized if its resolution differs from the ring's, and publish it.
+        """
+        slot = self.claim()
+        if im.shape == slot.shape:
+            np.copyto(slot, im)
+        else:
+            cv2.resize(im, slot.shape[1::-1], dst=slot)
+        return self.commit()
+
+    def latest(self, out=None, timeout=0.0, poll=0.001):
+        """
+        (seq, frame, dropped) of the newest frame this reader has not seen, copied into out (allocated if None), or None
+        if no new frame is written within timeout seconds. dropped is the number of frames skipped since the previous
+        call, the frames before the first one returned are not counted.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            seq = int(self.header[LATEST])
+            if seq > self.seen:
+                k = seq % self.slots
+                if out is None:
+                    out = np.empty_like(self.frames[k])
+                np.copyto(out, self.frames[k])
+                if self.stamps[k] == seq:  # not overwritten during the copy, else retry with the newest frame
+                    dropped = seq - self.seen - 1 if self.seen else 0
+                    self.seen = seq
+                    self.dropped += dropped
+                    return seq, out, dropped
+            elif time.monotonic() >= deadline:
+                return None
+            else:
+                time.sleep(poll)
+
+    def close(self):
+        # Release this process's mapping of a shared ring, the creator also removes the block
+        self.header = self.stamps = self.frames = None
+        if self._finalize:
+            self._finalize()
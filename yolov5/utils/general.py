@@ -876,6 +876,10 @@ def non_max_suppression(
 ):
     """Non-Maximum Suppression (NMS) on inference results to reject overlapping detections
 
+    Candidate filtering runs on the whole batch at once and NMS is a single torchvision.ops.batched_nms() call grouped by
+    image (and class), on boxes shifted to non-negative coordinates so groups never overlap, so results are the same as
+    running NMS image by image, for any batch size.
+
     Returns:
          list of detections, on (n,6) tensor per image [xyxy, conf, cls]
     """
@@ -892,90 +896,113 @@ def non_max_suppression(
         prediction = prediction.cpu()
     bs = prediction.shape[0]  # batch size
     nc = prediction.shape[2] - nm - 5  # number of classes
-    xc = prediction[..., 4] > conf_thres  # candidates
 
     # Settings
     # min_wh = 2  # (pixels) minimum box width and height
-    max_wh = 7680  # (pixels) maximum box width and height
-    max_nms = 30000  # maximum number of boxes into torchvision.ops.nms()
-    time_limit = 0.5 + 0.05 * bs  # seconds to quit after
+    max_nms = 30000  # maximum number of boxes per image into torchvision.ops.nms()
     redundant = True  # require redundant detections
     multi_label &= nc > 1  # multiple labels per box (adds 0.5ms/img)
     merge = False  # use merge-NMS
 
-    t = time.time()
     mi = 5 + nc  # mask start index
-    output = [torch.zeros((0, 6 + nm), device=prediction.device)] * bs
-    for xi, x in enumerate(prediction):  # image index, image inference
-        # Apply constraints
-        # x[((x[..., 2:4] < min_wh) | (x[..., 2:4] > max_wh)).any(1), 4] = 0  # width-height
-        x = x[xc[xi]]  # confidence
-
-        # Cat apriori labels if autolabelling
-        if labels and len(labels[xi]):
-            lb = labels[xi]
-            v = torch.zeros((len(lb), nc + nm + 5), device=x.device)
-            v[:, :4] = lb[:, 1:5]  # box
-            v[:, 4] = 1.0  # conf
-            v[range(len(lb)), lb[:, 0].long() + 5] = 1.0  # cls
-            x = torch.cat((x, v), 0)
-
-        # If none remain process next image
-        if not x.shape[0]:
-            continue
-
-        # Compute conf
-        x[:, 5:] *= x[:, 4:5]  # conf = obj_conf * cls_conf
-
-        # Box/Mask
-        box = xywh2xyxy(x[:, :4])  # center_x, center_y, width, height) to (x1, y1, x2, y2)
-        mask = x[:, mi:]  # zero columns if no masks
-
-        # Detections matrix nx6 (xyxy, conf, cls)
-        if multi_label:
-            i, j = (x[:, 5:mi] > conf_thres).nonzero(as_tuple=False).T
-            x = torch.cat((box[i], x[i, 5 + j, None], j[:, None].float(), mask[i]), 1)
-        else:  # best class only
-            conf, j = x[:, 5:mi].max(1, keepdim=True)
-            x = torch.cat((box, conf, j.float(), mask), 1)[conf.view(-1) > conf_thres]
-
-        # Filter by class
-        if classes is not None:
-            x = x[(x[:, 5:6] == torch.tensor(classes, device=x.device)).any(1)]
-
-        # Apply finite constraint
-        # if not torch.isfinite(x).all():
-        #     x = x[torch.isfinite(x).all(1)]
-
-        # Check shape
-        n = x.shape[0]  # number of boxes
-        if not n:  # no boxes
-            continue
-        x = x[x[:, 4].argsort(descending=True)[:max_nms]]  # sort by confidence and remove excess boxes
-
-        # Batched NMS
-        c = x[:, 5:6] * (0 if agnostic else max_wh)  # classes
-        boxes, scores = x[:, :4] + c, x[:, 4]  # boxes (offset by class), scores
-        i = torchvision.ops.nms(boxes, scores, iou_thres)  # NMS
-        i = i[:max_det]  # limit detections
-        if merge and (1 < n < 3E3):  # Merge NMS (boxes merged using weighted mean)
-            # update boxes as boxes(i,4) = weights(i,n) * boxes(n,4)
-            iou = box_iou(boxes[i], boxes) > iou_thres  # iou matrix
-            weights = iou * scores[None]  # box weights
-            x[i, :4] = torch.mm(weights, x[:, :4]).float() / weights.sum(1, keepdim=True)  # merged boxes
-            if redundant:
-                i = i[iou.sum(1) > 1]  # require redundancy
-
-        output[xi] = x[i]
-        if mps:
-            output[xi] = output[xi].to(device)
-        if (time.time() - t) > time_limit:
-            LOGGER.warning(f'WARNING ⚠️ NMS time limit {time_limit:.3f}s exceeded')
-            break  # time limit exceeded
-
+    output = [torch.zeros((0, 6 + nm), device=device)] * bs
+
+    # Candidates of the whole batch, b is the image index of each row
+    b, a = (prediction[..., 4] > conf_thres).nonzero(as_tuple=True)  # confidence
+    x = prediction[b, a]
+
+    # Cat apriori labels if autolabelling
+    if labels and any(len(lb) for lb in labels):
+        v, vb = [x], [b]
+        for xi, lb in enumerate(labels):
+            if len(lb):
+                vi = torch.zeros((len(lb), nc + nm + 5), device=x.device)
+                vi[:, :4] = lb[:, 1:5]  # box
+                vi[:, 4] = 1.0  # conf
+                vi[range(len(lb)), lb[:, 0].long() + 5] = 1.0  # cls
+                v.append(vi)
+                vb.append(torch.full((len(lb),), xi, dtype=b.dtype, device=b.device))
+        x, b = torch.cat(v, 0), torch.cat(vb, 0)
+
+    # If none remain return empty results
+    if not x.shape[0]:
+        return output
+
+    # Box/Mask
+    box = xywh2xyxy(x[:, :4])  # center_x, center_y, width, height) to (x1, y1, x2, y2)
+    mask = x[:, mi:]  # zero columns if no masks
+
+    # Detections matrix nx6 (xyxy, conf, cls)
+    if nc == 1:  # single class: conf = obj_conf * cls_conf, no class to pick
+        conf = x[:, 4:5] * x[:, 5:6]
+        i = conf.view(-1) > conf_thres
+        x = torch.cat((box, conf, torch.zeros_like(conf), mask), 1)[i]
+    elif multi_label:
+        x[:, 5:mi] *= x[:, 4:5]  # conf = obj_conf * cls_conf
+        i, j = (x[:, 5:mi] > conf_thres).nonzero(as_tuple=False).T
+        x = torch.cat((box[i], x[i, 5 + j, None], j[:, None].float(), mask[i]), 1)
+    else:  # best class only
+        x[:, 5:mi] *= x[:, 4:5]  # conf = obj_conf * cls_conf
+        conf, j = x[:, 5:mi].max(1, keepdim=True)
+        i = conf.view(-1) > conf_thres
+        x = torch.cat((box, conf, j.float(), mask), 1)[i]
+    b = b[i]
+
+    # Filter by class
+    if classes is not None:
+        i = (x[:, 5:6] == torch.tensor(classes, device=x.device)).any(1)
+        x, b = x[i], b[i]
+
+    # Apply finite constraint
+    # if not torch.isfinite(x).all():
+    #     x = x[torch.isfinite(x).all(1)]
+
+    # Check shape
+    n = x.shape[0]  # number of boxes
+    if not n:  # no boxes
+        return output
+
+    # Sort by confidence within each image and remove excess boxes
+    i = x[:, 4].argsort(descending=True)
+    i = i[b[i].argsort(stable=True)]
+    x, b = x[i], b[i]
+    counts = torch.bincount(b, minlength=bs)
+    if counts.max() > max_nms:
+        i = _rank_in_image(b, counts) < max_nms
+        x, b = x[i], b[i]
+
+    # Batched NMS, one group per image (and class unless agnostic). Boxes may start off-frame: batched_nms() offsets
+    # groups by the largest coordinate, which keeps them apart only for non-negative boxes, so all boxes are shifted
+    # to non-negative coordinates first (every IoU stays the same)
+    group = b if agnostic or nc == 1 else b * nc + x[:, 5].long()
+    scores = x[:, 4]
+    boxes = x[:, :4] - x[:, :4].min().clamp(max=0)
+    i = torchvision.ops.batched_nms(boxes, scores, group, iou_thres)  # NMS
+    if merge and (1 < n < 3E3):  # Merge NMS (boxes merged using weighted mean)
+        # update boxes as boxes(i,4) = weights(i,n) * boxes(n,4)
+        boxes = boxes + group[:, None] * (boxes.max() + 1)  # boxes (offset by group)
+        iou = box_iou(boxes[i], boxes) > iou_thres  # iou matrix
+        weights = iou * scores[None]  # box weights
+        x[i, :4] = torch.mm(weights, x[:, :4]).float() / weights.sum(1, keepdim=True)  # merged boxes
+        if redundant:
+            i = i[iou.sum(1) > 1]  # require redundancy
+
+    # Back to per-image order, limit detections
+    i = i[b[i].argsort(stable=True)]
+    counts = torch.bincount(b[i], minlength=bs)
+    i = i[_rank_in_image(b[i], counts) < max_det]
+    output = list(x[i].split(counts.clamp(max=max_det).tolist()))
+    if mps:
+        output = [o.to(device) for o in output]
     return output
 
 
+def _rank_in_image(b, counts):
+    # Position of each row within its image, for rows grouped by image index b
+    starts = counts.cumsum(0) - counts
+    return torch.arange(len(b), device=b.device) - starts[b]
+
+
 def strip_optimizer(f='best.pt', s=''):  # from utils.general import *; strip_optimizer()
     # Strip optimizer from 'f' to finalize training, optionally save as 's'
     x = torch.load(f, map_location=torch.device('cpu'))
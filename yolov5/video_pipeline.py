@@ -0,0 +1,90 @@
+"""
+Headless video helpers for YoloDetect.
+
+FrameReader decodes a video on a background thread into a bounded queue so decoding overlaps with inference, and
+VideoResultWriter streams the annotated MP4 and a per-frame detections JSONL to disk as results come in.
+"""
+
+import json
+import math
+import queue
+import threading
+
+import cv2
+
+
+class FrameReader:
+    """
+    Decodes frames of a video file on a background thread. Iterating yields (frame_index, BGR frame) in order.
+
+    Only every vid_stride-th frame is retrieved; skipped frames are grabbed but never decoded into an image.
+    """
+
+    def __init__(self, source, vid_stride=1, buffer=32):
+        self.cap = cv2.VideoCapture(source)
+        assert self.cap.isOpened(), f"Failed to open {source}"
+        self.vid_stride = max(int(vid_stride), 1)
+        fps = self.cap.get(cv2.CAP_PROP_FPS)  # warning: may return 0 or nan
+        self.fps = fps if math.isfinite(fps) and fps > 0 else 30  # 30 FPS fallback
+        self.w = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.h = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.queue = queue.Queue(maxsize=buffer)  # bounded so a slow consumer caps decoded-frame memory
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="frame-reader", daemon=True)
+        self.thread.start()
+
+    def _put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        i = 0
+        try:
+            while not self.stopped.is_set() and self.cap.grab():  # .read() = .grab() followed by .retrieve()
+                if i % self.vid_stride == 0:
+                    success, frame = self.cap.retrieve()
+                    if not success or not self._put((i, frame)):
+                        break
+                i += 1
+        finally:
+            self.cap.release()
+            self._put(None)  # end of stream
+
+    def __iter__(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            yield item
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+
+
+class VideoResultWriter:
+    # Writes the annotated MP4 and one JSON line of detections per processed frame, incrementally
+    def __init__(self, video_path, jsonl_path, fps, size):
+        self.video = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+        self.jsonl = open(jsonl_path, "w")
+
+    def write(self, index, im, det, time_s, reused=False):
+        self.video.write(im)
+        line = {
+            "frame": index,
+            "time": round(time_s, 3),
+            "detections": [[round(float(v), 3) for v in d] for d in det.tolist()],
+        }
+        if reused:
+            line["reused"] = True  # static frame, detections carried over from the last inferred frame
+        self.jsonl.write(json.dumps(line) + "\n")
+
+    def close(self):
+        self.video.release()
+        self.jsonl.close()
@@ -34,7 +34,6 @@ import os
 import sys
 from pathlib import Path
 
-import requests
 import torch
 
 FILE = Path(__file__).resolve()
@@ -43,19 +42,18 @@ if str(ROOT) not in sys.path:
     sys.path.append(str(ROOT))  # add ROOT to PATH
 ROOT = Path(os.path.relpath(ROOT, Path.cwd()))  # relative
 
+import collections
 import datetime
 
 from ultralytics.utils.plotting import Annotator, colors, save_one_box
 
 from constants import Constants
-from yolov5.models.common import DetectMultiBackend
 from yolov5.utils.augmentations import (
     Albumentations,
     augment_hsv,
     classify_albumentations,
     classify_transforms,
     copy_paste,
-    letterbox,
     mixup,
     random_perspective,
 )
@@ -65,26 +63,28 @@ from yolov5.utils.dataloaders import (
     LoadImages,
     LoadScreenshots,
     LoadStreams,
+    imread_reduced,
 )
 from yolov5.utils.general import (
     LOGGER,
     Profile,
     check_file,
-    check_img_size,
     check_imshow,
     check_requirements,
     colorstr,
     cv2,
     increment_path,
-    non_max_suppression,
     print_args,
-    scale_boxes,
     strip_optimizer,
     xyxy2xywh,
 )
-from yolov5.utils.torch_utils import select_device, smart_inference_mode
-import numpy as np
-from app.utils.env_service import env_service
+from yolov5.utils.torch_utils import smart_inference_mode
+from yolov5.event_tracker import EventTracker
+from yolov5.frame_gate import FrameGate
+from yolov5.model_registry import model_registry
+from yolov5.result_cache import file_hash, result_cache
+from yolov5.tiled_inference import TiledInference
+from yolov5.video_pipeline import FrameReader, VideoResultWriter
 
 
 PARENT_PATH = os.getcwd()
@@ -95,6 +95,7 @@ class YoloDetect:
         save_path = Constants.PUBLIC_FOLDER + image
 
         self.source = os.path.join(PARENT_PATH, save_path)
+        self.source_name = image  # uploaded file name, content hash + extension for new uploads
 
         self.user_id = user_id
         # self.weights = ROOT / "best_vbase.pt"
@@ -113,62 +114,206 @@ class YoloDetect:
         self.exist_ok = False
         self.vid_stride = 1
         self.check = False
+        self.events = []  # (topic, payload) pairs for the event bus, see detection_thread()
+        self.alert_path = None  # image the notification points at, if one was raised
+        self.boxes = None  # [x1, y1, x2, y2, conf, cls] per detection of the last image
+        self.rip_events = None  # tracked rip events of a video, see detect_video()
+        self.tiler = TiledInference()  # sliced inference for images larger than TILE_SIZE, off by default
+        self.reduced_decode = os.getenv("DECODE_REDUCED", "1") == "1"  # large JPEGs at reduced scale, see read_image()
+        self.box_gain = None  # (x, y) source pixels per decoded pixel when the image was decoded reduced
 
     def alert_image(self, file_name):
-        try:
-            response = requests.post(
-                f"http://{env_service.get_env_var('BASE_ADDRESS')}:8008/api/notification",
-                json={"user_id": str(self.user_id), "detection_path": file_name},
-            )
-            if response.status_code == 200:
-                print("Request successful")
-                print("Response JSON:", response.json())
-            else:
-                print(f"Request failed with status code {response.status_code}")
-                print("Response text:", response.text)
-        except Exception as e:
-            print(e)
+        self.alert_path = file_name
+        self.events.append(
+            ("notification", {"user_id": str(self.user_id), "detection_path": file_name})
+        )
+
+    def save_history(self, file_name, checked, detections_path=None, rip_events=None):
+        data = {
+            "user_id": str(self.user_id),
+            "result_path": file_name,
+            "status": checked,
+            "source": self.source_name,
+        }
+        if detections_path:
+            data["detections_path"] = detections_path
+        if rip_events:
+            data["rip_events"] = rip_events
+        self.events.append(("history", data))
 
     def detection_thread(self):
-        if (
-            self.source.endswith(".png")
-            or self.source.endswith(".jpg")
-            or self.source.endswith(".jpeg")
-        ):
-            img = cv2.imread(self.source)
+        """
+        Run detection on the source and return the job result.
+
+        History and notification records are not sent from here: they are returned under "events" and published to
+        the in-process event bus by whoever ran the job, which also works when the job ran in a worker process.
+        """
+        cache_key, result = self.cached_result()
+        if result is not None:
+            return self.job_result(result, cached=True)
+        if self.is_video():
+            file_name, checked, detections_path = self.detect_video()
+            result = self.store_result(cache_key, file_name, checked, detections_path)
+        else:
+            img = self.read_image()
             img, checked, file_name = self.detect_single_image(img)
+            result = self.store_result(cache_key, file_name, checked, boxes=self.boxes)
+        return self.job_result(result, cached=False)
+
+    @classmethod
+    def detection_batch(cls, user_id, sources):
+        """
+        Run detection on several sources as one job and return the per-source results in order.
+
+        All images are submitted to the micro-batcher before any result is awaited, so they share forward passes
+        instead of queueing one by one; videos run after them. A source that fails gets an "error" entry without
+        failing the rest. The events of every source are returned together so the bus delivers them in one
+        dispatch, and the histories are stored with a single insert_many.
+        """
+        results = [None] * len(sources)
+        submitted, videos = [], []
+        for i, source in enumerate(sources):
+            detector = cls(user_id, source)
+            try:
+                cache_key, result = detector.cached_result()
+                if result is not None:
+                    results[i] = detector.job_result(result, cached=True)
+                elif detector.is_video():
+                    videos.append((i, detector, cache_key))
+                else:
+                    img = detector.read_image()
+                    if img is None:
+                        raise FileNotFoundError(f"Image Not Found {detector.source}")
+                    submitted.append((i, detector, cache_key, img, detector.submit_image(img)))
+            except Exception as e:
+                results[i] = {"source": source, "error": repr(e)}
 
-            response = requests.post(
-                f"http://{env_service.get_env_var('BASE_ADDRESS')}:8008/api/history",
-                json={
-                    "user_id": str(self.user_id),
-                    "result_path": file_name,
-                    "status": checked,
-                },
-            )
-            if response.status_code == 200 or response.status_code == 201:
-                print("Request successful")
-                print("Response JSON:", response.json())
-            else:
-                print(f"Request failed with status code {response.status_code}")
-                print("Response text:", response.text)
-        else:
-            cap = cv2.VideoCapture(self.source)
+        for i, detector, cache_key, img, future in submitted:
             try:
-                while True:
-                    success, frame = cap.read()
-                    if not success:
-                        break
-                    else:
-                        img, attr = self.detect_image(frame)
-                        cv2.imshow("", img)
-                        cv2.waitKey(0)
+                img, checked, file_name = detector.process_image(img, future)
+                result = detector.store_result(cache_key, file_name, checked, boxes=detector.boxes)
+                results[i] = detector.job_result(result, cached=False)
             except Exception as e:
-                print(e)
-                pass
-            finally:
-                cap.release()
-                cv2.destroyAllWindows()
+                results[i] = {"source": detector.source_name, "error": repr(e)}
+
+        for i, detector, cache_key in videos:
+            try:
+                file_name, checked, detections_path = detector.detect_video()
+                result = detector.store_result(cache_key, file_name, checked, detections_path)
+                results[i] = detector.job_result(result, cached=False)
+            except Exception as e:
+                results[i] = {"source": detector.source_name, "error": repr(e)}
+
+        events = [event for result in results for event in result.pop("events", [])]
+        return {"results": results, "events": events}
+
+    def is_video(self):
+        return Path(self.source).suffix[1:].lower() in VID_FORMATS
+
+    def cached_result(self):
+        """
+        Result cache key for this source and settings, and the cached result, None on a miss.
+        """
+        loaded = self.load_model()
+        cache_key = result_cache.key(
+            file_hash(self.source),
+            loaded.weights_hash,
+            tuple(loaded.imgsz),
+            self.conf_thres,
+            self.iou_thres,
+            self.classes,
+            self.agnostic_nms,
+            self.max_det,
+            self.vid_stride,
+            FrameGate().settings(),
+            self.tiler.settings(),
+            self.reduced_decode,
+        )
+        result = result_cache.get(cache_key)
+        if result is None or not os.path.exists(
+            os.path.join(PARENT_PATH, Constants.DETECTION_FOLDER + result["result_path"])
+        ):
+            return cache_key, None
+        # Same content and settings seen before: reuse the stored result without running inference
+        self.check = result["status"]
+        if result.get("rip_events"):
+            for event in result["rip_events"]:
+                self.alert_image(event["best_frame"])
+        elif result["alert_path"]:
+            self.alert_image(result["alert_path"])
+        return cache_key, result
+
+    def store_result(self, cache_key, file_name, checked, detections_path=None, boxes=None):
+        result = {
+            "result_path": file_name,
+            "status": checked,
+            "detections_path": detections_path,
+            "boxes": boxes,
+            "alert_path": self.alert_path,
+            "rip_events": self.rip_events,
+        }
+        result_cache.put(cache_key, result)
+        return result
+
+    def job_result(self, result, cached):
+        self.save_history(
+            result["result_path"],
+            result["status"],
+            result["detections_path"],
+            result.get("rip_events"),
+        )
+        return {**result, "source": self.source_name, "cached": cached, "events": self.events}
+
+    def load_model(self):
+        return model_registry.get(
+            self.weights,
+            device=self.device,
+            dnn=self.dnn,
+            data=self.data,
+            fp16=False,
+            imgsz=self.imgsz,
+        )
+
+    def read_image(self):
+        """
+        Decode the source image, None if it cannot be read.
+
+        Large JPEGs are decoded at 1/2, 1/4 or 1/8 scale while still no smaller than the model input (imread_reduced),
+        unless DECODE_REDUCED is "0" or tiled inference needs the full resolution. The annotated image keeps the
+        decoded size; boxes are reported in source pixels either way.
+        """
+        if not self.reduced_decode or self.tiler.tile_size > 0:
+            return cv2.imread(self.source)
+        img, hw0 = imread_reduced(self.source, max(self.imgsz))
+        if img is not None and hw0 != img.shape[:2]:
+            self.box_gain = hw0[1] / img.shape[1], hw0[0] / img.shape[0]
+        return img
+
+    def annotate(self, im0, det, names):
+        annotator = Annotator(im0, line_width=3, example=str(names))
+        for *xyxy, conf, cls in reversed(det):
+            c = int(cls)  # integer class
+            label = f"{names[c]} {conf:.2f}"
+            annotator.box_label(xyxy, label, color=colors(c, True))
+        return annotator.result()
+
+    def submit_image(self, img):
+        """
+        Queue img on the shared micro-batcher and return the future of its detections.
+
+        Images larger than the configured tile size are queued as overlapping tiles and merged on result().
+        """
+        loaded = self.load_model()  # cached and warmed up once per process
+        nms = dict(
+            conf_thres=self.conf_thres,
+            iou_thres=self.iou_thres,
+            classes=self.classes,
+            agnostic=self.agnostic_nms,
+            max_det=self.max_det,
+        )
+        if self.tiler.enabled_for(img.shape):
+            return self.tiler.submit(loaded.batcher, img, **nms)
+        return loaded.batcher.submit(img, **nms)
 
     def detect_single_image(self, img):
         source = str(self.source)
@@ -176,91 +321,37 @@ class YoloDetect:
         if is_file:
             source = check_file(source)  # download
 
-        # Load model
-        device = select_device(self.device)
-        model = DetectMultiBackend(
-            self.weights, device=device, dnn=self.dnn, data=self.data, fp16=False
-        )
-        stride, names, pt = model.stride, model.names, model.pt
-        imgsz = check_img_size(self.imgsz, s=stride)  # check image size
-
-        # Dataloader
-        bs = 1  # batch_size
-
-        # Run inference
-        model.warmup(imgsz=(1 if pt or model.triton else bs, 3, *imgsz))  # warmup
-        seen, windows, dt = 0, [], (Profile(), Profile(), Profile())
-        im = im0s = img
-        im = letterbox(im, self.imgsz, stride=stride, auto=True)[0]  # padded resize
-        im = im.transpose((2, 0, 1))[::-1]  # HWC to CHW, BGR to RGB
-        im = np.ascontiguousarray(im)  # contiguous
-        with dt[0]:
-            im = torch.from_numpy(im).to(model.device)
-            im = im.half() if model.fp16 else im.float()  # uint8 to fp16/32
-            im /= 255  # 0 - 255 to 0.0 - 1.0
-            if len(im.shape) == 3:
-                im = im[None]  # expand for batch dim
-
-        # Inference
-        with dt[1]:
-            pred = model(im, augment=self.augment, visualize=self.visualize)
-
-        # NMS
-        with dt[2]:
-            pred = non_max_suppression(
-                pred,
-                self.conf_thres,
-                self.iou_thres,
-                self.classes,
-                self.agnostic_nms,
-                max_det=self.max_det,
-            )
-
-        # Process predictions
-        for i, det in enumerate(pred):  # per image
-            seen += 1
-
-            im0 = im0s.copy()
-
-            s = "%gx%g " % im.shape[2:]  # print string
-
-            annotator = Annotator(im0, line_width=3, example=str(names))
-            if len(det):
-                self.check = True
-                # Rescale boxes from img_size to im0 size
-                det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], im0.shape).round()
-
-                # Print results
-                for c in det[:, 5].unique():
-                    n = (det[:, 5] == c).sum()  # detections per class
-                    s += f"{n} {names[int(c)]}{'s' * (n > 1)}, "  # add to string
-
-                # Write results
-                for *xyxy, conf, cls in reversed(det):
-                    c = int(cls)  # integer class
-                    label = f"{names[c]}"
-
-                    c = int(cls)  # integer class
-                    label = f"{names[c]} {conf:.2f}"
-                    annotator.box_label(xyxy, label, color=colors(c, True))
-
-            # Stream results
-            im0 = annotator.result()
-
-            # Print time (inference-only)
-            LOGGER.info(
-                f"{s}{'' if len(det) else '(no detections), '}{dt[1].dt * 1E3:.1f}ms"
-            )
-
-        # Print results
-        t = tuple(x.t / seen * 1e3 for x in dt)  # speeds per image
-        LOGGER.info(
-            f"Speed: %.1fms pre-process, %.1fms inference, %.1fms NMS per image at shape {(1, 3, *imgsz)}"
-            % t
-        )
+        return self.process_image(img, self.submit_image(img))
+
+    def process_image(self, img, future):
+        """
+        Wait for the detections of img, then annotate, save and alert.
+        """
+        loaded = self.load_model()
+        names = loaded.names
+
+        dt = Profile()
+        im0 = img.copy()
+        with dt:
+            det = future.result()  # boxes already rescaled to im0 size
+
+        # Process predictions, boxes in source pixels
+        gain = (*self.box_gain, *self.box_gain, 1, 1) if self.box_gain else (1,) * 6
+        self.boxes = [[round(float(v) * g, 3) for v, g in zip(d, gain)] for d in det.tolist()]
+        s = "%gx%g " % tuple(loaded.imgsz)  # print string
+        im0 = self.annotate(im0, det, names)
+        if len(det):
+            self.check = True
+            for c in det[:, 5].unique():
+                n = (det[:, 5] == c).sum()  # detections per class
+                s += f"{n} {names[int(c)]}{'s' * (n > 1)}, "  # add to string
+
+        # Print time (wait for the batched inference + NMS)
+        LOGGER.info(f"{s}{'' if len(det) else '(no detections), '}{dt.dt * 1E3:.1f}ms batched inference+NMS")
 
         now = datetime.datetime.now()
-        file_name = str(int(datetime.datetime.timestamp(now))) + ".jpg"
+        # Source stem keeps concurrent jobs finishing in the same second from overwriting each other
+        file_name = f"{int(datetime.datetime.timestamp(now))}_{Path(self.source).stem}.jpg"
         save_path = os.path.join(PARENT_PATH, Constants.DETECTION_FOLDER + file_name)
         cv2.imwrite(save_path, im0)
 
@@ -269,3 +360,89 @@ class YoloDetect:
             self.alert_image(file_name)
 
         return im0, self.check, file_name
+
+    def detect_video(self):
+        """
+        Run the uploaded video through the micro-batcher frame by frame, headless.
+
+        Frames are decoded on a background thread, every vid_stride-th frame is inferred, and the annotated MP4 plus
+        a per-frame detections JSONL are written as results arrive. Frames the FrameGate finds static reuse the
+        detections of the last inferred frame. Detections are grouped into rip events by an IoU tracker; each event
+        saves its most confident frame and sends one notification, instead of one per frame.
+        """
+        loaded = self.load_model()
+        names = loaded.names
+        batcher = loaded.batcher
+        reader = FrameReader(self.source, vid_stride=self.vid_stride)
+        fps = reader.fps / reader.vid_stride
+
+        now = datetime.datetime.now()
+        base_name = f"{int(datetime.datetime.timestamp(now))}_{Path(self.source).stem}"
+        file_name, detections_path = base_name + ".mp4", base_name + ".jsonl"
+        writer = VideoResultWriter(
+            os.path.join(PARENT_PATH, Constants.DETECTION_FOLDER + file_name),
+            os.path.join(PARENT_PATH, Constants.DETECTION_FOLDER + detections_path),
+            fps,
+            (reader.w, reader.h),
+        )
+
+        pending = collections.deque()  # (index, frame, future, reused) in frame order
+        window = batcher.max_batch * 2  # keep enough frames in flight to fill whole batches
+        gate = FrameGate()
+        future = None
+        tracker = EventTracker()
+        self.rip_events = []
+        seen = 0
+        dt = Profile()
+
+        def save_event(event):
+            # One image and one notification per rip event, at its most confident frame
+            event_name = f"{base_name}_event{event.id}.jpg"
+            cv2.imwrite(os.path.join(PARENT_PATH, Constants.DETECTION_FOLDER + event_name), event.best_frame)
+            self.alert_image(event_name)
+            self.rip_events.append({**event.to_dict(), "best_frame": event_name})
+
+        def flush():
+            nonlocal seen
+            index, frame, future, reused = pending.popleft()
+            det = future.result()
+            im0 = self.annotate(frame, det, names)
+            writer.write(index, im0, det, index / reader.fps, reused)
+            seen += 1
+            _, finished = tracker.update(det.numpy(), index / reader.fps, im0)
+            for event in finished:
+                save_event(event)
+
+        try:
+            with dt:
+                for index, frame in reader:
+                    changed = gate.changed(frame)  # every frame, so the first one becomes the reference
+                    reused = future is not None and not changed
+                    if not reused:
+                        future = batcher.submit(
+                            frame,
+                            conf_thres=self.conf_thres,
+                            iou_thres=self.iou_thres,
+                            classes=self.classes,
+                            agnostic=self.agnostic_nms,
+                            max_det=self.max_det,
+                        )
+                    pending.append((index, frame, future, reused))
+                    if len(pending) >= window:
+                        flush()
+                while pending:
+                    flush()
+                for event in tracker.flush():
+                    save_event(event)
+        finally:
+            reader.close()
+            writer.close()
+
+        skipped = gate.stats()["skipped"]
+        LOGGER.info(
+            f"{self.source}: {seen} frames in {dt.t:.1f}s ({seen / max(dt.t, 1e-6):.1f} FPS), "
+            f"{skipped} static frames not inferred, {len(self.rip_events)} rip events"
+        )
+
+        self.check = bool(self.rip_events)
+        return file_name, self.check, detections_path